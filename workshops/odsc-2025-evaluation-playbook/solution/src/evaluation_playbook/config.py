@@ -1,8 +1,16 @@
+import os
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+EmbeddingProvider = Literal["openai", "huggingface", "local"]
+SplitterType = Literal["recursive", "token"]
+RetrievalMode = Literal["chunk", "parent"]
+QuantizationType = Literal["none", "scalar", "binary"]
+QdrantBackend = Literal["server", "local"]
+
 
 class Settings(BaseSettings):
     """Configuration settings for the evaluation playbook application.
@@ -21,11 +29,79 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o-mini"
 
     # --- Qdrant Configuration ---
+    QDRANT_BACKEND: QdrantBackend = Field(
+        default="server",
+        description="Vector store backend: the Qdrant server at QDRANT_URL, or Qdrant local mode running in-process on QDRANT_LOCAL_PATH.",
+    )
+    QDRANT_LOCAL_PATH: str = Field(
+        default="data/.qdrant",
+        description='Storage directory of the local backend, or ":memory:" for a non-persistent store. Only one process at a time can open a directory.',
+    )
     QDRANT_URL: str = Field(
         default="http://localhost:6333",
         description="Connection URI for the local Qdrant instance.",
     )
+    QDRANT_PREFER_GRPC: bool = Field(
+        default=True,
+        description="Talk to Qdrant over gRPC instead of the REST API, which sends the retrieved vectors as packed floats instead of JSON.",
+    )
+    QDRANT_GRPC_PORT: int = Field(
+        default=6334,
+        description="Port of the Qdrant gRPC API.",
+    )
+    QDRANT_HTTP_POOL_SIZE: int = Field(
+        default=32,
+        description="Maximum number of kept-alive HTTP connections of the shared Qdrant client.",
+    )
     QDRANT_COLLECTION_NAME: str = "philosopher_long_term_memory"
+    QDRANT_KEEP_COLLECTION_VERSIONS: int = Field(
+        default=2,
+        description="Number of previous long-term memory versions kept for rollbacks.",
+    )
+    QDRANT_UPSERT_BATCH_SIZE: int = Field(
+        default=256,
+        description="Number of points sent to Qdrant per upsert request.",
+    )
+    QDRANT_MAX_PENDING_UPSERTS: int = Field(
+        default=8,
+        description="Number of asynchronous upserts queued before waiting for Qdrant to apply them.",
+    )
+    QDRANT_HNSW_M: int = Field(
+        default=16,
+        description="Number of edges per node of the HNSW graph of new collection versions.",
+    )
+    QDRANT_HNSW_EF_CONSTRUCT: int = Field(
+        default=100,
+        description="Number of neighbours considered while building the HNSW graph of new collection versions.",
+    )
+    QDRANT_HNSW_EF: int | None = Field(
+        default=None,
+        description="Number of neighbours explored per search. None uses the Qdrant default.",
+    )
+    QDRANT_QUANTIZATION: QuantizationType = Field(
+        default="none",
+        description="Quantization of the vectors of new collection versions: none, scalar (int8) or binary.",
+    )
+    QDRANT_QUANTIZATION_RESCORE: bool = Field(
+        default=True,
+        description="Rescore the candidates found with quantized vectors using the original vectors.",
+    )
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = Field(
+        default=2.0,
+        description="Factor of extra candidates fetched with quantized vectors before rescoring.",
+    )
+    QDRANT_ON_DISK_VECTORS: bool = Field(
+        default=False,
+        description="Keep the original vectors of new collection versions on disk, and only the quantized ones in RAM.",
+    )
+    QDRANT_ON_DISK_PAYLOAD: bool = Field(
+        default=False,
+        description="Keep the payload of new collection versions on disk.",
+    )
+    QDRANT_SHARDING: bool = Field(
+        default=False,
+        description="Store every philosopher in its own shard of custom-sharded collection versions, so a search only touches the shard of one philosopher. Requires a Qdrant server.",
+    )
 
     # --- Opik Configuration ---
     OPIK_API_KEY: SecretStr | None = Field(
@@ -38,14 +114,145 @@ class Settings(BaseSettings):
 
     # --- RAG Configuration ---
     RAG_TEXT_EMBEDDING_MODEL_ID: str = "text-embedding-3-small"
-    RAG_TEXT_EMBEDDING_MODEL_DIM: int = 1536
+    RAG_TEXT_EMBEDDING_MODEL_DIM: int = Field(
+        default=1536,
+        description="Fallback vector dimension, used when it can't be read from the embedding model.",
+    )
+    RAG_EMBEDDING_PROVIDER: EmbeddingProvider = Field(
+        default="openai",
+        description="Backend of the embedding model: the OpenAI API, LangChain's HuggingFace wrapper or the local batched sentence-transformers backend.",
+    )
+    RAG_LOCAL_EMBEDDING_BACKEND: Literal["torch", "onnx"] = Field(
+        default="torch",
+        description="Inference backend of the local embedding provider.",
+    )
+    RAG_LOCAL_EMBEDDING_QUANTIZE_INT8: bool = Field(
+        default=False,
+        description="Run the local embedding model with int8 weights.",
+    )
+    RAG_LOCAL_EMBEDDING_ONNX_FILE_NAME: str | None = Field(
+        default=None,
+        description="int8 ONNX export loaded by the onnx backend, e.g. onnx/model_quint8_avx2.onnx. None picks the one matching the CPU.",
+    )
+    RAG_LOCAL_EMBEDDING_NUM_WORKERS: int = Field(
+        default_factory=lambda: os.cpu_count() or 1,
+        description="Number of processes the local embedding provider spreads batches over.",
+    )
+    RAG_LOCAL_EMBEDDING_BATCH_MAX_TOKENS: int = Field(
+        default=16_384,
+        description="Maximum number of padded tokens per local embedding batch.",
+    )
     RAG_CHUNK_SIZE: int = 128
+    RAG_SPLITTER: SplitterType = Field(
+        default="token",
+        description="Chunking strategy: single-pass token windows, or LangChain's separator-aware recursive splitter.",
+    )
     RAG_TOP_K: int = 3
+    RAG_RETRIEVAL_MODE: RetrievalMode = Field(
+        default="parent",
+        description="Return the retrieved chunks themselves, or the larger parent passages enclosing them.",
+    )
+    RAG_PARENT_CHUNK_SIZE: int = Field(
+        default=1024,
+        description="Number of tokens of the parent passages returned in parent retrieval mode.",
+    )
+    RAG_PARENT_SEARCH_K: int = Field(
+        default=20,
+        description="Number of chunks searched to find the top parent passages in parent retrieval mode.",
+    )
+    RAG_MMR_FETCH_K: int = Field(
+        default=20,
+        description="Number of nearest chunks maximal marginal relevance selects the retrieved ones from.",
+    )
+    RAG_MMR_LAMBDA_MULT: float = Field(
+        default=0.5,
+        description="Trade-off of maximal marginal relevance between relevance (1) and diversity (0).",
+    )
     RAG_DEVICE: str = "cpu"
+    RAG_EMBEDDING_BATCH_MAX_TOKENS: int = Field(
+        default=16_384,
+        description="Maximum number of tokens sent in a single embedding request.",
+    )
+    RAG_EMBEDDING_BATCH_MAX_SIZE: int = Field(
+        default=512,
+        description="Maximum number of chunks sent in a single embedding request.",
+    )
+    RAG_EMBEDDING_MAX_CONCURRENCY: int = Field(
+        default=4,
+        description="Number of embedding requests in flight at the same time.",
+    )
+    RAG_EMBEDDING_REQUESTS_PER_MINUTE: int = Field(
+        default=3_000,
+        description="Rate limit of the embedding API in requests per minute.",
+    )
+    RAG_EMBEDDING_TOKENS_PER_MINUTE: int = Field(
+        default=1_000_000,
+        description="Rate limit of the embedding API in tokens per minute.",
+    )
+    RAG_EXTRACTION_MAX_WORKERS: int = Field(
+        default=8,
+        description="Number of threads used to download philosopher sources concurrently.",
+    )
+    RAG_EXTRACTION_MAX_REQUESTS_PER_HOST: int = Field(
+        default=2,
+        description="Maximum number of in-flight requests against the same host during extraction.",
+    )
+    RAG_STREAMING_EXTRACTION: bool = Field(
+        default=False,
+        description="Extract and split documents section by section instead of whole articles.",
+    )
+    RAG_DEDUPLICATION_THRESHOLD: float = Field(
+        default=0.5,
+        description="Estimated Jaccard similarity from which two chunks are duplicates.",
+    )
+    RAG_DEDUPLICATION_NUM_WORKERS: int = Field(
+        default_factory=lambda: os.cpu_count() or 1,
+        description="Number of processes computing MinHash signatures for large inputs.",
+    )
+    RAG_ONLINE_DEDUPLICATION_MAX_IN_MEMORY: int = Field(
+        default=50_000,
+        description="Number of chunks the streaming deduplicator indexes in memory before spilling them to disk.",
+    )
+    RAG_ONLINE_DEDUPLICATION_SPILL: bool = Field(
+        default=True,
+        description="Spill the streaming deduplication index to disk once full, instead of forgetting it.",
+    )
+    RAG_GLOBAL_DEDUPLICATION: bool = Field(
+        default=True,
+        description="Deduplicate chunks across philosophers and ingestion runs, storing shared passages once.",
+    )
+    RAG_EMBEDDING_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Cache embeddings on disk, keyed by model and text hash.",
+    )
+    RAG_EMBEDDING_CACHE_PATH: Path = Field(
+        default=Path("data/.embedding_cache/embeddings.sqlite"),
+        description="SQLite database of the persistent embedding cache.",
+    )
+    RAG_EMBEDDING_QUERY_CACHE_SIZE: int = Field(
+        default=1024,
+        description="Number of query embeddings kept in the in-memory LRU tier.",
+    )
+    RAG_PAGE_CACHE_DIR: Path = Field(
+        default=Path("data/.page_cache"),
+        description="Directory of the on-disk cache for raw Wikipedia and Stanford Encyclopedia pages.",
+    )
+    RAG_PAGE_CACHE_TTL_SECONDS: int = Field(
+        default=7 * 24 * 60 * 60,
+        description="Age after which cached pages are revalidated against the origin.",
+    )
+    RAG_PAGE_CACHE_OFFLINE: bool = Field(
+        default=False,
+        description="Serve every page from the cache and never touch the network.",
+    )
 
     # --- Paths Configuration ---
     EVALUATION_DATASET_FILE_PATH: Path = Path("data/evaluation_dataset.json")
     EXTRACTION_METADATA_FILE_PATH: Path = Path("data/extraction_metadata_slim.json")
+    RAG_MANIFEST_FILE_PATH: Path = Path("data/.long_term_memory/manifest.json")
+    RAG_DEDUPLICATION_INDEX_DIR: Path = Path("data/.long_term_memory/dedup_index")
+    RAG_PARENT_DOCSTORE_DIR: Path = Path("data/.long_term_memory/parents")
+    RAG_SNAPSHOT_DIR: Path = Path("data/long_term_memory_snapshot")
 
 
 settings = Settings()
@@ -1,10 +1,60 @@
+import asyncio
+import threading
+import weakref
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
+
+import grpc
+import httpx
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from loguru import logger
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    HnswConfigDiff,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SetPayload,
+    SetPayloadOperation,
+    ShardingMethod,
+    VectorParams,
+)
+
+from evaluation_playbook.config import QdrantBackend, QuantizationType, settings
+from evaluation_playbook.rag.embeddings import (
+    get_embedding_dimension,
+    get_embedding_model,
+)
+
+VERSION_SEPARATOR = "__v"
 
-from evaluation_playbook.config import settings
-from evaluation_playbook.rag.embeddings import get_embedding_model
+# Payload fields indexed in every collection version, so retrievers can filter on them.
+PAYLOAD_INDEXES = {
+    "metadata.philosopher_id": PayloadSchemaType.KEYWORD,
+    "metadata.philosopher_ids": PayloadSchemaType.KEYWORD,
+    "metadata.section": PayloadSchemaType.KEYWORD,
+    "metadata.section_path": PayloadSchemaType.KEYWORD,
+}
+
+# Async clients, one per event loop: their connections can't be shared across loops.
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncQdrantClient
+] = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
 
 
 class QdrantClientWrapper:
@@ -13,75 +63,661 @@ class QdrantClientWrapper:
     This class provides a simplified interface for working with Qdrant vector store,
     including collection management and vector store operations using LangChain integration.
 
+    The configured collection name is a Qdrant alias pointing to a versioned physical
+    collection. Rebuilds write into a new shadow version and atomically switch the
+    alias once it is complete, so retrievers always query a fully built collection.
+
+    With sharding enabled, collection versions use Qdrant custom sharding and every
+    philosopher's points live in a shard keyed by the philosopher ID, so a search
+    routed to one shard only scales with that philosopher's corpus.
+
+    Instances are expensive (embedding model, collection bootstrap), so use the
+    process-wide one returned by `get_qdrant_wrapper` rather than creating new ones.
+
     Attributes:
-        client (QdrantClient): The underlying Qdrant client instance.
+        client (QdrantClient): The underlying, process-wide Qdrant client.
+        collection_name (str): Name of the alias queried by the retrievers.
+        embeddings (EmbeddingsModel): Embedding model used by the vector stores.
+        embedding_dim (int): Dimension of the vectors returned by the embedding model.
         vector_store (QdrantVectorStore): LangChain vector store interface for Qdrant.
+        local (bool): Whether the client runs Qdrant local mode in-process.
+        sharding (bool): Whether new collection versions are sharded by philosopher.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, client: QdrantClient | None = None) -> None:
         """Initialize the Qdrant client wrapper.
 
-        Creates a connection to the Qdrant server and initializes the collection
-        if it doesn't exist. Sets up the vector store with the specified embedding model.
+        Initializes the collection if it doesn't exist yet and sets up the vector
+        store with the specified embedding model.
+
+        Args:
+            client (QdrantClient | None, optional): Qdrant client to use. Defaults to
+                the pooled client shared by the whole process.
 
         Raises:
             Exception: If there are issues connecting to Qdrant or creating the collection.
         """
 
+        self.collection_name = settings.QDRANT_COLLECTION_NAME
+        self.client = client or get_qdrant_client()
+        self.local = settings.QDRANT_BACKEND == "local"
+        self.sharding = settings.QDRANT_SHARDING
+        if self.sharding and self.local:
+            logger.warning(
+                "The local Qdrant backend doesn't support sharding. Ignoring QDRANT_SHARDING."
+            )
+            self.sharding = False
+        self._shard_keys: dict[str, set[str]] = {}
+        self._sharded_collections: dict[str, bool] = {}
+
+        self.embeddings = get_embedding_model(
+            model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+            device=settings.RAG_DEVICE,
+        )
+        self.embedding_dim = get_embedding_dimension(self.embeddings)
+
         try:
-            self.client = QdrantClient(url=settings.QDRANT_URL)
+            self.bootstrap_collection()
         except Exception as e:
-            logger.error(f"Error initializing Qdrant client: {e}")
+            logger.error(f"Error initializing Qdrant collection: {e}")
             raise e
 
-        try:
-            self.create_collection()
-        except Exception as e:
-            if f"`{settings.QDRANT_COLLECTION_NAME}` already exists" in str(e):
-                logger.warning(
-                    f"Qdrant collection `{settings.QDRANT_COLLECTION_NAME}` already exists. Skipping collection creation."
-                )
-            else:
-                logger.error(f"Error initializing Qdrant client: {e}")
-                raise e
+        self.vector_store = self.get_vector_store()
 
-        embeddings = get_embedding_model(
-            model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
-            device=settings.RAG_DEVICE,
-        )
-        self.vector_store = QdrantVectorStore(
+    def get_vector_store(self, collection_name: str | None = None) -> QdrantVectorStore:
+        """Get a LangChain vector store bound to a collection.
+
+        Args:
+            collection_name (str | None, optional): Collection (or alias) to bind to.
+                Defaults to the alias queried by the retrievers.
+
+        Returns:
+            QdrantVectorStore: The vector store.
+        """
+
+        return QdrantVectorStore(
             client=self.client,
-            collection_name=settings.QDRANT_COLLECTION_NAME,
-            embedding=embeddings,
+            collection_name=collection_name or self.collection_name,
+            embedding=self.embeddings,
             retrieval_mode=RetrievalMode.DENSE,
         )
 
-    def create_collection(self) -> None:
+    def bootstrap_collection(self) -> None:
+        """Make sure the alias queried by the retrievers points to a collection.
+
+        If neither the alias nor a (legacy, non-versioned) collection with the same
+        name exists, a first empty version is created and the alias is pointed to it.
+        """
+
+        if self.get_active_collection() is not None:
+            return
+
+        if self.client.collection_exists(collection_name=self.collection_name):
+            logger.warning(
+                f"Qdrant collection `{self.collection_name}` is not versioned. It will be replaced by an alias on the next rebuild."
+            )
+
+            return
+
+        self.swap_alias(self.create_shadow_collection())
+
+    def create_collection(self, collection_name: str | None = None) -> None:
         """Create a new Qdrant collection with the configured parameters.
 
-        Creates a collection using the configured name and vector parameters from settings.
-        The collection uses cosine distance for similarity calculations.
+        Creates a collection using the configured name, sized for the vectors of the
+        configured embedding model.
+        The collection uses cosine distance for similarity calculations, the HNSW,
+        quantization and on-disk settings returned by `get_collection_config`, and
+        the payload fields listed in `PAYLOAD_INDEXES` are indexed.
+
+        Args:
+            collection_name (str | None, optional): Name of the collection to create.
+                Defaults to the configured collection name.
 
         Raises:
             Exception: If there are issues creating the collection.
         """
 
+        collection_name = collection_name or self.collection_name
+
         self.client.create_collection(
-            collection_name=settings.QDRANT_COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=settings.RAG_TEXT_EMBEDDING_MODEL_DIM, distance=Distance.COSINE
-            ),
+            collection_name=collection_name,
+            **get_collection_config(self.embedding_dim, sharding=self.sharding),
+        )
+        # Local mode always filters by scanning the payloads: indexes have no effect.
+        if not self.local:
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
+        logger.info(f"Qdrant collection {collection_name} created.")
+
+    def create_shadow_collection(self) -> str:
+        """Create a new, empty, versioned collection that is not served yet.
+
+        Returns:
+            str: Name of the new collection version.
+        """
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        collection_name = f"{self.collection_name}{VERSION_SEPARATOR}{version}"
+        self.create_collection(collection_name)
+
+        return collection_name
+
+    def is_sharded(self, collection_name: str | None = None) -> bool:
+        """Check whether a collection version uses custom sharding by philosopher.
+
+        The sharding method is read from the collection itself: QDRANT_SHARDING only
+        applies to the versions created from now on, and a rollback can serve a
+        version built with the other setting.
+
+        Args:
+            collection_name (str | None, optional): Collection (or alias) to inspect.
+                Defaults to the served alias.
+
+        Returns:
+            bool: Whether the collection is custom-sharded.
+        """
+
+        if self.local:
+            return False
+
+        if collection_name is None or collection_name == self.collection_name:
+            collection_name = self.get_active_collection() or self.collection_name
+        if collection_name in self._sharded_collections:
+            return self._sharded_collections[collection_name]
+
+        collection_info = self.client.get_collection(collection_name=collection_name)
+        sharded = collection_info.config.params.sharding_method == ShardingMethod.CUSTOM
+        # The sharding method of a collection version never changes.
+        if VERSION_SEPARATOR in collection_name:
+            self._sharded_collections[collection_name] = sharded
+
+        return sharded
+
+    def get_shard_key(
+        self, philosopher_id: str, collection_name: str | None = None
+    ) -> str | None:
+        """Get the shard key routing the points of a philosopher.
+
+        Args:
+            philosopher_id (str): ID of the philosopher.
+            collection_name (str | None, optional): Collection (or alias) holding the
+                points. Defaults to the served alias.
+
+        Returns:
+            str | None: The shard key, or None if the collection is not sharded.
+        """
+
+        return philosopher_id if self.is_sharded(collection_name) else None
+
+    def ensure_shard_key(self, shard_key: str, collection_name: str) -> None:
+        """Create the shard of a shard key in a collection version, unless it exists.
+
+        Args:
+            shard_key (str): Shard key to create.
+            collection_name (str): Collection version to create it in.
+        """
+
+        known_shard_keys = self._shard_keys.setdefault(collection_name, set())
+        if shard_key in known_shard_keys:
+            return
+
+        try:
+            self.client.create_shard_key(
+                collection_name=collection_name, shard_key=shard_key
+            )
+            logger.info(f"Qdrant shard `{shard_key}` created in {collection_name}.")
+        except (UnexpectedResponse, grpc.RpcError) as e:
+            # The shard was created by a previous run.
+            if "already exists" not in str(e):
+                raise e
+        known_shard_keys.add(shard_key)
+
+    def copy_points(
+        self, point_ids: list[str], shard_key: str, collection_name: str
+    ) -> None:
+        """Copy stored points, vectors included, into the shard of another philosopher.
+
+        Used with global deduplication, so a passage shared by several philosophers
+        is found in each of their shards without being embedded again.
+
+        Args:
+            point_ids (list[str]): Points to copy.
+            shard_key (str): Shard to copy them into.
+            collection_name (str): Collection (or alias) holding the points.
+        """
+
+        records = self.client.retrieve(
+            collection_name=collection_name,
+            ids=point_ids,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = {
+            record.id: PointStruct(
+                id=record.id, vector=record.vector, payload=record.payload
+            )
+            for record in records
+        }
+        self.client.upsert(
+            collection_name=collection_name,
+            points=list(points.values()),
+            shard_key_selector=shard_key,
+        )
+
+    def get_active_collection(self) -> str | None:
+        """Get the collection version the alias currently points to.
+
+        Returns:
+            str | None: Name of the served collection version, or None if the alias
+                doesn't exist.
+        """
+
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.collection_name:
+                return alias.collection_name
+
+        return None
+
+    def list_versions(self) -> list[str]:
+        """List all the versions of the collection, from oldest to newest.
+
+        Returns:
+            list[str]: Names of the collection versions.
+        """
+
+        prefix = f"{self.collection_name}{VERSION_SEPARATOR}"
+
+        return sorted(
+            collection.name
+            for collection in self.client.get_collections().collections
+            if collection.name.startswith(prefix)
+        )
+
+    def swap_alias(self, collection_name: str) -> None:
+        """Atomically point the served alias to another collection version.
+
+        A legacy collection named like the alias is deleted first, as an alias can't
+        shadow a collection. That's a one-off migration with a short downtime.
+
+        Args:
+            collection_name (str): Collection version to serve.
+        """
+
+        active_collection = self.get_active_collection()
+        if active_collection is None and self.client.collection_exists(
+            collection_name=self.collection_name
+        ):
+            logger.warning(
+                f"Deleting non-versioned Qdrant collection `{self.collection_name}` to replace it with an alias."
+            )
+            self.client.delete_collection(collection_name=self.collection_name)
+
+        operations = []
+        if active_collection is not None:
+            operations.append(
+                DeleteAliasOperation(
+                    delete_alias=DeleteAlias(alias_name=self.collection_name)
+                )
+            )
+        operations.append(
+            CreateAliasOperation(
+                create_alias=CreateAlias(
+                    collection_name=collection_name, alias_name=self.collection_name
+                )
+            )
+        )
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+
+        logger.info(
+            f"Qdrant alias {self.collection_name} switched from {active_collection} to {collection_name}."
         )
-        logger.info(f"Qdrant collection {settings.QDRANT_COLLECTION_NAME} created.")
+
+    def prune_versions(
+        self, keep: int = settings.QDRANT_KEEP_COLLECTION_VERSIONS
+    ) -> None:
+        """Delete old collection versions, keeping the served one and the newest `keep` others.
+
+        Args:
+            keep (int, optional): Number of previous versions kept for rollbacks.
+                Defaults to QDRANT_KEEP_COLLECTION_VERSIONS.
+        """
+
+        active_collection = self.get_active_collection()
+        previous_versions = [
+            version
+            for version in self.list_versions()
+            if active_collection is None or version < active_collection
+        ]
+
+        stale_versions = previous_versions[: max(0, len(previous_versions) - keep)]
+        for version in stale_versions:
+            self.client.delete_collection(collection_name=version)
+            logger.info(f"Qdrant collection {version} deleted.")
+
+    def rollback(self) -> str:
+        """Serve the collection version built before the currently served one.
+
+        Returns:
+            str: Name of the collection version now served.
+
+        Raises:
+            ValueError: If there is no previous version to roll back to.
+        """
+
+        active_collection = self.get_active_collection()
+        previous_versions = [
+            version
+            for version in self.list_versions()
+            if active_collection is not None and version < active_collection
+        ]
+        if len(previous_versions) == 0:
+            raise ValueError(
+                f"No previous version of Qdrant collection `{self.collection_name}` to roll back to."
+            )
+
+        self.swap_alias(previous_versions[-1])
+
+        return previous_versions[-1]
 
     def clear_collection(self) -> None:
         """Clear all data from the Qdrant collection.
 
-        Deletes the existing collection and creates a new empty one with the same parameters.
+        Serves a new, empty collection version and prunes the old ones.
         This is useful for resetting the vector store state.
         """
 
-        logger.info(f"Clearing Qdrant collection {settings.QDRANT_COLLECTION_NAME}...")
-        self.client.delete_collection(collection_name=settings.QDRANT_COLLECTION_NAME)
-        self.create_collection()
-        logger.info(f"Qdrant collection {settings.QDRANT_COLLECTION_NAME} cleared.")
+        logger.info(f"Clearing Qdrant collection {self.collection_name}...")
+        self.swap_alias(self.create_shadow_collection())
+        self.prune_versions()
+        logger.info(f"Qdrant collection {self.collection_name} cleared.")
+
+    def count(self, collection_name: str | None = None) -> int:
+        """Count the points stored in the Qdrant collection.
+
+        Args:
+            collection_name (str | None, optional): Collection (or alias) to count.
+                Defaults to the served alias.
+
+        Returns:
+            int: The exact number of points in the collection.
+        """
+
+        return self.client.count(
+            collection_name=collection_name or self.collection_name, exact=True
+        ).count
+
+    def delete_points(
+        self,
+        point_ids: list[str],
+        collection_name: str | None = None,
+        shard_key: str | None = None,
+    ) -> None:
+        """Delete points from the Qdrant collection by ID.
+
+        Args:
+            point_ids (list[str]): IDs of the points to delete.
+            collection_name (str | None, optional): Collection (or alias) to delete
+                from. Defaults to the served alias.
+            shard_key (str | None, optional): Only delete the copies in this shard.
+                Defaults to None, which deletes them from all the shards.
+        """
+
+        collection_name = collection_name or self.collection_name
+
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=point_ids),
+            shard_key_selector=shard_key,
+        )
+        logger.info(
+            f"Deleted {len(point_ids)} points from Qdrant collection {collection_name}."
+        )
+
+    def set_philosopher_ids(
+        self, philosopher_ids: dict[str, list[str]], collection_name: str | None = None
+    ) -> None:
+        """Set the philosophers referencing chunks shared by several of them.
+
+        The IDs are stored in the `metadata.philosopher_ids` payload of each point.
+
+        Args:
+            philosopher_ids (dict[str, list[str]]): Philosopher IDs keyed by point ID.
+            collection_name (str | None, optional): Collection (or alias) to update.
+                Defaults to the served alias.
+        """
+
+        if len(philosopher_ids) == 0:
+            return
+
+        collection_name = collection_name or self.collection_name
+
+        records = self.client.retrieve(
+            collection_name=collection_name,
+            ids=list(philosopher_ids),
+            with_payload=["metadata"],
+        )
+        operations = []
+        for record in records:
+            metadata = record.payload.get("metadata", {})
+            metadata["philosopher_ids"] = philosopher_ids[str(record.id)]
+            # The whole metadata object is rewritten: nested payload keys are not
+            # supported by every Qdrant deployment mode.
+            operations.append(
+                SetPayloadOperation(
+                    set_payload=SetPayload(
+                        payload={"metadata": metadata}, points=[record.id]
+                    )
+                )
+            )
+
+        self.client.batch_update_points(
+            collection_name=collection_name, update_operations=operations
+        )
+
+
+@lru_cache(maxsize=None)
+def get_qdrant_client(
+    backend: QdrantBackend = settings.QDRANT_BACKEND,
+    local_path: str = settings.QDRANT_LOCAL_PATH,
+    url: str = settings.QDRANT_URL,
+    prefer_grpc: bool = settings.QDRANT_PREFER_GRPC,
+    grpc_port: int = settings.QDRANT_GRPC_PORT,
+    pool_size: int = settings.QDRANT_HTTP_POOL_SIZE,
+) -> QdrantClient:
+    """Get the Qdrant client shared by the whole process, creating it on first use.
+
+    Over REST, the client keeps up to `pool_size` connections alive and reuses them
+    across requests and threads. By default qdrant-client disables keep-alive for
+    localhost, which opens a new connection per request.
+
+    The local backend runs Qdrant local mode in-process instead: the same client API
+    over a brute-force NumPy index, loaded from a local storage directory at start-up.
+    That needs no server and starts in milliseconds on small corpora, but ignores
+    the HNSW, quantization and payload index settings.
+
+    Args:
+        backend (QdrantBackend, optional): "server" or "local". Defaults to
+            settings.QDRANT_BACKEND.
+        local_path (str, optional): Storage directory of the local backend, or
+            ":memory:". Defaults to settings.QDRANT_LOCAL_PATH.
+        url (str, optional): URL of the Qdrant REST API. Defaults to settings.QDRANT_URL.
+        prefer_grpc (bool, optional): Whether to use the gRPC API instead, over a
+            single multiplexed channel. Defaults to settings.QDRANT_PREFER_GRPC.
+        grpc_port (int, optional): Port of the gRPC API. Defaults to settings.QDRANT_GRPC_PORT.
+        pool_size (int, optional): Maximum number of kept-alive REST connections.
+            Defaults to settings.QDRANT_HTTP_POOL_SIZE.
+
+    Returns:
+        QdrantClient: The pooled Qdrant client.
+    """
+
+    if backend == "local":
+        client = (
+            QdrantClient(location=":memory:")
+            if local_path == ":memory:"
+            else QdrantClient(path=local_path)
+        )
+        logger.info(f"Qdrant client running in-process on {local_path}.")
+
+        return client
+
+    try:
+        client = QdrantClient(
+            url=url,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            limits=httpx.Limits(
+                max_connections=None, max_keepalive_connections=pool_size
+            ),
+        )
+    except Exception as e:
+        logger.error(f"Error initializing Qdrant client: {e}")
+        raise e
+
+    logger.info(
+        f"Qdrant client connected to {url} over {'gRPC' if prefer_grpc else 'REST'}."
+    )
+
+    return client
+
+
+def get_collection_config(
+    size: int,
+    m: int = settings.QDRANT_HNSW_M,
+    ef_construct: int = settings.QDRANT_HNSW_EF_CONSTRUCT,
+    quantization: QuantizationType = settings.QDRANT_QUANTIZATION,
+    on_disk_vectors: bool = settings.QDRANT_ON_DISK_VECTORS,
+    on_disk_payload: bool = settings.QDRANT_ON_DISK_PAYLOAD,
+    sharding: bool = settings.QDRANT_SHARDING,
+) -> dict[str, Any]:
+    """Get the vector index configuration of a new collection.
+
+    Quantized vectors are always kept in RAM, so quantization combined with on-disk
+    vectors only reads the original vectors from disk to rescore the candidates.
+
+    Args:
+        size (int): Dimension of the vectors.
+        m (int, optional): Number of edges per node of the HNSW graph. Defaults to
+            settings.QDRANT_HNSW_M.
+        ef_construct (int, optional): Number of neighbours considered while building
+            the graph. Defaults to settings.QDRANT_HNSW_EF_CONSTRUCT.
+        quantization (QuantizationType, optional): "none", "scalar" (int8) or
+            "binary". Defaults to settings.QDRANT_QUANTIZATION.
+        on_disk_vectors (bool, optional): Whether to keep the original vectors on
+            disk. Defaults to settings.QDRANT_ON_DISK_VECTORS.
+        on_disk_payload (bool, optional): Whether to keep the payload on disk.
+            Defaults to settings.QDRANT_ON_DISK_PAYLOAD.
+        sharding (bool, optional): Whether to use custom sharding, with shards
+            created per shard key. Defaults to settings.QDRANT_SHARDING.
+
+    Returns:
+        dict[str, Any]: Keyword arguments of `QdrantClient.create_collection`.
+    """
+
+    if quantization == "scalar":
+        quantization_config = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    elif quantization == "binary":
+        quantization_config = BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=True)
+        )
+    else:
+        quantization_config = None
+
+    return {
+        "vectors_config": VectorParams(
+            size=size, distance=Distance.COSINE, on_disk=on_disk_vectors
+        ),
+        "hnsw_config": HnswConfigDiff(m=m, ef_construct=ef_construct),
+        "quantization_config": quantization_config,
+        "on_disk_payload": on_disk_payload,
+        "sharding_method": ShardingMethod.CUSTOM if sharding else None,
+    }
+
+
+def get_search_params(
+    hnsw_ef: int | None = settings.QDRANT_HNSW_EF,
+    quantization: QuantizationType = settings.QDRANT_QUANTIZATION,
+    rescore: bool = settings.QDRANT_QUANTIZATION_RESCORE,
+    oversampling: float = settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+) -> SearchParams | None:
+    """Get the search-time parameters matching the vector index configuration.
+
+    Args:
+        hnsw_ef (int | None, optional): Number of neighbours explored per search.
+            Defaults to settings.QDRANT_HNSW_EF.
+        quantization (QuantizationType, optional): Quantization of the searched
+            collection. Defaults to settings.QDRANT_QUANTIZATION.
+        rescore (bool, optional): Whether to rescore the quantized candidates with the
+            original vectors. Defaults to settings.QDRANT_QUANTIZATION_RESCORE.
+        oversampling (float, optional): Factor of extra quantized candidates fetched
+            before rescoring. Defaults to settings.QDRANT_QUANTIZATION_OVERSAMPLING.
+
+    Returns:
+        SearchParams | None: The search parameters, or None to use Qdrant's defaults.
+    """
+
+    quantization_params = (
+        QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+        if quantization != "none"
+        else None
+    )
+    if hnsw_ef is None and quantization_params is None:
+        return None
+
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization_params)
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Get the async Qdrant client of the running event loop, creating it on first use.
+
+    Every event loop gets its own client, as gRPC channels and HTTP connections are
+    bound to the loop that opened them: `asyncio.run` calls in a row would otherwise
+    share a client whose loop is closed. The client is dropped with its loop.
+
+    Returns:
+        AsyncQdrantClient: The async client, talking gRPC unless
+            QDRANT_PREFER_GRPC is disabled.
+
+    Raises:
+        RuntimeError: If called outside of a running event loop.
+    """
+
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncQdrantClient(
+                url=settings.QDRANT_URL,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                limits=httpx.Limits(
+                    max_connections=None,
+                    max_keepalive_connections=settings.QDRANT_HTTP_POOL_SIZE,
+                ),
+            )
+            _async_clients[loop] = client
+
+    return client
+
+
+@lru_cache(maxsize=1)
+def get_qdrant_wrapper() -> QdrantClientWrapper:
+    """Get the Qdrant wrapper shared by the whole process, creating it on first use.
+
+    The collection is bootstrapped and the embedding model loaded only once, and all
+    the retrievers and the long-term memory writer share the same pooled client.
+
+    Returns:
+        QdrantClientWrapper: The process-wide Qdrant wrapper.
+    """
+
+    return QdrantClientWrapper()
@@ -0,0 +1,279 @@
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.rag.deduplicate_documents import get_lsh_params
+
+# Maximum number of bound parameters per SQLite lookup query.
+SQLITE_MAX_VARIABLES = 500
+
+
+class DeduplicationIndex:
+    """Persistent MinHash LSH index of the chunks stored in a long-term memory version.
+
+    The index outlives a single philosopher and a single ingestion run: it stores the
+    signature and the LSH band keys of every stored point, together with the
+    philosophers referencing it. New chunks are matched against it before being
+    embedded, so a passage shared by several philosophers is stored once and
+    referenced by all of them.
+
+    There is one index per versioned collection, so it always describes exactly the
+    points of the collection it sits next to, including after a rollback.
+
+    Attributes:
+        path (Path): Path to the SQLite database of the index.
+        threshold (float): Jaccard similarity from which chunks are duplicates.
+        num_perm (int): Number of MinHash permutations of the signatures.
+    """
+
+    def __init__(self, path: Path, threshold: float, num_perm: int = 64) -> None:
+        self.path = Path(path)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.num_bands, self.rows_per_band = get_lsh_params(threshold, num_perm)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS signatures (
+                point_id TEXT PRIMARY KEY, signature BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL, key BLOB NOT NULL, point_id TEXT NOT NULL,
+                PRIMARY KEY (band, key, point_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS bands_point_id ON bands (point_id);
+            CREATE TABLE IF NOT EXISTS refs (
+                point_id TEXT NOT NULL, philosopher_id TEXT NOT NULL,
+                PRIMARY KEY (point_id, philosopher_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._check_parameters()
+
+    def find_matches(self, signatures: np.ndarray) -> list[str | None]:
+        """Find, for each signature, the most similar stored point above the threshold.
+
+        Args:
+            signatures (np.ndarray): A (n, num_perm) uint32 array of signatures.
+
+        Returns:
+            list[str | None]: For each signature, the ID of its best match, or None.
+        """
+
+        candidates: set[tuple[int, str]] = set()
+        for band, keys in enumerate(self._band_keys(signatures)):
+            positions_by_key: dict[bytes, list[int]] = {}
+            for position, key in enumerate(keys):
+                positions_by_key.setdefault(key, []).append(position)
+
+            unique_keys = list(positions_by_key)
+            for start in range(0, len(unique_keys), SQLITE_MAX_VARIABLES):
+                batch = unique_keys[start : start + SQLITE_MAX_VARIABLES]
+                rows = self._connection.execute(
+                    "SELECT key, point_id FROM bands WHERE band = ? "
+                    f"AND key IN ({','.join('?' * len(batch))})",
+                    [band, *batch],
+                ).fetchall()
+                for key, point_id in rows:
+                    for position in positions_by_key[key]:
+                        candidates.add((position, point_id))
+
+        matches: list[str | None] = [None] * len(signatures)
+        if not candidates:
+            return matches
+
+        positions, point_ids = zip(*sorted(candidates))
+        stored = self._load_signatures(sorted(set(point_ids)))
+        similarities = (
+            signatures[list(positions)]
+            == np.stack([stored[point_id] for point_id in point_ids])
+        ).mean(axis=1)
+
+        best_similarities = [self.threshold] * len(signatures)
+        for position, point_id, similarity in zip(
+            positions, point_ids, similarities.tolist()
+        ):
+            if similarity >= best_similarities[position]:
+                best_similarities[position] = similarity
+                matches[position] = point_id
+
+        return matches
+
+    def add(
+        self, point_ids: list[str], signatures: np.ndarray, philosopher_id: str
+    ) -> None:
+        """Index new points, referenced by the philosopher they were extracted for.
+
+        Args:
+            point_ids (list[str]): IDs of the new points.
+            signatures (np.ndarray): A (len(point_ids), num_perm) uint32 array.
+            philosopher_id (str): Philosopher referencing the points.
+        """
+
+        band_rows = [
+            (band, key, point_id)
+            for band, keys in enumerate(self._band_keys(signatures))
+            for key, point_id in zip(keys, point_ids)
+        ]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO signatures VALUES (?, ?)",
+                [
+                    (point_id, signature.astype(np.uint32).tobytes())
+                    for point_id, signature in zip(point_ids, signatures)
+                ],
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO bands VALUES (?, ?, ?)", band_rows
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO refs VALUES (?, ?)",
+                [(point_id, philosopher_id) for point_id in point_ids],
+            )
+
+    def add_reference(self, point_id: str, philosopher_id: str) -> list[str]:
+        """Record that a philosopher references an already stored point.
+
+        Args:
+            point_id (str): ID of the stored point.
+            philosopher_id (str): Philosopher referencing it.
+
+        Returns:
+            list[str]: All the philosophers referencing the point.
+        """
+
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO refs VALUES (?, ?)", (point_id, philosopher_id)
+            )
+
+        return self.get_references(point_id)
+
+    def remove_reference(self, point_id: str, philosopher_id: str) -> list[str]:
+        """Drop a philosopher's reference to a point, forgetting the point if it was the last.
+
+        Args:
+            point_id (str): ID of the stored point.
+            philosopher_id (str): Philosopher that no longer references it.
+
+        Returns:
+            list[str]: The philosophers still referencing the point. If empty, the
+                point was removed from the index and should be deleted from Qdrant.
+        """
+
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM refs WHERE point_id = ? AND philosopher_id = ?",
+                (point_id, philosopher_id),
+            )
+            references = self.get_references(point_id)
+            if len(references) == 0:
+                self._connection.execute(
+                    "DELETE FROM signatures WHERE point_id = ?", (point_id,)
+                )
+                self._connection.execute(
+                    "DELETE FROM bands WHERE point_id = ?", (point_id,)
+                )
+
+        return references
+
+    def get_references(self, point_id: str) -> list[str]:
+        """Get the philosophers referencing a point.
+
+        Args:
+            point_id (str): ID of the stored point.
+
+        Returns:
+            list[str]: The sorted philosopher IDs.
+        """
+
+        rows = self._connection.execute(
+            "SELECT philosopher_id FROM refs WHERE point_id = ? ORDER BY philosopher_id",
+            (point_id,),
+        ).fetchall()
+
+        return [philosopher_id for (philosopher_id,) in rows]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+
+        self._connection.close()
+
+    @staticmethod
+    def prune(index_dir: Path, keep_collection_names: list[str]) -> None:
+        """Delete the indexes of collection versions that no longer exist.
+
+        Args:
+            index_dir (Path): Directory holding one index per collection version.
+            keep_collection_names (list[str]): Collection versions to keep indexes for.
+        """
+
+        for path in Path(index_dir).glob("*.sqlite*"):
+            if path.name.split(".sqlite")[0] not in keep_collection_names:
+                path.unlink(missing_ok=True)
+                logger.info(f"Deleted deduplication index {path}.")
+
+    def _check_parameters(self) -> None:
+        parameters = f"{self.threshold}:{self.num_perm}"
+        row = self._connection.execute(
+            "SELECT value FROM meta WHERE key = 'parameters'"
+        ).fetchone()
+        if row is not None and row[0] != parameters:
+            logger.warning(
+                f"Deduplication index {self.path} was built with other LSH parameters. Clearing it."
+            )
+            with self._connection:
+                for table in ("signatures", "bands", "refs"):
+                    self._connection.execute(f"DELETE FROM {table}")
+
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('parameters', ?)", (parameters,)
+            )
+
+    def _band_keys(self, signatures: np.ndarray) -> list[list[bytes]]:
+        signatures = np.ascontiguousarray(signatures, dtype=np.uint32)
+
+        return [
+            [
+                row.tobytes()
+                for row in signatures[
+                    :, band * self.rows_per_band : (band + 1) * self.rows_per_band
+                ]
+            ]
+            for band in range(self.num_bands)
+        ]
+
+    def _load_signatures(self, point_ids: list[str]) -> dict[str, np.ndarray]:
+        signatures = {}
+        for start in range(0, len(point_ids), SQLITE_MAX_VARIABLES):
+            batch = point_ids[start : start + SQLITE_MAX_VARIABLES]
+            rows = self._connection.execute(
+                "SELECT point_id, signature FROM signatures "
+                f"WHERE point_id IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for point_id, blob in rows:
+                signatures[point_id] = np.frombuffer(blob, dtype=np.uint32)
+
+        return signatures
+
+
+def get_dedup_index_path(collection_name: str) -> Path:
+    """Get the path of the deduplication index of a collection version.
+
+    Args:
+        collection_name (str): Versioned collection the index describes.
+
+    Returns:
+        Path: Path to the SQLite database of the index.
+    """
+
+    return settings.RAG_DEDUPLICATION_INDEX_DIR / f"{collection_name}.sqlite"
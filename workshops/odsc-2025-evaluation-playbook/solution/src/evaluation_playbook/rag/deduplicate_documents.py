@@ -1,23 +1,98 @@
+import hashlib
+import itertools
+import multiprocessing
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
 from typing import List, Tuple
 
-from datasketch import MinHash, MinHashLSH
+import numpy as np
+import xxhash
+from datasketch import MinHashLSH
 from langchain_core.documents import Document
 from loguru import logger
+from pydantic import BaseModel, Field
+
+from evaluation_playbook.config import settings
+
+# Universal hashing parameters, as in datasketch: a Mersenne prime modulus and
+# signatures truncated to 32 bits.
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+EMPTY_HASH_VALUE = np.uint32((1 << 32) - 1)
+
+# Number of shingles hashed at once. Bounds the (shingles x num_perm) uint64 matrix.
+SHINGLE_BATCH_SIZE = 1 << 15
+
+# Below this many texts per worker, signing in-process beats shipping the work out.
+MIN_TEXTS_PER_WORKER = 2048
+
+# Multipliers combining the hashes of the 3 words of a shingle (odd 64-bit constants).
+_SHINGLE_MULTIPLIERS = (
+    np.uint64(0x9E3779B97F4A7C15),
+    np.uint64(0xC2B2AE3D27D4EB4F),
+    np.uint64(0x165667B19E3779F9),
+)
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Started lazily by compute_signatures and reused until shutdown_signature_pool.
+_signature_pool: ProcessPoolExecutor | None = None
+_signature_pool_size = 0
+_signature_pool_lock = threading.Lock()
+
+
+class DeduplicationStats(BaseModel):
+    """Number of documents removed by each stage of the deduplication.
+
+    Args:
+        documents (int): Number of documents fed to the deduplication.
+        exact_duplicates (int): Documents removed by the normalized-text hash stage.
+        near_duplicates (int): Documents removed by the MinHash stage.
+    """
+
+    documents: int = Field(default=0, description="Documents fed to the deduplication")
+    exact_duplicates: int = Field(default=0, description="Exact duplicates removed")
+    near_duplicates: int = Field(default=0, description="Near-duplicates removed")
+
+    @property
+    def kept(self) -> int:
+        return self.documents - self.exact_duplicates - self.near_duplicates
+
+    def add(self, other: "DeduplicationStats") -> None:
+        """Add the counters of another run to these ones."""
+
+        self.documents += other.documents
+        self.exact_duplicates += other.exact_duplicates
+        self.near_duplicates += other.near_duplicates
+
+    def __str__(self) -> str:
+        return (
+            f"{self.documents} documents: {self.exact_duplicates} exact duplicates, "
+            f"{self.near_duplicates} near-duplicates removed, {self.kept} kept"
+        )
 
 
 def deduplicate_documents(
-    documents: List[Document], threshold: float = 0.7
+    documents: List[Document],
+    threshold: float = 0.7,
+    num_workers: int = settings.RAG_DEDUPLICATION_NUM_WORKERS,
+    stats: DeduplicationStats | None = None,
 ) -> List[Document]:
     """Remove duplicate documents from a list based on content similarity.
 
-    Uses MinHash algorithm to identify similar documents and removes duplicates
-    based on the specified similarity threshold.
+    Runs in two stages. Documents whose normalized text is identical are first
+    removed with a single hash per document. Only the survivors go through the
+    MinHash algorithm, which removes near-duplicates based on the specified
+    similarity threshold.
 
     Args:
         documents: List of documents to deduplicate.
         threshold: Similarity threshold to consider documents as duplicates.
             Value between 0.0 and 1.0, where higher values require more similarity.
+        num_workers: Number of processes computing the MinHash signatures.
+        stats: Counters to add the number of documents removed by each stage to.
 
     Returns:
         List of documents with duplicates removed.
@@ -26,32 +101,79 @@ def deduplicate_documents(
     if not documents:
         return []
 
-    duplicates = find_duplicates(documents, threshold)
+    unique_documents = remove_exact_duplicates(documents)
+    duplicates = find_duplicates(unique_documents, threshold, num_workers=num_workers)
+
+    # Keep the document with more content of every duplicate pair.
+    indices_to_remove = set()
+    if duplicates:
+        pairs = np.array([(i, j) for i, j, _ in duplicates], dtype=np.int64)
+        lengths = np.array([len(doc.page_content) for doc in unique_documents])
+        indices_to_remove = set(
+            np.where(
+                lengths[pairs[:, 0]] >= lengths[pairs[:, 1]], pairs[:, 1], pairs[:, 0]
+            ).tolist()
+        )
 
-    logger.info(
-        f"{len(duplicates)} / {len(documents)} documents are duplicates. Removing them."
+    run_stats = DeduplicationStats(
+        documents=len(documents),
+        exact_duplicates=len(documents) - len(unique_documents),
+        near_duplicates=len(indices_to_remove),
     )
+    logger.info(f"Deduplicated {run_stats}.")
+    if stats is not None:
+        stats.add(run_stats)
 
-    indices_to_remove = set()
-    for i, j, _ in duplicates:
-        # Keep the document with more content
-        if len(documents[i].page_content) >= len(documents[j].page_content):
-            indices_to_remove.add(j)
-        else:
-            indices_to_remove.add(i)
+    return [doc for i, doc in enumerate(unique_documents) if i not in indices_to_remove]
+
+
+def remove_exact_duplicates(documents: List[Document]) -> List[Document]:
+    """Remove the documents whose normalized text is identical to another one's.
+
+    Each document is hashed once, so this runs in linear time. Of every group of
+    identical documents, the one with more content (raw text, before normalization)
+    is kept, in its original position.
+
+    Args:
+        documents: List of documents to deduplicate.
+
+    Returns:
+        List of documents with exact duplicates removed, in their original order.
+    """
+
+    kept_indices: dict[bytes, int] = {}
+    for i, doc in enumerate(documents):
+        key = hash_normalized_text(doc.page_content)
+        kept = kept_indices.setdefault(key, i)
+        if len(doc.page_content) > len(documents[kept].page_content):
+            kept_indices[key] = i
+
+    return [documents[i] for i in sorted(kept_indices.values())]
 
-    return [doc for i, doc in enumerate(documents) if i not in indices_to_remove]
+
+def hash_normalized_text(text: str) -> bytes:
+    """Hash a text after lowercasing it and collapsing its whitespace.
+
+    Args:
+        text: Text to hash.
+
+    Returns:
+        The 128-bit xxh3 digest of the normalized text.
+    """
+
+    return xxhash.xxh3_128_digest(" ".join(text.lower().split()).encode("utf-8"))
 
 
 def find_duplicates(
     documents: List[Document],
     threshold: float = 0.7,
     num_perm: int = 64,
+    num_workers: int = 1,
 ) -> List[Tuple[int, int, float]]:
     """Find duplicate documents using MinHash algorithm.
 
-    Creates MinHash signatures for each document and uses Locality Sensitive Hashing (LSH)
-    to efficiently find similar document pairs.
+    Creates MinHash signatures for all the documents at once and uses Locality
+    Sensitive Hashing (LSH) banding to efficiently find similar document pairs.
 
     Args:
         documents: List of documents to check for duplicates.
@@ -59,46 +181,312 @@ def find_duplicates(
             Higher values require more similarity between documents.
         num_perm: Number of permutations for MinHash. Higher values provide more
             accurate similarity estimates but require more computation.
+        num_workers: Number of processes computing the MinHash signatures.
 
     Returns:
         List of tuples containing (doc_index1, doc_index2, similarity_score)
-        for document pairs that exceed the similarity threshold.
+        for document pairs that exceed the similarity threshold, with
+        doc_index1 < doc_index2.
     """
 
-    minhashes = []
+    signatures = compute_signatures(
+        [doc.page_content for doc in documents],
+        num_perm=num_perm,
+        num_workers=num_workers,
+    )
+    pairs = find_candidate_pairs(signatures, threshold)
+    similarities = estimate_similarities(signatures, pairs)
+
+    selected = similarities >= threshold
+
+    return [
+        (i, j, similarity)
+        for (i, j), similarity in zip(
+            pairs[selected].tolist(), similarities[selected].tolist()
+        )
+    ]
+
+
+def compute_signatures(
+    texts: List[str], num_perm: int = 64, seed: int = 1, num_workers: int = 1
+) -> np.ndarray:
+    """Compute the MinHash signatures of texts, shingled into 3-grams of words.
 
-    for doc in documents:
-        minhash = MinHash(num_perm=num_perm)
-        text = doc.page_content.lower()
-        words = re.findall(r"\w+", text)
+    All the shingles of all the texts are hashed as one array, and each permutation
+    is applied to a whole batch of shingles at once before taking the minimum per
+    text. Texts with no shingle get a signature made only of the maximum hash value.
 
-        # Create shingles (3-grams of words)
-        for i in range(len(words) - 3):
-            shingle = " ".join(words[i : i + 3])
-            minhash.update(shingle.encode("utf-8"))
-        minhashes.append(minhash)
+    With several workers, the texts are split into contiguous shards signed by a
+    pool of processes. Each worker writes its rows straight into a signature matrix
+    in shared memory, so only the texts are pickled, never the signatures.
+
+    Args:
+        texts: Texts to sign.
+        num_perm: Number of permutations, i.e. length of the signatures.
+        seed: Seed of the permutations. Signatures are only comparable if they were
+            computed with the same seed and number of permutations.
+        num_workers: Number of processes to spread the texts over. Small inputs are
+            always signed in-process.
+
+    Returns:
+        A (len(texts), num_perm) uint32 array of signatures.
+    """
+
+    shape = (len(texts), num_perm)
+    num_shards = min(num_workers, len(texts) // MIN_TEXTS_PER_WORKER)
+    if num_shards <= 1:
+        signatures = np.empty(shape, dtype=np.uint32)
+        _sign(texts, signatures, seed)
+
+        return signatures
+
+    shared_memory = SharedMemory(create=True, size=len(texts) * num_perm * 4)
+    try:
+        pool = _get_signature_pool(num_workers)
+        bounds = np.linspace(0, len(texts), num_shards + 1).astype(int).tolist()
+        futures = [
+            pool.submit(
+                _sign_shard, shared_memory.name, shape, start, texts[start:end], seed
+            )
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            future.result()
+
+        return np.ndarray(shape, dtype=np.uint32, buffer=shared_memory.buf).copy()
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+@lru_cache(maxsize=None)
+def get_lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Get the LSH banding of MinHash signatures for a similarity threshold.
+
+    The banding is read from datasketch's MinHashLSH, which picks the one minimizing
+    the weighted false positive and false negative probabilities at the threshold.
+
+    Args:
+        threshold: Jaccard similarity threshold the banding is tuned for.
+        num_perm: Number of permutations of the signatures.
+
+    Returns:
+        The number of bands and the number of rows per band.
+    """
 
-    # Find similar document pairs using LSH (Locality Sensitive Hashing)
     lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
 
-    # Add documents to LSH index
-    for i, minhash in enumerate(minhashes):
-        lsh.insert(i, minhash)
-
-    duplicates = []
-    for i, minhash in enumerate(minhashes):
-        similar_docs = lsh.query(minhash)
-        # Remove self from results
-        similar_docs = [j for j in similar_docs if j != i]
-
-        # Find duplicates
-        for j in similar_docs:
-            similarity = minhashes[i].jaccard(minhashes[j])
-            if similarity >= threshold:
-                # Ensure we don't add the same pair twice (in different order)
-                pair = tuple(sorted([i, j]))
-                duplicate_info = (*pair, similarity)
-                if duplicate_info not in duplicates:
-                    duplicates.append(duplicate_info)
-
-    return duplicates
+    return lsh.b, lsh.r
+
+
+def find_candidate_pairs(
+    signatures: np.ndarray, threshold: float, num_perm: int | None = None
+) -> np.ndarray:
+    """Find the candidate pairs of signatures that share at least one LSH band.
+
+    The signatures are cut into bands, with the number of bands and rows per band
+    chosen like datasketch's MinHashLSH for the threshold. Signatures whose band
+    is byte-for-byte identical land in the same bucket.
+
+    Args:
+        signatures: A (n, num_perm) uint32 array of signatures.
+        threshold: Jaccard similarity threshold the banding is tuned for.
+        num_perm: Number of permutations. Defaults to the width of `signatures`.
+
+    Returns:
+        A (k, 2) int64 array of unique candidate pairs (i, j), with i < j, sorted.
+    """
+
+    num_signatures = len(signatures)
+    num_perm = num_perm or signatures.shape[1]
+    num_bands, rows_per_band = get_lsh_params(threshold, num_perm)
+
+    pair_codes = []
+    for band in range(num_bands):
+        band_keys = np.ascontiguousarray(
+            signatures[:, band * rows_per_band : (band + 1) * rows_per_band]
+        ).view(np.dtype((np.void, rows_per_band * signatures.itemsize)))[:, 0]
+        _, buckets, bucket_sizes = np.unique(
+            band_keys, return_inverse=True, return_counts=True
+        )
+
+        colliding = bucket_sizes[buckets] > 1
+        if not colliding.any():
+            continue
+
+        members = np.flatnonzero(colliding)
+        members = members[np.argsort(buckets[members], kind="stable")]
+        bucket_starts = np.flatnonzero(np.diff(buckets[members], prepend=-1, append=-1))
+        for start, end in zip(bucket_starts[:-1], bucket_starts[1:]):
+            first, second = np.triu_indices(end - start, k=1)
+            pair_codes.append(
+                members[start + first] * num_signatures + members[start + second]
+            )
+
+    if not pair_codes:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # The set of candidates: every pair only once, however many bands it shares.
+    pair_codes = np.unique(np.concatenate(pair_codes))
+
+    return np.stack(np.divmod(pair_codes, num_signatures), axis=1)
+
+
+def estimate_similarities(signatures: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Estimate the Jaccard similarity of pairs of signatures.
+
+    Args:
+        signatures: A (n, num_perm) uint32 array of signatures.
+        pairs: A (k, 2) array of signature indices.
+
+    Returns:
+        A (k,) float array: the fraction of permutations on which each pair agrees.
+    """
+
+    if len(pairs) == 0:
+        return np.empty(0, dtype=np.float64)
+
+    return (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+
+@lru_cache(maxsize=16)
+def get_permutations(num_perm: int, seed: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """Get the (a, b) parameters of the `a * x + b mod p` permutations.
+
+    Args:
+        num_perm: Number of permutations.
+        seed: Seed of the random generator.
+
+    Returns:
+        Two (num_perm,) uint64 arrays.
+    """
+
+    generator = np.random.RandomState(seed)
+    a, b = np.array(
+        [
+            (
+                generator.randint(1, MERSENNE_PRIME, dtype=np.uint64),
+                generator.randint(0, MERSENNE_PRIME, dtype=np.uint64),
+            )
+            for _ in range(num_perm)
+        ],
+        dtype=np.uint64,
+    ).T
+    a.flags.writeable = False
+    b.flags.writeable = False
+
+    return a, b
+
+
+def _sign(texts: List[str], signatures: np.ndarray, seed: int) -> None:
+    """Write the MinHash signatures of texts into a (len(texts), num_perm) uint32 array."""
+
+    a, b = get_permutations(signatures.shape[1], seed)
+
+    shingle_hashes, text_ids = _hash_shingles(texts)
+
+    signatures.fill(EMPTY_HASH_VALUE)
+    for start in range(0, len(shingle_hashes), SHINGLE_BATCH_SIZE):
+        batch_hashes = shingle_hashes[start : start + SHINGLE_BATCH_SIZE]
+        batch_text_ids = text_ids[start : start + SHINGLE_BATCH_SIZE]
+
+        # Wrapping uint64 arithmetic, then modulo the prime, as in datasketch.
+        with np.errstate(over="ignore"):
+            permuted = (batch_hashes[:, None] * a + b) % MERSENNE_PRIME & MAX_HASH
+
+        # Shingles are grouped by text, so one reduceat per run of text IDs.
+        run_starts = np.flatnonzero(np.diff(batch_text_ids, prepend=-1))
+        run_text_ids = batch_text_ids[run_starts]
+        run_minimums = np.minimum.reduceat(permuted, run_starts, axis=0)
+        signatures[run_text_ids] = np.minimum(
+            signatures[run_text_ids], run_minimums.astype(np.uint32)
+        )
+
+
+def _sign_shard(
+    shared_memory_name: str,
+    shape: tuple[int, int],
+    start: int,
+    texts: List[str],
+    seed: int,
+) -> None:
+    shared_memory = SharedMemory(name=shared_memory_name)
+    try:
+        signatures = np.ndarray(shape, dtype=np.uint32, buffer=shared_memory.buf)
+        _sign(texts, signatures[start : start + len(texts)], seed)
+        del signatures
+    finally:
+        shared_memory.close()
+
+
+def _get_signature_pool(num_workers: int) -> ProcessPoolExecutor:
+    global _signature_pool, _signature_pool_size
+
+    with _signature_pool_lock:
+        if _signature_pool is not None and _signature_pool_size != num_workers:
+            _signature_pool.shutdown()
+            _signature_pool = None
+        if _signature_pool is None:
+            logger.info(f"Starting {num_workers} MinHash signature worker processes.")
+            _signature_pool = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _signature_pool_size = num_workers
+
+        return _signature_pool
+
+
+def shutdown_signature_pool() -> None:
+    """Shut down the MinHash signature worker processes, if any were started.
+
+    The next call to `compute_signatures` that needs workers starts a new pool.
+    """
+
+    global _signature_pool
+
+    with _signature_pool_lock:
+        if _signature_pool is not None:
+            _signature_pool.shutdown()
+            _signature_pool = None
+
+
+@lru_cache(maxsize=1 << 20)
+def _hash_word(word: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _hash_shingles(texts: List[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Hash the word 3-grams of all the texts to 32 bits.
+
+    Returns:
+        The shingle hashes as uint64 and, for each of them, the index of its text.
+    """
+
+    words_per_text = [_WORD_PATTERN.findall(text.lower()) for text in texts]
+    num_words = np.fromiter(map(len, words_per_text), dtype=np.int64, count=len(texts))
+    word_hashes = np.fromiter(
+        map(_hash_word, itertools.chain.from_iterable(words_per_text)),
+        dtype=np.uint64,
+        count=int(num_words.sum()),
+    )
+
+    # A shingle starts at every word that is followed by at least 3 more words of
+    # the same text (shingles at positions range(len(words) - 3)).
+    word_text_ids = np.repeat(np.arange(len(texts)), num_words)
+    text_starts = np.cumsum(num_words) - num_words
+    positions = np.arange(len(word_hashes)) - np.repeat(text_starts, num_words)
+    is_shingle_start = positions < np.repeat(num_words - 3, num_words)
+
+    starts = np.flatnonzero(is_shingle_start)
+    with np.errstate(over="ignore"):
+        combined = (
+            word_hashes[starts] * _SHINGLE_MULTIPLIERS[0]
+            + word_hashes[starts + 1] * _SHINGLE_MULTIPLIERS[1]
+            + word_hashes[starts + 2] * _SHINGLE_MULTIPLIERS[2]
+        )
+    shingle_hashes = (combined ^ (combined >> np.uint64(32))) & MAX_HASH
+
+    return shingle_hashes, word_text_ids[starts]
@@ -0,0 +1,290 @@
+import threading
+import time
+import uuid
+from concurrent import futures
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+import tiktoken
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from pydantic import BaseModel, Field
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.rag.embeddings import CachedEmbeddings
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting both requests and tokens per minute.
+
+    Attributes:
+        requests_per_minute (int): Maximum number of requests per minute.
+        tokens_per_minute (int): Maximum number of tokens per minute.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._available_requests = float(requests_per_minute)
+        self._available_tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """Block until one request of `tokens` tokens fits in the budget.
+
+        Args:
+            tokens (int): Number of tokens the request consumes.
+        """
+
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+
+                    return
+
+                missing_requests = max(0.0, 1 - self._available_requests)
+                missing_tokens = max(0.0, tokens - self._available_tokens)
+                wait_seconds = max(
+                    missing_requests * 60 / self.requests_per_minute,
+                    missing_tokens * 60 / self.tokens_per_minute,
+                )
+
+            time.sleep(wait_seconds)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed_minutes = (now - self._last_refill) / 60
+        self._last_refill = now
+
+        self._available_requests = min(
+            self.requests_per_minute,
+            self._available_requests + elapsed_minutes * self.requests_per_minute,
+        )
+        self._available_tokens = min(
+            self.tokens_per_minute,
+            self._available_tokens + elapsed_minutes * self.tokens_per_minute,
+        )
+
+
+class IngestionStats(BaseModel):
+    """Throughput counters of an EmbeddingWriter.
+
+    Args:
+        chunks (int): Number of chunks embedded and written.
+        tokens (int): Number of tokens embedded.
+        embedding_requests (int): Number of embedding requests sent.
+        upserts (int): Number of Qdrant upsert requests sent.
+        elapsed_seconds (float): Wall-clock time spent writing.
+    """
+
+    chunks: int = Field(default=0, description="Number of chunks written")
+    tokens: int = Field(default=0, description="Number of tokens embedded")
+    embedding_requests: int = Field(default=0, description="Embedding requests sent")
+    upserts: int = Field(default=0, description="Qdrant upsert requests sent")
+    elapsed_seconds: float = Field(default=0.0, description="Time spent writing")
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.chunks} chunks ({self.chunks_per_second:.1f} chunks/s), "
+            f"{self.tokens} tokens ({self.tokens_per_second:.0f} tokens/s), "
+            f"{self.embedding_requests} embedding requests, {self.upserts} upserts "
+            f"in {self.elapsed_seconds:.1f}s"
+        )
+
+
+class EmbeddingWriter:
+    """Embed chunks in concurrent, token-budgeted batches and stream them into Qdrant.
+
+    Chunks are packed into embedding batches bounded both in tokens and in number of
+    inputs. Up to `max_concurrency` batches are embedded at the same time under a
+    requests/tokens per minute rate limiter. The resulting points are written to
+    Qdrant in fixed-size `upsert(wait=False)` batches; every `max_pending_upserts`
+    batches, one upsert waits for Qdrant to apply everything queued before it, so
+    ingestion can't run arbitrarily far ahead of the database.
+
+    Attributes:
+        client (QdrantClient): Qdrant client the points are written with.
+        embeddings (Embeddings): Embedding model used to embed the chunks.
+        stats (IngestionStats): Throughput counters accumulated over all the writes.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        embeddings: Embeddings,
+        batch_max_tokens: int = settings.RAG_EMBEDDING_BATCH_MAX_TOKENS,
+        batch_max_size: int = settings.RAG_EMBEDDING_BATCH_MAX_SIZE,
+        max_concurrency: int = settings.RAG_EMBEDDING_MAX_CONCURRENCY,
+        requests_per_minute: int = settings.RAG_EMBEDDING_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = settings.RAG_EMBEDDING_TOKENS_PER_MINUTE,
+        upsert_batch_size: int = settings.QDRANT_UPSERT_BATCH_SIZE,
+        max_pending_upserts: int = settings.QDRANT_MAX_PENDING_UPSERTS,
+    ) -> None:
+        self.client = client
+        self.embeddings = embeddings
+        self.batch_max_tokens = batch_max_tokens
+        self.batch_max_size = batch_max_size
+        self.max_concurrency = max_concurrency
+        self.upsert_batch_size = upsert_batch_size
+        self.max_pending_upserts = max_pending_upserts
+
+        self.stats = IngestionStats()
+
+        self._rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._encoding = tiktoken.get_encoding("cl100k_base")
+        self._points: list[PointStruct] = []
+        self._pending_upserts = 0
+
+    def write(
+        self,
+        docs: Iterable[Document],
+        collection_name: str,
+        shard_key: str | None = None,
+    ) -> None:
+        """Embed documents and upsert them into a Qdrant collection.
+
+        Documents are written under their `id` if they have one, or a random UUID
+        otherwise. All the points are applied by Qdrant when the method returns.
+
+        Args:
+            docs (Iterable[Document]): Chunks to embed and write.
+            collection_name (str): Collection (or alias) to write to.
+            shard_key (str | None, optional): Shard of a custom-sharded collection to
+                write to. Defaults to None, for collections without custom sharding.
+        """
+
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="embed"
+        ) as executor:
+            in_flight: set[Future] = set()
+            for batch, num_tokens in self._pack(docs):
+                # Backpressure: never queue more than two batches per embedding worker.
+                if len(in_flight) >= 2 * self.max_concurrency:
+                    done, in_flight = futures.wait(
+                        in_flight, return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        self._add_points(*future.result(), collection_name, shard_key)
+
+                in_flight.add(executor.submit(self._embed, batch, num_tokens))
+
+            for future in futures.wait(in_flight).done:
+                self._add_points(*future.result(), collection_name, shard_key)
+
+        self._flush(collection_name, shard_key, wait=True)
+
+        self.stats.elapsed_seconds += time.perf_counter() - start_time
+
+    def close(self) -> None:
+        """Shut down the worker processes of the embedding model, if it started any.
+
+        Only local embeddings run worker processes. The model stays usable.
+        """
+
+        embeddings = self.embeddings
+        if isinstance(embeddings, CachedEmbeddings):
+            embeddings = embeddings.embeddings
+        if callable(close := getattr(embeddings, "close", None)):
+            close()
+
+    def _pack(self, docs: Iterable[Document]) -> Iterator[tuple[list[Document], int]]:
+        batch, batch_tokens = [], 0
+        for doc in docs:
+            num_tokens = len(self._encoding.encode_ordinary(doc.page_content))
+            if batch and (
+                batch_tokens + num_tokens > self.batch_max_tokens
+                or len(batch) >= self.batch_max_size
+            ):
+                yield batch, batch_tokens
+
+                batch, batch_tokens = [], 0
+
+            batch.append(doc)
+            batch_tokens += num_tokens
+
+        if batch:
+            yield batch, batch_tokens
+
+    def _embed(
+        self, batch: list[Document], num_tokens: int
+    ) -> tuple[list[Document], list[list[float]], int]:
+        self._rate_limiter.acquire(num_tokens)
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in batch])
+
+        return batch, vectors, num_tokens
+
+    def _add_points(
+        self,
+        batch: list[Document],
+        vectors: list[list[float]],
+        num_tokens: int,
+        collection_name: str,
+        shard_key: str | None,
+    ) -> None:
+        self.stats.chunks += len(batch)
+        self.stats.tokens += num_tokens
+        self.stats.embedding_requests += 1
+
+        for doc, vector in zip(batch, vectors):
+            self._points.append(
+                PointStruct(
+                    id=doc.id or str(uuid.uuid4()),
+                    vector=vector,
+                    payload={
+                        "page_content": doc.page_content,
+                        "metadata": doc.metadata,
+                    },
+                )
+            )
+
+        # Strictly greater: at least one point is always kept for the final, waiting
+        # upsert, which also acknowledges all the asynchronous ones queued before it.
+        while len(self._points) > self.upsert_batch_size:
+            self._flush(collection_name, shard_key, limit=self.upsert_batch_size)
+
+    def _flush(
+        self,
+        collection_name: str,
+        shard_key: str | None,
+        limit: int | None = None,
+        wait: bool = False,
+    ) -> None:
+        points = self._points[:limit] if limit else self._points
+        self._points = self._points[len(points) :]
+        if len(points) == 0:
+            return
+
+        # Once too many upserts are queued, wait for Qdrant to apply all of them.
+        wait = wait or self._pending_upserts >= self.max_pending_upserts
+        self.client.upsert(
+            collection_name=collection_name,
+            points=points,
+            wait=wait,
+            shard_key_selector=shard_key,
+        )
+        self.stats.upserts += 1
+
+        if wait:
+            self._pending_upserts = 0
+            logger.debug(f"Qdrant applied all pending upserts into {collection_name}.")
+        else:
+            self._pending_upserts += 1
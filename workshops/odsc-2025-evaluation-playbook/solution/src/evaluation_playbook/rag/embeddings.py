@@ -1,30 +1,367 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Union
+
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_openai import OpenAIEmbeddings
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from evaluation_playbook.config import EmbeddingProvider, settings
+
+if TYPE_CHECKING:
+    # Imports torch: only loaded when the "local" provider is used.
+    from evaluation_playbook.rag.local_embeddings import SentenceTransformerEmbeddings
+
+# Maximum number of bound parameters per SQLite lookup query.
+SQLITE_MAX_VARIABLES = 500
+
+
+class EmbeddingCacheStats(BaseModel):
+    """Hit/miss counters of a CachedEmbeddings instance.
+
+    Args:
+        memory_hits (int): Queries served by the in-memory LRU tier.
+        disk_hits (int): Texts served by the persistent SQLite store.
+        misses (int): Texts that had to be embedded by the underlying model.
+    """
+
+    memory_hits: int = Field(default=0, description="Queries served from memory")
+    disk_hits: int = Field(default=0, description="Texts served from disk")
+    misses: int = Field(default=0, description="Texts embedded by the model")
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits ({self.memory_hits} memory, {self.disk_hits} disk), "
+            f"{self.misses} misses, {self.hit_rate:.0%} hit rate"
+        )
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper caching vectors on disk and recent queries in memory.
+
+    Vectors are stored as float32 blobs in a SQLite database keyed by the model ID,
+    the vector dimension, the kind of input (document or query) and the SHA-256 of
+    the text, so switching models never serves stale vectors. Query embeddings are
+    also kept in an in-memory LRU tier, as retrieval tends to repeat the same
+    questions.
+
+    Attributes:
+        embeddings (Embeddings): Underlying embedding model.
+        model_id (str): Identifier of the underlying embedding model.
+        model_dim (int): Dimension of the vectors returned by the underlying model.
+        stats (EmbeddingCacheStats): Hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_id: str,
+        model_dim: int,
+        cache_path: Path,
+        query_cache_size: int = 1024,
+    ) -> None:
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.model_dim = model_dim
+        self.query_cache_size = query_cache_size
+
+        self.stats = EmbeddingCacheStats()
+
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            cache_path, timeout=30, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_id TEXT NOT NULL,
+                model_dim INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model_id, model_dim, kind, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._query_cache: OrderedDict[str, list[float]] = OrderedDict()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents, only calling the underlying model for uncached texts.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            list[list[float]]: One vector per text, in order.
+        """
+
+        text_hashes = [self._hash(text) for text in texts]
+        vectors = self._load("document", text_hashes)
+
+        missing = {}
+        for text, text_hash in zip(texts, text_hashes):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+
+        with self._lock:
+            self.stats.disk_hits += sum(
+                text_hash in vectors for text_hash in text_hashes
+            )
+            self.stats.misses += len(missing)
+
+        if len(missing) > 0:
+            computed = dict(
+                zip(
+                    missing.keys(),
+                    self.embeddings.embed_documents(list(missing.values())),
+                )
+            )
+            self._store("document", computed)
+            vectors.update(computed)
+
+        return [vectors[text_hash] for text_hash in text_hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, looking it up in memory, then on disk, then with the model.
+
+        Args:
+            text (str): Query to embed.
+
+        Returns:
+            list[float]: The query vector.
+        """
+
+        text_hash = self._hash(text)
+        vector = self._get_cached_query(text_hash)
+        if vector is not None:
+            return vector
+
+        vector = self._load("query", [text_hash]).get(text_hash)
+        hit = vector is not None
+        if not hit:
+            vector = self.embeddings.embed_query(text)
+            self._store("query", {text_hash: vector})
+
+        self._cache_query(text_hash, vector, disk_hit=hit)
+
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query without blocking the event loop.
+
+        Same lookups as `embed_query`, but the disk cache is read and written in a
+        worker thread, and a miss awaits the async API of the underlying model.
+
+        Args:
+            text (str): Query to embed.
+
+        Returns:
+            list[float]: The query vector.
+        """
+
+        text_hash = self._hash(text)
+        vector = self._get_cached_query(text_hash)
+        if vector is not None:
+            return vector
+
+        vector = (await asyncio.to_thread(self._load, "query", [text_hash])).get(
+            text_hash
+        )
+        hit = vector is not None
+        if not hit:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self._store, "query", {text_hash: vector})
 
-from evaluation_playbook.config import settings
+        self._cache_query(text_hash, vector, disk_hit=hit)
 
-EmbeddingsModel = HuggingFaceEmbeddings | OpenAIEmbeddings
+        return vector
+
+    def _get_cached_query(self, text_hash: str) -> list[float] | None:
+        with self._lock:
+            vector = self._query_cache.get(text_hash)
+            if vector is not None:
+                self._query_cache.move_to_end(text_hash)
+                self.stats.memory_hits += 1
+
+        return vector
+
+    def _cache_query(self, text_hash: str, vector: list[float], disk_hit: bool) -> None:
+        with self._lock:
+            if disk_hit:
+                self.stats.disk_hits += 1
+            else:
+                self.stats.misses += 1
+
+            self._query_cache[text_hash] = vector
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _load(self, kind: str, text_hashes: list[str]) -> dict[str, list[float]]:
+        vectors = {}
+        for start in range(0, len(text_hashes), SQLITE_MAX_VARIABLES):
+            batch = text_hashes[start : start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT text_hash, vector FROM embeddings "
+                    "WHERE model_id = ? AND model_dim = ? AND kind = ? "
+                    f"AND text_hash IN ({placeholders})",
+                    [self.model_id, self.model_dim, kind, *batch],
+                ).fetchall()
+
+            for text_hash, blob in rows:
+                vectors[text_hash] = array("f", blob).tolist()
+
+        return vectors
+
+    def _store(self, kind: str, vectors: dict[str, list[float]]) -> None:
+        rows = []
+        for text_hash, vector in vectors.items():
+            if len(vector) != self.model_dim:
+                logger.warning(
+                    f"Embedding model {self.model_id} returned a {len(vector)}-d vector instead of a {self.model_dim}-d one. Not caching it."
+                )
+                continue
+
+            rows.append(
+                (
+                    self.model_id,
+                    self.model_dim,
+                    kind,
+                    text_hash,
+                    array("f", vector).tobytes(),
+                )
+            )
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._connection.commit()
+
+
+EmbeddingsModel = Union[
+    HuggingFaceEmbeddings,
+    OpenAIEmbeddings,
+    "SentenceTransformerEmbeddings",
+    CachedEmbeddings,
+]
+
+# Native output dimension of the OpenAI embedding models.
+OPENAI_EMBEDDING_MODEL_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
 
 
 def get_embedding_model(
     model_id: str,
     device: str = "cpu",
+    provider: EmbeddingProvider = settings.RAG_EMBEDDING_PROVIDER,
+    use_cache: bool = settings.RAG_EMBEDDING_CACHE_ENABLED,
 ) -> EmbeddingsModel:
-    """Get an embedding model instance based on the model ID.
+    """Get an embedding model instance based on the model ID and provider.
 
-    Currently redirects to OpenAI embeddings, but can be extended to support
-    different embedding model providers.
+    Unless disabled, the model is wrapped in a persistent embedding cache.
 
     Args:
         model_id (str): The identifier for the embedding model to use.
         device (str, optional): Computing device to run the model on ('cpu' or 'cuda').
             Defaults to "cpu".
+        provider (EmbeddingProvider, optional): Which backend runs the model: the
+            OpenAI API, LangChain's HuggingFace wrapper, or the batched, multi-process
+            local sentence-transformers backend. Defaults to the RAG_EMBEDDING_PROVIDER
+            setting.
+        use_cache (bool, optional): Whether to wrap the model in the embedding cache.
+            Defaults to the RAG_EMBEDDING_CACHE_ENABLED setting.
+
+    Returns:
+        EmbeddingsModel: A configured embedding model instance, wrapped in a
+            CachedEmbeddings if caching is enabled.
+
+    Raises:
+        ValueError: If the provider is not supported.
+    """
+
+    cache_model_id = model_id
+    if provider == "openai":
+        embedding_model = get_openai_embedding_model(model_id, device)
+    elif provider == "huggingface":
+        embedding_model = get_huggingface_embedding_model(model_id, device)
+    elif provider == "local":
+        embedding_model = get_local_embedding_model(model_id, device)
+        if embedding_model.quantize_int8:
+            # Quantized weights produce different vectors than the original model.
+            cache_model_id = (
+                f"{model_id}@{embedding_model.onnx_file_name}"
+                if embedding_model.onnx_file_name
+                else f"{model_id}@{embedding_model.backend}-int8"
+            )
+    else:
+        raise ValueError(f"Unsupported embedding provider: {provider}")
+
+    if not use_cache:
+        return embedding_model
+
+    return CachedEmbeddings(
+        embedding_model,
+        model_id=cache_model_id,
+        model_dim=get_embedding_dimension(embedding_model),
+        cache_path=settings.RAG_EMBEDDING_CACHE_PATH,
+        query_cache_size=settings.RAG_EMBEDDING_QUERY_CACHE_SIZE,
+    )
+
+
+def get_embedding_dimension(embedding_model: EmbeddingsModel) -> int:
+    """Get the dimension of the vectors returned by an embedding model.
+
+    Args:
+        embedding_model (EmbeddingsModel): The embedding model.
 
     Returns:
-        EmbeddingsModel: A configured embedding model instance (OpenAI or HuggingFace).
+        int: The vector dimension.
     """
 
-    return get_openai_embedding_model(model_id, device)
+    if isinstance(embedding_model, CachedEmbeddings):
+        return embedding_model.model_dim
+    if isinstance(embedding_model, HuggingFaceEmbeddings):
+        return embedding_model._client.get_sentence_embedding_dimension()
+    if isinstance(embedding_model, OpenAIEmbeddings):
+        return embedding_model.dimensions or OPENAI_EMBEDDING_MODEL_DIMS.get(
+            embedding_model.model, settings.RAG_TEXT_EMBEDDING_MODEL_DIM
+        )
+
+    from evaluation_playbook.rag.local_embeddings import SentenceTransformerEmbeddings
+
+    if isinstance(embedding_model, SentenceTransformerEmbeddings):
+        return embedding_model.dimension
+
+    return len(embedding_model.embed_query("dimension probe"))
 
 
 def get_openai_embedding_model(model_id: str, device: str) -> OpenAIEmbeddings:
@@ -72,3 +409,30 @@ def get_huggingface_embedding_model(
         model_kwargs={"device": device, "trust_remote_code": True},
         encode_kwargs={"normalize_embeddings": False},
     )
+
+
+def get_local_embedding_model(
+    model_id: str, device: str
+) -> "SentenceTransformerEmbeddings":
+    """Get a local sentence-transformers model tuned for bulk CPU inference.
+
+    Args:
+        model_id (str): The identifier for the sentence-transformers model.
+        device (str): Computing device to run the model on ('cpu' or 'cuda').
+
+    Returns:
+        SentenceTransformerEmbeddings: A configured local embeddings model, using the
+            backend, quantization, worker and batching settings.
+    """
+
+    from evaluation_playbook.rag.local_embeddings import SentenceTransformerEmbeddings
+
+    return SentenceTransformerEmbeddings(
+        model_id,
+        device=device,
+        backend=settings.RAG_LOCAL_EMBEDDING_BACKEND,
+        quantize_int8=settings.RAG_LOCAL_EMBEDDING_QUANTIZE_INT8,
+        num_workers=settings.RAG_LOCAL_EMBEDDING_NUM_WORKERS,
+        batch_max_tokens=settings.RAG_LOCAL_EMBEDDING_BATCH_MAX_TOKENS,
+        onnx_file_name=settings.RAG_LOCAL_EMBEDDING_ONNX_FILE_NAME,
+    )
@@ -1,28 +1,137 @@
-from typing import Generator
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Generator, Iterator
+from urllib.parse import urlencode, urlparse
 
-from langchain_community.document_loaders import WebBaseLoader, WikipediaLoader
 from langchain_core.documents import Document
 from tqdm import tqdm
 
+from evaluation_playbook.config import settings
 from evaluation_playbook.domain.philosopher import Philosopher, PhilosopherExtract
 from evaluation_playbook.domain.philosopher_factory import PhilosopherFactory
+from evaluation_playbook.rag.page_cache import get_page_cache
+from evaluation_playbook.rag.sep_parser import format_section_path, iter_sections
+
+WIKIPEDIA_HOST = "en.wikipedia.org"
+# Wikipedia pages are truncated to this many characters.
+WIKIPEDIA_MAX_CHARS = 1_000_000
+# Headings of every level: `== Life ==`, `=== Early life ===`, etc.
+WIKIPEDIA_SECTION_PATTERN = re.compile(r"^(={2,6}) ([^=].*?) \1$", re.MULTILINE)
+
+
+class HostConcurrencyLimiter:
+    """Bound the number of concurrent requests sent to the same host.
+
+    Each host gets its own semaphore, lazily created on first use, so that a
+    large thread pool can be used without hammering a single website.
+
+    Attributes:
+        max_requests_per_host (int): Maximum number of in-flight requests per host.
+    """
+
+    def __init__(self, max_requests_per_host: int) -> None:
+        self.max_requests_per_host = max(1, max_requests_per_host)
+
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limit(self, host: str) -> Iterator[None]:
+        """Block until a request slot for the given host is available.
+
+        Args:
+            host (str): Host name (e.g. "plato.stanford.edu") or full URL.
+        """
+
+        host = urlparse(host).netloc or host
+        with self._lock:
+            semaphore = self._semaphores.setdefault(
+                host, threading.BoundedSemaphore(self.max_requests_per_host)
+            )
+
+        with semaphore:
+            yield
 
 
 def get_extraction_generator(
     philosophers: list[PhilosopherExtract],
+    max_workers: int = settings.RAG_EXTRACTION_MAX_WORKERS,
+    max_requests_per_host: int = settings.RAG_EXTRACTION_MAX_REQUESTS_PER_HOST,
 ) -> Generator[tuple[Philosopher, list[Document]], None, None]:
-    """Extract documents for a list of philosophers, yielding one at a time.
+    """Extract documents for a list of philosophers concurrently, yielding one at a time.
+
+    Every source (the Wikipedia page and each Stanford Encyclopedia URL) of every
+    philosopher is downloaded as a separate task in a shared thread pool, bounded
+    per host. A philosopher is yielded as soon as all its sources are downloaded,
+    so philosophers come out in completion order rather than input order.
 
     Args:
         philosophers: A list of PhilosopherExtract objects containing philosopher information.
+        max_workers: Number of threads used to download sources concurrently.
+        max_requests_per_host: Maximum number of concurrent requests against the same host.
 
     Yields:
         tuple[Philosopher, list[Document]]: A tuple containing the philosopher object and a list of
             documents extracted for that philosopher.
     """
 
+    for philosopher, _, results in _run_extraction_tasks(
+        philosophers, get_extraction_tasks, max_workers, max_requests_per_host
+    ):
+        yield (
+            philosopher,
+            [doc for source_docs in results for doc in source_docs],
+        )
+
+
+def get_streaming_extraction_generator(
+    philosophers: list[PhilosopherExtract],
+    max_workers: int = settings.RAG_EXTRACTION_MAX_WORKERS,
+    max_requests_per_host: int = settings.RAG_EXTRACTION_MAX_REQUESTS_PER_HOST,
+) -> Generator[tuple[Philosopher, Iterator[Document]], None, None]:
+    """Extract section-sized documents for a list of philosophers, one philosopher at a time.
+
+    The thread pool only downloads the raw pages into the page cache. Parsing is
+    deferred until the consumer iterates the documents of a philosopher, which reads
+    one page at a time from disk and emits it section by section. Peak memory is
+    therefore bounded by a single page and the section being emitted, instead of all
+    the parsed pages of a philosopher.
+
+    Args:
+        philosophers: A list of PhilosopherExtract objects containing philosopher information.
+        max_workers: Number of threads used to download sources concurrently.
+        max_requests_per_host: Maximum number of concurrent requests against the same host.
+
+    Yields:
+        tuple[Philosopher, Iterator[Document]]: A tuple containing the philosopher object and a
+            lazy iterator over its section-sized documents.
+    """
+
+    for philosopher, urls, _ in _run_extraction_tasks(
+        philosophers, get_prefetch_tasks, max_workers, max_requests_per_host
+    ):
+        yield (philosopher, stream(philosopher, urls))
+
+
+def _run_extraction_tasks(
+    philosophers: list[PhilosopherExtract],
+    get_tasks: Callable[
+        [Philosopher, list[str], HostConcurrencyLimiter],
+        list[Callable[[], list[Document]]],
+    ],
+    max_workers: int,
+    max_requests_per_host: int,
+) -> Generator[tuple[Philosopher, list[str], list[list[Document]]], None, None]:
+    """Run the per-source tasks of all philosophers and group the results per philosopher."""
+
+    if len(philosophers) == 0:
+        return
+
     progress_bar = tqdm(
-        philosophers,
+        total=len(philosophers),
         desc="Extracting docs",
         unit="philosopher",
         bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}] {postfix}",
@@ -31,58 +140,199 @@ def get_extraction_generator(
         leave=True,
     )
 
+    limiter = HostConcurrencyLimiter(max_requests_per_host)
     philosophers_factory = PhilosopherFactory()
-    for philosopher_extract in progress_bar:
-        philosopher = philosophers_factory.get_philosopher(philosopher_extract.id)
-        progress_bar.set_postfix_str(f"Philosopher: {philosopher.name}")
 
-        philosopher_docs = extract(philosopher, philosopher_extract.urls)
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="extract"
+    ) as executor:
+        futures = {}
+        results: list[list[list[Document]]] = []
+        pending: list[int] = []
+        extracted_philosophers: list[Philosopher] = []
+        for philosopher_idx, philosopher_extract in enumerate(philosophers):
+            philosopher = philosophers_factory.get_philosopher(philosopher_extract.id)
+            extracted_philosophers.append(philosopher)
+
+            tasks = get_tasks(philosopher, philosopher_extract.urls, limiter)
+            results.append([[] for _ in tasks])
+            pending.append(len(tasks))
+            for task_idx, task in enumerate(tasks):
+                futures[executor.submit(task)] = (philosopher_idx, task_idx)
+
+        try:
+            for future in as_completed(futures):
+                philosopher_idx, task_idx = futures[future]
+                results[philosopher_idx][task_idx] = future.result()
+                pending[philosopher_idx] -= 1
+                if pending[philosopher_idx] > 0:
+                    continue
+
+                philosopher = extracted_philosophers[philosopher_idx]
+                progress_bar.set_postfix_str(f"Philosopher: {philosopher.name}")
+                progress_bar.update(1)
+
+                philosopher_results = results[philosopher_idx]
+                results[philosopher_idx] = []
+
+                yield (
+                    philosopher,
+                    philosophers[philosopher_idx].urls,
+                    philosopher_results,
+                )
+        finally:
+            for future in futures:
+                future.cancel()
+            progress_bar.close()
+
+
+def _with_limit(
+    limiter: HostConcurrencyLimiter, host: str, fn: Callable[[], list[Document]]
+) -> Callable[[], list[Document]]:
+    def task() -> list[Document]:
+        with limiter.limit(host):
+            return fn()
+
+    return task
+
+
+def get_extraction_tasks(
+    philosopher: Philosopher,
+    extract_urls: list[str],
+    limiter: HostConcurrencyLimiter,
+) -> list[Callable[[], list[Document]]]:
+    """Build one independent extraction task per source of a philosopher.
 
-        yield (philosopher, philosopher_docs)
+    Args:
+        philosopher: Philosopher object containing philosopher information.
+        extract_urls: List of Stanford Encyclopedia URLs to extract content from.
+        limiter: Per-host concurrency limiter shared by all tasks.
 
+    Returns:
+        list[Callable[[], list[Document]]]: Zero-argument callables, each returning
+            the documents of a single source.
+    """
 
-def extract(philosopher: Philosopher, extract_urls: list[str]) -> list[Document]:
-    """Extract documents for a single philosopher from all sources and deduplicate them.
+    tasks = [
+        _with_limit(limiter, WIKIPEDIA_HOST, partial(extract_wikipedia, philosopher))
+    ]
+    for url in extract_urls:
+        tasks.append(
+            _with_limit(
+                limiter,
+                url,
+                partial(
+                    extract_stanford_encyclopedia_of_philosophy, philosopher, [url]
+                ),
+            )
+        )
+
+    return tasks
+
+
+def get_prefetch_tasks(
+    philosopher: Philosopher,
+    extract_urls: list[str],
+    limiter: HostConcurrencyLimiter,
+) -> list[Callable[[], list[Document]]]:
+    """Build one task per source of a philosopher that only warms up the page cache.
 
     Args:
         philosopher: Philosopher object containing philosopher information.
-        extract_urls: List of URLs to extract content from.
+        extract_urls: List of Stanford Encyclopedia URLs to download.
+        limiter: Per-host concurrency limiter shared by all tasks.
 
     Returns:
-        list[Document]: List of deduplicated documents extracted for the philosopher.
+        list[Callable[[], list[Document]]]: Zero-argument callables that download a
+            single source into the page cache and return no documents.
     """
 
-    docs = []
+    def prefetch(fetch: Callable[[], object]) -> Callable[[], list[Document]]:
+        def task() -> list[Document]:
+            fetch()
 
-    docs.extend(extract_wikipedia(philosopher))
-    docs.extend(extract_stanford_encyclopedia_of_philosophy(philosopher, extract_urls))
+            return []
 
-    return docs
+        return task
 
+    page_cache = get_page_cache()
+    tasks = [
+        _with_limit(
+            limiter,
+            WIKIPEDIA_HOST,
+            prefetch(partial(fetch_wikipedia_page, philosopher.name)),
+        )
+    ]
+    for url in extract_urls:
+        tasks.append(_with_limit(limiter, url, prefetch(partial(page_cache.get, url))))
 
-def extract_wikipedia(philosopher: Philosopher) -> list[Document]:
-    """Extract documents for a single philosopher from Wikipedia.
+    return tasks
+
+
+def stream(philosopher: Philosopher, extract_urls: list[str]) -> Iterator[Document]:
+    """Lazily extract section-sized documents for a single philosopher from all sources.
 
     Args:
         philosopher: Philosopher object containing philosopher information.
+        extract_urls: List of Stanford Encyclopedia URLs to extract content from.
+
+    Yields:
+        Document: One document per section of every source.
+    """
+
+    yield from stream_wikipedia(philosopher)
+    for url in extract_urls:
+        yield from stream_stanford_encyclopedia_of_philosophy(philosopher, url)
+
+
+def fetch_wikipedia_page(query: str) -> dict | None:
+    """Fetch the plain-text content of the best Wikipedia search hit for a query.
+
+    The MediaWiki API is queried through the page cache, keyed by the full request
+    URL, so repeated runs don't hit Wikipedia again while the cached copy is fresh.
+
+    Args:
+        query: Search query, usually the philosopher's name.
 
     Returns:
-        list[Document]: List of documents extracted from Wikipedia for the philosopher.
+        dict | None: The page as returned by the MediaWiki API (with `title`,
+            `extract` and `fullurl` keys) or None if the search has no results.
     """
 
-    loader = WikipediaLoader(
-        query=philosopher.name,
-        lang="en",
-        load_max_docs=1,
-        doc_content_chars_max=1000000,
-    )
-    docs = loader.load()
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": 2,
+        "generator": "search",
+        "gsrsearch": query,
+        "gsrlimit": 1,
+        "prop": "extracts|info",
+        "explaintext": 1,
+        "inprop": "url",
+        "redirects": 1,
+    }
+    url = f"https://{WIKIPEDIA_HOST}/w/api.php?{urlencode(params)}"
+    response = get_page_cache().get_json(url)
 
-    for doc in docs:
-        doc.metadata["philosopher_id"] = philosopher.id
-        doc.metadata["philosopher_name"] = philosopher.name
+    pages = response.get("query", {}).get("pages", [])
+    if len(pages) == 0:
+        return None
 
-    return docs
+    return pages[0]
+
+
+def extract_wikipedia(philosopher: Philosopher) -> list[Document]:
+    """Extract documents for a single philosopher from Wikipedia.
+
+    Args:
+        philosopher: Philosopher object containing philosopher information.
+
+    Returns:
+        list[Document]: One document per section of the Wikipedia page, with the
+            section path in its metadata.
+    """
+
+    return list(stream_wikipedia(philosopher))
 
 
 def extract_stanford_encyclopedia_of_philosophy(
@@ -101,83 +351,123 @@ def extract_stanford_encyclopedia_of_philosophy(
             These should be valid URLs pointing to philosopher entries.
 
     Returns:
-        list[Document]: List of processed documents, each containing cleaned text content
-            and metadata including source URL, philosopher ID, name, and article title.
+        list[Document]: List of processed documents, one per section of every page, each
+            containing cleaned text content and metadata including source URL,
+            philosopher ID, name, article title and section path.
     """
 
-    def extract_paragraphs_and_headers(soup) -> str:
-        """Extract relevant content from a BeautifulSoup object of a Stanford Encyclopedia page.
+    return [
+        doc
+        for url in urls
+        for doc in stream_stanford_encyclopedia_of_philosophy(philosopher, url)
+    ]
 
-        This function processes a BeautifulSoup object by:
-        1. Removing irrelevant sections (bibliography, tools, etc.)
-        2. Extracting text from paragraphs and headers
-        3. Joining the extracted content with newlines
 
-        Args:
-            soup: BeautifulSoup object of a Stanford Encyclopedia page.
+def stream_wikipedia(philosopher: Philosopher) -> Iterator[Document]:
+    """Lazily extract one document per section of a philosopher's Wikipedia page.
 
-        Returns:
-            str: Cleaned and joined text content from the page.
-        """
-        # List of class/id names specific to the Stanford Encyclopedia of Philosophy that we want to exclude.
-        excluded_sections = [
-            "bibliography",
-            "academic-tools",
-            "other-internet-resources",
-            "related-entries",
-            "acknowledgments",
-            "article-copyright",
-            "article-banner",
-            "footer",
-        ]
-
-        # Find and remove elements within excluded sections
-        for section_name in excluded_sections:
-            for section in soup.find_all(id=section_name):
-                section.decompose()
-
-            for section in soup.find_all(class_=section_name):
-                section.decompose()
-
-            for section in soup.find_all(
-                lambda tag: tag.has_attr("id") and section_name in tag["id"].lower()
-            ):
-                section.decompose()
-
-            for section in soup.find_all(
-                lambda tag: tag.has_attr("class")
-                and any(section_name in cls.lower() for cls in tag["class"])
-            ):
-                section.decompose()
-
-        # Extract remaining paragraphs and headers
-        content = []
-        for element in soup.find_all(["p", "h1", "h2", "h3", "h4", "h5", "h6"]):
-            content.append(element.get_text())
-
-        return "\n\n".join(content)
-
-    if len(urls) == 0:
-        return []
-
-    loader = WebBaseLoader(show_progress=False)
-    soups = loader.scrape_all(urls)
-
-    documents = []
-    for url, soup in zip(urls, soups):
-        text = extract_paragraphs_and_headers(soup)
-        metadata = {
-            "source": url,
-            "philosopher_id": philosopher.id,
-            "philosopher_name": philosopher.name,
-        }
-
-        if title := soup.find("title"):
-            metadata["title"] = title.get_text().strip(" \n")
-
-        documents.append(Document(page_content=text, metadata=metadata))
-
-    return documents
+    Args:
+        philosopher: Philosopher object containing philosopher information.
+
+    Yields:
+        Document: A section of the Wikipedia page, with the section path in its metadata.
+    """
+
+    page = fetch_wikipedia_page(philosopher.name)
+    if page is None:
+        return
+
+    metadata = {
+        "title": page["title"],
+        "source": page["fullurl"],
+        "philosopher_id": philosopher.id,
+        "philosopher_name": philosopher.name,
+    }
+
+    yield from iter_section_documents(
+        iter_wikipedia_sections(page["extract"][:WIKIPEDIA_MAX_CHARS]), metadata
+    )
+
+
+def iter_wikipedia_sections(text: str) -> Iterator[tuple[list[str], str]]:
+    """Split the plain-text extract of a Wikipedia page on its headings of every level.
+
+    Args:
+        text: Plain-text extract, where headings look like `== Life ==` for top-level
+            sections and `=== Early life ===` for their sub-sections.
+
+    Yields:
+        tuple[list[str], str]: The section path (empty for the lead section), from
+            the top-level heading down, and the text of the section, excluding its
+            sub-sections.
+    """
+
+    path, start = [], 0
+    for match in WIKIPEDIA_SECTION_PATTERN.finditer(text):
+        yield path, text[start : match.start()].strip()
+
+        depth = len(match.group(1)) - 2
+        path, start = [*path[:depth], match.group(2).strip()], match.end()
+
+    yield path, text[start:].strip()
+
+
+def iter_section_documents(
+    sections: Iterator[tuple[list[str], str]], metadata: dict
+) -> Iterator[Document]:
+    """Turn the sections of a page into documents, tagged with their position in the page.
+
+    Each document gets the title of its top-level section as `section` and its full
+    path, e.g. "3. Metaphysics > 3.1 Substance", as `section_path`. Both are None
+    for the text before the first section. As every section is split on its own,
+    no chunk ever spans two sections.
+
+    Args:
+        sections: (section path, section text) pairs of a page.
+        metadata: Metadata shared by all the sections of the page.
+
+    Yields:
+        Document: One document per non-empty section.
+    """
+
+    for path, section_text in sections:
+        if not section_text:
+            continue
+
+        yield Document(
+            page_content=section_text,
+            metadata={
+                **metadata,
+                "section": path[0] if path else None,
+                "section_path": format_section_path(path),
+            },
+        )
+
+
+def stream_stanford_encyclopedia_of_philosophy(
+    philosopher: Philosopher, url: str
+) -> Iterator[Document]:
+    """Lazily extract one document per section of a Stanford Encyclopedia page.
+
+    Args:
+        philosopher: Philosopher object containing philosopher information.
+        url: Stanford Encyclopedia URL to extract content from.
+
+    Yields:
+        Document: A section of the page, with the section path in its metadata.
+    """
+
+    title, sections = iter_sections(get_page_cache().get(url))
+
+    metadata = {
+        "source": url,
+        "philosopher_id": philosopher.id,
+        "philosopher_name": philosopher.name,
+    }
+    if title is not None:
+        metadata["title"] = title
+
+    yield from iter_section_documents(sections, metadata)
 
 
 if __name__ == "__main__":
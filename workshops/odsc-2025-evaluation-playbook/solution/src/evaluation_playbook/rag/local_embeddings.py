@@ -0,0 +1,289 @@
+import functools
+import multiprocessing
+import os
+import platform
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import torch
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from sentence_transformers import SentenceTransformer
+
+# Dynamically quantized ONNX exports shipped by most sentence-transformers models,
+# keyed by the CPU instruction set they are tuned for.
+ONNX_INT8_FILE_NAMES = {
+    "arm64": "onnx/model_qint8_arm64.onnx",
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+    "avx512": "onnx/model_qint8_avx512.onnx",
+    "avx2": "onnx/model_quint8_avx2.onnx",
+}
+
+LocalEmbeddingBackend = Literal["torch", "onnx"]
+
+# Model loaded once per worker process by `_init_worker`.
+_worker_model: SentenceTransformer | None = None
+
+
+def get_onnx_int8_file_name() -> str:
+    """Pick the int8 ONNX export tuned for the instruction set of the CPU.
+
+    The CPU flags are read from `/proc/cpuinfo`. Elsewhere, x86 CPUs fall back to
+    the AVX2 export, which runs on any recent one.
+
+    Returns:
+        str: Path of the export inside the model repository.
+    """
+
+    if platform.machine().lower() in {"arm64", "aarch64"}:
+        return ONNX_INT8_FILE_NAMES["arm64"]
+
+    flags = set()
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("flags"):
+                flags = set(line.split(":", 1)[1].split())
+                break
+    except OSError:
+        pass
+
+    if "avx512_vnni" in flags:
+        return ONNX_INT8_FILE_NAMES["avx512_vnni"]
+    if "avx512f" in flags:
+        return ONNX_INT8_FILE_NAMES["avx512"]
+
+    return ONNX_INT8_FILE_NAMES["avx2"]
+
+
+def load_sentence_transformer(
+    model_id: str,
+    device: str = "cpu",
+    backend: LocalEmbeddingBackend = "torch",
+    quantize_int8: bool = False,
+    onnx_file_name: str | None = None,
+) -> SentenceTransformer:
+    """Load a sentence-transformers model, optionally quantized to int8.
+
+    With the torch backend the linear layers are dynamically quantized to int8,
+    which only works on CPU. With the ONNX backend the model's int8 ONNX export
+    is loaded instead.
+
+    Args:
+        model_id (str): Hugging Face ID or local path of the model.
+        device (str, optional): Computing device to run the model on. Defaults to "cpu".
+        backend (LocalEmbeddingBackend, optional): Inference backend. Defaults to "torch".
+        quantize_int8 (bool, optional): Whether to run the model with int8 weights.
+            Defaults to False.
+        onnx_file_name (str | None, optional): int8 ONNX export to load. Defaults to
+            None, which picks the one matching the CPU.
+
+    Returns:
+        SentenceTransformer: The loaded model.
+    """
+
+    model_kwargs = {}
+    if backend == "onnx" and quantize_int8:
+        model_kwargs["file_name"] = onnx_file_name or get_onnx_int8_file_name()
+
+    model = SentenceTransformer(
+        model_id,
+        device=device,
+        backend=backend,
+        model_kwargs=model_kwargs or None,
+        trust_remote_code=True,
+    )
+
+    if backend == "torch" and quantize_int8:
+        if device != "cpu":
+            logger.warning(
+                f"int8 dynamic quantization is only supported on CPU, not on `{device}`. Skipping it."
+            )
+        else:
+            torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+
+    return model
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Local sentence-transformers embeddings for CPU-only bulk ingestion.
+
+    Documents are sorted by token length and packed into batches holding at most
+    `batch_max_tokens` padded tokens, so short chunks are embedded in large batches
+    and long ones don't blow up the padding. With more than one worker, the batches
+    are spread over a pool of processes, each running its own copy of the model on
+    its share of the CPU cores, started on the first bulk embedding and shut down by
+    `close`. Queries are embedded in-process.
+
+    Attributes:
+        model_id (str): Hugging Face ID or local path of the model.
+        model (SentenceTransformer): In-process model, used for queries and small inputs.
+        dimension (int): Dimension of the returned vectors.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        device: str = "cpu",
+        backend: LocalEmbeddingBackend = "torch",
+        quantize_int8: bool = False,
+        num_workers: int = 1,
+        batch_max_tokens: int = 16_384,
+        batch_max_size: int = 256,
+        onnx_file_name: str | None = None,
+    ) -> None:
+        self.model_id = model_id
+        self.device = device
+        self.backend = backend
+        self.quantize_int8 = quantize_int8
+        self.onnx_file_name = (
+            onnx_file_name or get_onnx_int8_file_name()
+            if backend == "onnx" and quantize_int8
+            else None
+        )
+        self.num_workers = num_workers
+        self.batch_max_tokens = batch_max_tokens
+        self.batch_max_size = batch_max_size
+
+        self.model = load_sentence_transformer(
+            model_id, device, backend, quantize_int8, self.onnx_file_name
+        )
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents in length-sorted, token-budgeted batches.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            list[list[float]]: One vector per text, in order.
+        """
+
+        if len(texts) == 0:
+            return []
+
+        batches = self._make_batches(texts)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+        if self.num_workers > 1 and len(batches) > 1:
+            batch_vectors = self._get_pool().map(_encode_batch, batch_texts)
+        else:
+            batch_vectors = map(functools.partial(_encode, self.model), batch_texts)
+
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for batch, embedded_batch in zip(batches, batch_vectors):
+            vectors[batch] = embedded_batch
+
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query with the in-process model.
+
+        Args:
+            text (str): Query to embed.
+
+        Returns:
+            list[float]: The query vector.
+        """
+
+        return _encode(self.model, [text])[0].tolist()
+
+    def close(self) -> None:
+        """Shut the worker processes down, if they were started.
+
+        The embeddings stay usable: the next bulk embedding starts a new pool.
+        """
+
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _make_batches(self, texts: list[str]) -> list[list[int]]:
+        lengths = [
+            len(input_ids)
+            for input_ids in self.model.tokenizer(
+                texts, truncation=True, max_length=self.model.max_seq_length
+            )["input_ids"]
+        ]
+
+        batches, batch = [], []
+        for i in np.argsort(lengths, kind="stable").tolist():
+            # Lengths are increasing, so the current text sets the padded batch length.
+            padded_tokens = (len(batch) + 1) * lengths[i]
+            if batch and (
+                padded_tokens > self.batch_max_tokens
+                or len(batch) >= self.batch_max_size
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Concurrent writer threads must share a single pool: every pool loads one
+        # model copy per worker process.
+        if self._pool is not None:
+            return self._pool
+
+        with self._pool_lock:
+            if self._pool is None:
+                logger.info(
+                    f"Starting {self.num_workers} embedding worker processes for {self.model_id}."
+                )
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(
+                        self.model_id,
+                        self.device,
+                        self.backend,
+                        self.quantize_int8,
+                        self.onnx_file_name,
+                        max(1, (os.cpu_count() or 1) // self.num_workers),
+                    ),
+                )
+
+            return self._pool
+
+
+def _encode(model: SentenceTransformer, texts: list[str]) -> np.ndarray:
+    return model.encode(
+        texts,
+        batch_size=len(texts),
+        convert_to_numpy=True,
+        normalize_embeddings=False,
+        show_progress_bar=False,
+    ).astype(np.float32, copy=False)
+
+
+def _init_worker(
+    model_id: str,
+    device: str,
+    backend: LocalEmbeddingBackend,
+    quantize_int8: bool,
+    onnx_file_name: str | None,
+    num_threads: int,
+) -> None:
+    global _worker_model
+
+    torch.set_num_threads(num_threads)
+    _worker_model = load_sentence_transformer(
+        model_id, device, backend, quantize_int8, onnx_file_name
+    )
+
+
+def _encode_batch(texts: list[str]) -> np.ndarray:
+    return _encode(_worker_model, texts)
@@ -1,11 +1,44 @@
-from langchain_qdrant import QdrantVectorStore
+import itertools
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
 from loguru import logger
 
 from evaluation_playbook.config import settings
 from evaluation_playbook.domain.philosopher import PhilosopherExtract
-from evaluation_playbook.qdrant_wrapper import QdrantClientWrapper
-from evaluation_playbook.rag.deduplicate_documents import deduplicate_documents
-from evaluation_playbook.rag.extract import get_extraction_generator
+from evaluation_playbook.qdrant_wrapper import (
+    PAYLOAD_INDEXES,
+    QdrantClientWrapper,
+    get_qdrant_wrapper,
+)
+from evaluation_playbook.rag.dedup_index import (
+    DeduplicationIndex,
+    get_dedup_index_path,
+)
+from evaluation_playbook.rag.deduplicate_documents import (
+    DeduplicationStats,
+    compute_signatures,
+    deduplicate_documents,
+    shutdown_signature_pool,
+)
+from evaluation_playbook.rag.embedding_writer import EmbeddingWriter
+from evaluation_playbook.rag.extract import (
+    get_extraction_generator,
+    get_streaming_extraction_generator,
+)
+from evaluation_playbook.rag.manifest import (
+    IngestionManifest,
+    PhilosopherManifestEntry,
+    SourceHasher,
+    assign_chunk_ids,
+    compute_fingerprint,
+)
+from evaluation_playbook.rag.online_deduplicator import OnlineDeduplicator
+from evaluation_playbook.rag.parent_documents import (
+    ParentDocumentStore,
+    assign_parent_ids,
+    get_parent_store_path,
+)
 from evaluation_playbook.rag.splitters import Splitter, get_splitter
 
 
@@ -17,26 +50,47 @@ class LongTermMemoryCreator:
 
     Attributes:
         database_client (QdrantClientWrapper): Client for managing Qdrant database operations.
-        vector_store (QdrantVectorStore): Vector store for document storage and retrieval.
+        writer (EmbeddingWriter): Writer embedding the chunks and upserting them into Qdrant.
         splitter (Splitter): Text splitter for chunking documents.
+        parent_splitter (Splitter | None): Splitter cutting the parent passages the chunks
+            are split from, for parent retrieval. None to split documents directly.
+        streaming (bool): Whether to extract and split documents section by section.
+        global_deduplication (bool): Whether to deduplicate chunks across philosophers and runs.
+        deduplication_stats (DeduplicationStats): Chunks removed by each deduplication stage.
     """
 
     def __init__(
         self,
         database_client: QdrantClientWrapper,
-        vector_store: QdrantVectorStore,
+        writer: EmbeddingWriter,
         splitter: Splitter,
+        streaming: bool = False,
+        global_deduplication: bool = False,
+        parent_splitter: Splitter | None = None,
     ) -> None:
         """Initialize the LongTermMemoryCreator.
 
         Args:
             database_client (QdrantClientWrapper): Client for Qdrant operations.
-            vector_store (QdrantVectorStore): Vector store instance.
+            writer (EmbeddingWriter): Batched, concurrent embedding writer.
             splitter (Splitter): Text splitter instance.
+            streaming (bool, optional): Whether to extract and split documents section
+                by section instead of whole articles, deduplicating the chunks as they
+                are split. Defaults to False.
+            global_deduplication (bool, optional): Whether to deduplicate chunks against
+                everything already stored, across philosophers and runs, instead of
+                only within each philosopher. Defaults to False.
+            parent_splitter (Splitter | None, optional): Splitter cutting documents into
+                parent passages, stored in a local docstore, before they are split
+                into chunks. Defaults to None.
         """
         self.database_client = database_client
-        self.vector_store = vector_store
+        self.writer = writer
         self.splitter = splitter
+        self.streaming = streaming
+        self.global_deduplication = global_deduplication
+        self.parent_splitter = parent_splitter
+        self.deduplication_stats = DeduplicationStats()
 
     @classmethod
     def build_from_settings(cls) -> "LongTermMemoryCreator":
@@ -47,23 +101,57 @@ class LongTermMemoryCreator:
                 for chunk size and vector store configuration.
         """
 
-        qdrant_client = QdrantClientWrapper()
+        qdrant_client = get_qdrant_wrapper()
         splitter = get_splitter(chunk_size=settings.RAG_CHUNK_SIZE)
+        parent_splitter = (
+            get_splitter(chunk_size=settings.RAG_PARENT_CHUNK_SIZE)
+            if settings.RAG_RETRIEVAL_MODE == "parent"
+            else None
+        )
 
-        return cls(qdrant_client, qdrant_client.vector_store, splitter)
+        return cls(
+            qdrant_client,
+            EmbeddingWriter(qdrant_client.client, qdrant_client.embeddings),
+            splitter,
+            streaming=settings.RAG_STREAMING_EXTRACTION,
+            global_deduplication=settings.RAG_GLOBAL_DEDUPLICATION,
+            parent_splitter=parent_splitter,
+        )
 
-    def __call__(self, philosophers: list[PhilosopherExtract]) -> None:
+    def __call__(
+        self, philosophers: list[PhilosopherExtract], incremental: bool = False
+    ) -> None:
         """Process and store philosopher extracts in the vector store.
 
         Processes a list of philosopher extracts by:
-        1. Clearing existing collection to avoid duplicates
+        1. Creating a new shadow collection version (full rebuilds only)
         2. Extracting documents from philosophers
         3. Chunking documents using the configured splitter
-        4. Deduplicating chunks with a similarity threshold
-        5. Adding processed documents to the vector store
+        4. Deduplicating chunks with a similarity threshold, within the philosopher
+           (on the fly in streaming mode) and, with global deduplication, against
+           everything already stored
+        5. Embedding and upserting the new chunks in concurrent batches under deterministic IDs
+        6. Atomically serving the shadow collection once complete (full rebuilds only)
+
+        In incremental mode the served collection is updated in place. Philosophers
+        whose sources didn't change since the last run are skipped, only chunks that
+        are not stored yet are embedded, and chunks that vanished from the sources
+        are deleted, as are all the chunks of the philosophers that are not in
+        `philosophers` anymore.
+
+        With global deduplication, a chunk that duplicates a point already stored for
+        another philosopher is not embedded again: the philosopher is added to the
+        `metadata.philosopher_ids` of that point instead. A point is only deleted once
+        no philosopher references it anymore.
+
+        With sharding, every philosopher's chunks are written to the shard keyed by
+        its ID, and a shared point is copied into the shard of every philosopher
+        referencing it.
 
         Args:
             philosophers (list[PhilosopherExtract]): List of philosopher extracts to process.
+            incremental (bool, optional): Whether to update the collection in place
+                instead of rebuilding it from scratch. Defaults to False.
         """
 
         if len(philosophers) == 0:
@@ -71,13 +159,485 @@ class LongTermMemoryCreator:
 
             return
 
-        # Clear the long term memory collection to avoid duplicates when re-running the script.
-        self.database_client.clear_collection()
+        manifest = self.load_manifest() if incremental else None
+        rebuild = manifest is None
+        if rebuild:
+            # Build into a shadow collection, so the served one stays complete until the swap.
+            collection_name = self.database_client.create_shadow_collection()
+            manifest = IngestionManifest(
+                fingerprint=self.fingerprint, collection_name=collection_name
+            )
+        else:
+            collection_name = self.database_client.collection_name
+
+        if self.streaming:
+            extraction_generator = get_streaming_extraction_generator(philosophers)
+        else:
+            extraction_generator = get_extraction_generator(philosophers)
+
+        dedup_index = (
+            self.open_dedup_index(manifest.collection_name)
+            if self.global_deduplication
+            else None
+        )
+        parent_store = (
+            ParentDocumentStore(get_parent_store_path(manifest.collection_name))
+            if self.parent_splitter is not None
+            else None
+        )
+        try:
+            for philosopher, docs in extraction_generator:
+                # Hash the sources before splitting them, so the philosophers whose
+                # sources didn't change are skipped without being split and deduplicated.
+                source_hasher = SourceHasher()
+                docs = list(source_hasher.wrap(docs))
+
+                previous_entry = manifest.philosophers.get(philosopher.id)
+                if (
+                    previous_entry is not None
+                    and previous_entry.source_hash == source_hasher.hexdigest
+                ):
+                    logger.info(
+                        f"Sources of `{philosopher.id}` didn't change. Skipping it."
+                    )
+
+                    continue
+
+                if self.streaming:
+                    # Drop duplicates as the chunks are split, so they are never held in memory.
+                    deduplicator = OnlineDeduplicator(
+                        threshold=settings.RAG_DEDUPLICATION_THRESHOLD
+                    )
+                    with deduplicator:
+                        chunked_docs = list(
+                            deduplicator.filter(
+                                self.iter_chunks(docs, parent_store=parent_store)
+                            )
+                        )
+                    logger.info(
+                        f"`{philosopher.id}`: deduplicated {deduplicator.stats}."
+                    )
+                    self.deduplication_stats.add(deduplicator.stats)
+                else:
+                    chunked_docs = deduplicate_documents(
+                        self.split(docs, parent_store=parent_store),
+                        threshold=settings.RAG_DEDUPLICATION_THRESHOLD,
+                        stats=self.deduplication_stats,
+                    )
+                chunked_docs = assign_chunk_ids(chunked_docs)
+                for doc in chunked_docs:
+                    doc.metadata["philosopher_ids"] = [philosopher.id]
+
+                if previous_entry is None:
+                    previous_entry = PhilosopherManifestEntry(source_hash="")
+                chunk_ids = [doc.id for doc in chunked_docs]
+                current_chunk_ids = set(chunk_ids)
+                stored_chunk_ids = set(previous_entry.chunk_ids)
+                new_docs = [
+                    doc for doc in chunked_docs if doc.id not in stored_chunk_ids
+                ]
+                vanished_point_ids = [
+                    previous_entry.get_point_id(chunk_id)
+                    for chunk_id in stored_chunk_ids - current_chunk_ids
+                ]
+                references = {
+                    chunk_id: point_id
+                    for chunk_id, point_id in previous_entry.references.items()
+                    if chunk_id in current_chunk_ids
+                }
+
+                logger.info(
+                    f"`{philosopher.id}`: {len(new_docs)} new, {len(vanished_point_ids)} vanished, "
+                    f"{len(chunk_ids) - len(new_docs)} unchanged chunks."
+                )
+
+                shard_key = self.database_client.get_shard_key(
+                    philosopher.id, collection_name
+                )
+                if shard_key is not None:
+                    self.database_client.ensure_shard_key(
+                        shard_key, manifest.collection_name
+                    )
+
+                if dedup_index is None:
+                    if len(new_docs) > 0:
+                        self.writer.write(
+                            new_docs,
+                            collection_name=collection_name,
+                            shard_key=shard_key,
+                        )
+                    if len(vanished_point_ids) > 0:
+                        self.database_client.delete_points(
+                            vanished_point_ids,
+                            collection_name=collection_name,
+                            shard_key=shard_key,
+                        )
+                else:
+                    self.release_points(
+                        dedup_index, vanished_point_ids, philosopher.id, collection_name
+                    )
+                    references.update(
+                        self.store_unique_chunks(
+                            dedup_index, new_docs, philosopher.id, collection_name
+                        )
+                    )
+
+                manifest.philosophers[philosopher.id] = PhilosopherManifestEntry(
+                    source_hash=source_hasher.hexdigest,
+                    chunk_ids=chunk_ids,
+                    references=references,
+                )
+                if not rebuild:
+                    manifest.save(settings.RAG_MANIFEST_FILE_PATH)
+
+            removed_philosopher_ids = sorted(
+                set(manifest.philosophers)
+                - {philosopher.id for philosopher in philosophers}
+            )
+            if len(removed_philosopher_ids) > 0:
+                self.remove_philosophers(
+                    manifest, removed_philosopher_ids, dedup_index, collection_name
+                )
+                manifest.save(settings.RAG_MANIFEST_FILE_PATH)
+        except Exception:
+            if rebuild:
+                logger.error(
+                    f"Long-term memory rebuild failed. Dropping shadow collection {collection_name}."
+                )
+                self.database_client.client.delete_collection(
+                    collection_name=collection_name
+                )
+                self.prune_version_stores()
+            raise
+        finally:
+            if dedup_index is not None:
+                dedup_index.close()
+            if parent_store is not None:
+                parent_store.close()
+            self.writer.close()
+            shutdown_signature_pool()
+
+        if rebuild:
+            self.database_client.swap_alias(collection_name)
+            self.database_client.prune_versions()
+            self.prune_version_stores()
+            manifest.save(settings.RAG_MANIFEST_FILE_PATH)
+
+        logger.info(f"Long-term memory deduplication: {self.deduplication_stats}")
+        logger.info(f"Long-term memory ingestion throughput: {self.writer.stats}")
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the configuration that determines the stored chunks and vectors."""
+
+        return compute_fingerprint(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            embedding_model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+            embedding_provider=settings.RAG_EMBEDDING_PROVIDER,
+            embedding_model_dim=self.database_client.embedding_dim,
+            embedding_quantize_int8=settings.RAG_EMBEDDING_PROVIDER == "local"
+            and settings.RAG_LOCAL_EMBEDDING_QUANTIZE_INT8,
+            chunk_size=settings.RAG_CHUNK_SIZE,
+            splitter=settings.RAG_SPLITTER,
+            streaming=self.streaming,
+            deduplication_threshold=settings.RAG_DEDUPLICATION_THRESHOLD,
+            global_deduplication=self.global_deduplication,
+            parent_chunk_size=settings.RAG_PARENT_CHUNK_SIZE
+            if self.parent_splitter is not None
+            else None,
+            payload_indexes=sorted(PAYLOAD_INDEXES),
+            vector_index={
+                "hnsw_m": settings.QDRANT_HNSW_M,
+                "hnsw_ef_construct": settings.QDRANT_HNSW_EF_CONSTRUCT,
+                "quantization": settings.QDRANT_QUANTIZATION,
+                "on_disk_vectors": settings.QDRANT_ON_DISK_VECTORS,
+                "on_disk_payload": settings.QDRANT_ON_DISK_PAYLOAD,
+                "sharding": settings.QDRANT_SHARDING,
+            },
+        )
+
+    def load_manifest(self) -> IngestionManifest | None:
+        """Load the ingestion manifest of the previous run, if it can be trusted.
+
+        The manifest is discarded if it was built with a different pipeline
+        configuration, for another collection version than the served one (e.g.
+        after a rollback) or if the collection is empty. In all these cases the
+        long-term memory has to be rebuilt.
+
+        Returns:
+            IngestionManifest | None: The manifest to diff the current run against,
+                or None if a full rebuild is required.
+        """
+
+        manifest = IngestionManifest.load(settings.RAG_MANIFEST_FILE_PATH)
+        if manifest.fingerprint != self.fingerprint:
+            logger.warning(
+                "The long-term memory was built with a different configuration. Falling back to a full rebuild."
+            )
+
+            return None
+
+        if manifest.collection_name != self.database_client.get_active_collection():
+            logger.warning(
+                "The served long-term memory version was not built by the last run. Falling back to a full rebuild."
+            )
+
+            return None
+
+        if (
+            self.global_deduplication
+            and not get_dedup_index_path(manifest.collection_name).exists()
+        ):
+            logger.warning(
+                "The deduplication index of the long-term memory is missing. Falling back to a full rebuild."
+            )
+
+            return None
+
+        if (
+            self.parent_splitter is not None
+            and not get_parent_store_path(manifest.collection_name).exists()
+        ):
+            logger.warning(
+                "The parent document store of the long-term memory is missing. Falling back to a full rebuild."
+            )
+
+            return None
+
+        if self.database_client.count() == 0:
+            logger.warning(
+                "The long-term memory collection is empty. Falling back to a full rebuild."
+            )
+
+            return None
+
+        return manifest
+
+    def open_dedup_index(self, collection_name: str) -> DeduplicationIndex:
+        """Open the global deduplication index of a collection version.
+
+        Args:
+            collection_name (str): Versioned collection the index describes.
+
+        Returns:
+            DeduplicationIndex: The index, created empty if it doesn't exist yet.
+        """
+
+        return DeduplicationIndex(
+            get_dedup_index_path(collection_name),
+            threshold=settings.RAG_DEDUPLICATION_THRESHOLD,
+        )
+
+    def prune_version_stores(self) -> None:
+        """Delete the deduplication indexes and parent stores of the collection versions that are gone."""
+
+        versions = self.database_client.list_versions()
+        DeduplicationIndex.prune(
+            settings.RAG_DEDUPLICATION_INDEX_DIR, keep_collection_names=versions
+        )
+        ParentDocumentStore.prune(
+            settings.RAG_PARENT_DOCSTORE_DIR, keep_collection_names=versions
+        )
 
-        extraction_generator = get_extraction_generator(philosophers)
-        for _, docs in extraction_generator:
-            chunked_docs = self.splitter.split_documents(docs)
+    def store_unique_chunks(
+        self,
+        dedup_index: DeduplicationIndex,
+        docs: list[Document],
+        philosopher_id: str,
+        collection_name: str,
+    ) -> dict[str, str]:
+        """Store the chunks that don't duplicate a stored point, and reference the others.
+
+        Args:
+            dedup_index (DeduplicationIndex): Global index of the stored points.
+            docs (list[Document]): New chunks of the philosopher.
+            philosopher_id (str): ID of the philosopher.
+            collection_name (str): Collection (or alias) to write to.
+
+        Returns:
+            dict[str, str]: The IDs of the duplicate chunks, mapped to the ID of the
+                stored point they reference.
+        """
+
+        if len(docs) == 0:
+            return {}
+
+        signatures = compute_signatures(
+            [doc.page_content for doc in docs],
+            num_workers=settings.RAG_DEDUPLICATION_NUM_WORKERS,
+        )
+        matches = dedup_index.find_matches(signatures)
+
+        shard_key = self.database_client.get_shard_key(philosopher_id, collection_name)
+        unique_positions = [i for i, match in enumerate(matches) if match is None]
+        if len(unique_positions) > 0:
+            unique_docs = [docs[i] for i in unique_positions]
+            self.writer.write(
+                unique_docs, collection_name=collection_name, shard_key=shard_key
+            )
+            dedup_index.add(
+                [doc.id for doc in unique_docs],
+                signatures[unique_positions],
+                philosopher_id,
+            )
+
+        references = {
+            doc.id: match for doc, match in zip(docs, matches) if match is not None
+        }
+        if len(references) > 0:
+            logger.info(
+                f"`{philosopher_id}`: {len(references)} chunks duplicate stored points. Referencing them instead of embedding them."
+            )
+            if shard_key is not None:
+                self.database_client.copy_points(
+                    list(set(references.values())), shard_key, collection_name
+                )
+            self.database_client.set_philosopher_ids(
+                {
+                    point_id: dedup_index.add_reference(point_id, philosopher_id)
+                    for point_id in set(references.values())
+                },
+                collection_name=collection_name,
+            )
+
+        return references
+
+    def release_points(
+        self,
+        dedup_index: DeduplicationIndex,
+        point_ids: list[str],
+        philosopher_id: str,
+        collection_name: str,
+    ) -> None:
+        """Drop a philosopher's references to points, deleting the unreferenced ones.
+
+        Args:
+            dedup_index (DeduplicationIndex): Global index of the stored points.
+            point_ids (list[str]): Points the philosopher no longer references.
+            philosopher_id (str): ID of the philosopher.
+            collection_name (str): Collection (or alias) to update.
+        """
+
+        unreferenced_point_ids, philosopher_ids = [], {}
+        for point_id in point_ids:
+            references = dedup_index.remove_reference(point_id, philosopher_id)
+            if len(references) > 0:
+                philosopher_ids[point_id] = references
+            else:
+                unreferenced_point_ids.append(point_id)
+
+        if len(unreferenced_point_ids) > 0:
+            self.database_client.delete_points(
+                unreferenced_point_ids, collection_name=collection_name
+            )
+        shard_key = self.database_client.get_shard_key(philosopher_id, collection_name)
+        if shard_key is not None and len(philosopher_ids) > 0:
+            # Other philosophers still reference these points: only drop this
+            # philosopher's copies.
+            self.database_client.delete_points(
+                list(philosopher_ids),
+                collection_name=collection_name,
+                shard_key=shard_key,
+            )
+        self.database_client.set_philosopher_ids(
+            philosopher_ids, collection_name=collection_name
+        )
+
+    def remove_philosophers(
+        self,
+        manifest: IngestionManifest,
+        philosopher_ids: list[str],
+        dedup_index: DeduplicationIndex | None,
+        collection_name: str,
+    ) -> None:
+        """Delete the chunks of philosophers and drop their manifest entries.
+
+        With global deduplication, the points shared with other philosophers are
+        kept and only the references of the removed philosophers are dropped.
+
+        Args:
+            manifest (IngestionManifest): Manifest of the stored chunks, updated in place.
+            philosopher_ids (list[str]): IDs of the philosophers to remove.
+            dedup_index (DeduplicationIndex | None): Global index of the stored points,
+                or None without global deduplication.
+            collection_name (str): Collection (or alias) to update.
+        """
+
+        for philosopher_id in philosopher_ids:
+            entry = manifest.philosophers.pop(philosopher_id)
+            point_ids = list(
+                dict.fromkeys(
+                    entry.get_point_id(chunk_id) for chunk_id in entry.chunk_ids
+                )
+            )
+            logger.info(
+                f"`{philosopher_id}` was removed: dropping its {len(point_ids)} chunks."
+            )
+            if len(point_ids) == 0:
+                continue
+
+            if dedup_index is None:
+                self.database_client.delete_points(
+                    point_ids,
+                    collection_name=collection_name,
+                    shard_key=self.database_client.get_shard_key(
+                        philosopher_id, collection_name
+                    ),
+                )
+            else:
+                self.release_points(
+                    dedup_index, point_ids, philosopher_id, collection_name
+                )
+
+    def split(
+        self,
+        docs: Iterable[Document],
+        parent_store: ParentDocumentStore | None = None,
+    ) -> list[Document]:
+        """Split documents into chunks, a small batch of documents at a time.
+
+        Feeding the splitter a few documents at a time lets `docs` be a lazy iterator,
+        so only the documents being split have to be held in memory next to their
+        chunks, while a batch-aware splitter can still tokenize them in parallel.
+
+        Args:
+            docs (Iterable[Document]): Documents (or section-sized fragments) to split.
+            parent_store (ParentDocumentStore | None, optional): Docstore receiving the
+                parent passages, if the creator has a parent splitter. Defaults to None.
+
+        Returns:
+            list[Document]: The chunks of all the documents.
+        """
+
+        return list(self.iter_chunks(docs, parent_store=parent_store))
+
+    def iter_chunks(
+        self,
+        docs: Iterable[Document],
+        batch_size: int = 32,
+        parent_store: ParentDocumentStore | None = None,
+    ) -> Iterator[Document]:
+        """Lazily split documents into chunks, a small batch of documents at a time.
+
+        With a parent splitter, documents are first cut into parent passages. The
+        passages are saved to `parent_store` and split into chunks, which inherit
+        the `parent_id` of their passage.
+
+        Args:
+            docs (Iterable[Document]): Documents (or section-sized fragments) to split.
+            batch_size (int, optional): Number of documents split at once. Defaults to 32.
+            parent_store (ParentDocumentStore | None, optional): Docstore receiving the
+                parent passages. Defaults to None.
+
+        Yields:
+            Document: The chunks of the documents, in order.
+        """
 
-            chunked_docs = deduplicate_documents(chunked_docs, threshold=0.5)
+        docs = iter(docs)
+        while batch := list(itertools.islice(docs, batch_size)):
+            if self.parent_splitter is not None:
+                batch = assign_parent_ids(self.parent_splitter.split_documents(batch))
+                if parent_store is not None:
+                    parent_store.mset([(parent.id, parent) for parent in batch])
 
-            self.vector_store.add_documents(chunked_docs)
+            yield from self.splitter.split_documents(batch)
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
+from loguru import logger
+from pydantic import BaseModel, Field
+
+# Namespace of the deterministic Qdrant point IDs. Changing it re-keys every chunk.
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c3f5e-4a8b-4d0e-9f49-5b7d2c0e8a11")
+
+
+class PhilosopherManifestEntry(BaseModel):
+    """What was ingested for a single philosopher during the last run.
+
+    Args:
+        source_hash (str): Hash of all the extracted source documents of the philosopher.
+        chunk_ids (list[str]): IDs of the chunks of the philosopher.
+        references (dict[str, str]): Chunks that were not stored because they duplicate
+            a point of another philosopher, mapped to the ID of that point.
+    """
+
+    source_hash: str = Field(description="Hash of the extracted source documents")
+    chunk_ids: list[str] = Field(
+        default_factory=list, description="IDs of the chunks of the philosopher"
+    )
+    references: dict[str, str] = Field(
+        default_factory=dict,
+        description="Point IDs of the chunks stored under another philosopher",
+    )
+
+    def get_point_id(self, chunk_id: str) -> str:
+        """Get the ID of the Qdrant point holding a chunk of the philosopher.
+
+        Args:
+            chunk_id (str): ID of the chunk.
+
+        Returns:
+            str: The chunk ID itself, or the ID of the duplicate point it references.
+        """
+
+        return self.references.get(chunk_id, chunk_id)
+
+
+class IngestionManifest(BaseModel):
+    """Record of what is currently stored in the long-term memory collection.
+
+    The manifest is what makes incremental rebuilds possible: a philosopher whose
+    source hash didn't change is skipped, and for the others only the chunks whose
+    IDs are not in the manifest yet are embedded.
+
+    Args:
+        fingerprint (str): Hash of the pipeline configuration (embedding model, chunk
+            size, ...) the stored chunks were built with.
+        collection_name (str): Versioned Qdrant collection the chunks are stored in.
+        philosophers (dict[str, PhilosopherManifestEntry]): Entries keyed by philosopher ID.
+    """
+
+    fingerprint: str = Field(default="", description="Pipeline configuration hash")
+    collection_name: str = Field(
+        default="", description="Versioned collection holding the chunks"
+    )
+    philosophers: dict[str, PhilosopherManifestEntry] = Field(
+        default_factory=dict, description="Manifest entries keyed by philosopher ID"
+    )
+
+    @classmethod
+    def load(cls, path: Path) -> "IngestionManifest":
+        """Load the manifest from disk, returning an empty one if it doesn't exist.
+
+        Args:
+            path (Path): Path to the manifest JSON file.
+
+        Returns:
+            IngestionManifest: The loaded (or empty) manifest.
+        """
+
+        if not path.exists():
+            return cls()
+
+        try:
+            return cls.model_validate_json(path.read_text(encoding="utf-8"))
+        except ValueError:
+            logger.warning(f"Invalid ingestion manifest at `{path}`. Ignoring it.")
+
+            return cls()
+
+    def save(self, path: Path) -> None:
+        """Atomically write the manifest to disk.
+
+        Args:
+            path (Path): Path to the manifest JSON file.
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.model_dump_json(indent=2))
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+
+def compute_fingerprint(**config) -> str:
+    """Hash the pipeline configuration that determines the stored chunks and vectors.
+
+    Args:
+        **config: JSON-serializable configuration values.
+
+    Returns:
+        str: Hex digest of the configuration.
+    """
+
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class SourceHasher:
+    """Incrementally hash documents while they flow through a (lazy) iterator.
+
+    Attributes:
+        hexdigest (str): Hash of all the documents seen so far.
+    """
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+
+    def wrap(self, docs: Iterable[Document]) -> Iterator[Document]:
+        """Yield the documents unchanged, hashing their source and content on the way.
+
+        Args:
+            docs (Iterable[Document]): Documents to hash.
+
+        Yields:
+            Document: The same documents.
+        """
+
+        for doc in docs:
+            self._hash.update(doc.metadata.get("source", "").encode("utf-8"))
+            self._hash.update(b"\0")
+            self._hash.update(doc.page_content.encode("utf-8"))
+            self._hash.update(b"\0")
+
+            yield doc
+
+    @property
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def assign_chunk_ids(chunks: list[Document]) -> list[Document]:
+    """Give every chunk a deterministic ID derived from its philosopher, source and content.
+
+    The enclosing parent passage and section path are part of the identity too, so
+    a chunk whose text didn't change but whose parent or section did is stored again
+    with the new metadata by incremental runs, instead of being skipped as unchanged.
+
+    The ID and the content hash are stored in the chunk metadata as `chunk_id` and
+    `chunk_hash`. Chunks that end up with the same ID are identical, so only the first
+    one is kept.
+
+    Args:
+        chunks (list[Document]): Chunks to identify.
+
+    Returns:
+        list[Document]: The chunks with unique IDs, in their original order.
+    """
+
+    unique_chunks = {}
+    for chunk in chunks:
+        chunk_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        chunk_id = str(
+            uuid.uuid5(
+                CHUNK_ID_NAMESPACE,
+                "\n".join(
+                    [
+                        chunk.metadata.get("philosopher_id", ""),
+                        chunk.metadata.get("source", ""),
+                        chunk_hash,
+                        chunk.metadata.get("parent_id") or "",
+                        chunk.metadata.get("section_path") or "",
+                    ]
+                ),
+            )
+        )
+
+        chunk.id = chunk_id
+        chunk.metadata["chunk_id"] = chunk_id
+        chunk.metadata["chunk_hash"] = chunk_hash
+        unique_chunks.setdefault(chunk_id, chunk)
+
+    return list(unique_chunks.values())
@@ -0,0 +1,276 @@
+import itertools
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.rag.deduplicate_documents import (
+    DeduplicationStats,
+    compute_signatures,
+    get_lsh_params,
+    hash_normalized_text,
+)
+
+
+class OnlineDeduplicator:
+    """Deduplicate a stream of documents one at a time, against everything seen so far.
+
+    Unlike `deduplicate_documents`, which needs the whole list up front, the
+    deduplicator keeps an incremental index of the documents it accepted and decides
+    on each new document as it arrives: it is dropped if its normalized text was
+    already seen, or if its MinHash signature shares an LSH band with an accepted
+    signature at least `threshold` similar. The first document of a group of
+    duplicates is therefore the one kept, not the longest one.
+
+    The in-memory index holds at most `max_in_memory` documents. Once full, it is
+    spilled to a temporary SQLite database and emptied, so memory stays flat
+    whatever the size of the stream. Without spilling, the in-memory index is
+    dropped instead and duplicates of documents seen before that are missed.
+
+    Attributes:
+        threshold (float): Jaccard similarity from which documents are duplicates.
+        num_perm (int): Number of MinHash permutations of the signatures.
+        max_in_memory (int): Number of documents indexed in memory before spilling.
+        spill (bool): Whether to spill the in-memory index to disk once full.
+        batch_size (int): Number of documents signed at once by `filter`.
+        stats (DeduplicationStats): Counters of the documents seen and removed.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 64,
+        max_in_memory: int = settings.RAG_ONLINE_DEDUPLICATION_MAX_IN_MEMORY,
+        spill: bool = settings.RAG_ONLINE_DEDUPLICATION_SPILL,
+        spill_dir: Path | None = None,
+        batch_size: int = 256,
+        stats: DeduplicationStats | None = None,
+    ) -> None:
+        """Initialize the OnlineDeduplicator.
+
+        Args:
+            threshold (float, optional): Jaccard similarity from which documents are
+                duplicates. Defaults to 0.7.
+            num_perm (int, optional): Number of MinHash permutations. Defaults to 64.
+            max_in_memory (int, optional): Number of documents indexed in memory
+                before spilling. Defaults to settings.RAG_ONLINE_DEDUPLICATION_MAX_IN_MEMORY.
+            spill (bool, optional): Whether to spill the in-memory index to disk once
+                full instead of dropping it. Defaults to settings.RAG_ONLINE_DEDUPLICATION_SPILL.
+            spill_dir (Path | None, optional): Directory of the temporary spill
+                database. Defaults to the system temporary directory.
+            batch_size (int, optional): Number of documents signed at once by
+                `filter`. Defaults to 256.
+            stats (DeduplicationStats | None, optional): Counters to add to, e.g.
+                shared by several deduplicators. Defaults to new counters.
+        """
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_in_memory = max_in_memory
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self.batch_size = batch_size
+        self.stats = stats if stats is not None else DeduplicationStats()
+        self.num_bands, self.rows_per_band = get_lsh_params(threshold, num_perm)
+
+        self._text_hashes: set[bytes] = set()
+        self._signatures: list[np.ndarray] = []
+        self._buckets: list[dict[bytes, list[int]]] = [
+            {} for _ in range(self.num_bands)
+        ]
+        self._num_spilled = 0
+        self._spill_path: Path | None = None
+        self._spill_connection: sqlite3.Connection | None = None
+
+    def __enter__(self) -> "OnlineDeduplicator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, doc: Document) -> bool:
+        """Index a document if it doesn't duplicate one already seen.
+
+        Args:
+            doc (Document): Document to check.
+
+        Returns:
+            bool: True if the document is novel and was indexed, False if it is a
+                duplicate and should be dropped.
+        """
+
+        signature = compute_signatures([doc.page_content], num_perm=self.num_perm)[0]
+
+        return self._add(doc.page_content, signature)
+
+    def filter(self, docs: Iterable[Document]) -> Iterator[Document]:
+        """Lazily yield the novel documents of a stream.
+
+        Documents are pulled and signed `batch_size` at a time, then checked one by
+        one in order, so a duplicate of an earlier document of the same batch is
+        dropped too.
+
+        Args:
+            docs (Iterable[Document]): Documents to deduplicate, possibly a lazy iterator.
+
+        Yields:
+            Document: The documents that don't duplicate an earlier one.
+        """
+
+        docs = iter(docs)
+        while batch := list(itertools.islice(docs, self.batch_size)):
+            signatures = compute_signatures(
+                [doc.page_content for doc in batch], num_perm=self.num_perm
+            )
+            for doc, signature in zip(batch, signatures):
+                if self._add(doc.page_content, signature):
+                    yield doc
+
+    def close(self) -> None:
+        """Close and delete the spill database, if one was created."""
+
+        if self._spill_connection is not None:
+            self._spill_connection.close()
+            self._spill_connection = None
+        if self._spill_path is not None:
+            for path in self._spill_path.parent.glob(f"{self._spill_path.name}*"):
+                path.unlink(missing_ok=True)
+            self._spill_path = None
+
+    def _add(self, text: str, signature: np.ndarray) -> bool:
+        self.stats.documents += 1
+
+        text_hash = hash_normalized_text(text)
+        if self._has_text_hash(text_hash):
+            self.stats.exact_duplicates += 1
+
+            return False
+
+        band_keys = [
+            signature[band * self.rows_per_band : (band + 1) * self.rows_per_band]
+            .astype(np.uint32)
+            .tobytes()
+            for band in range(self.num_bands)
+        ]
+        if self._has_near_duplicate(signature, band_keys):
+            self.stats.near_duplicates += 1
+
+            return False
+
+        if len(self._signatures) >= self.max_in_memory:
+            self._flush()
+
+        position = len(self._signatures)
+        self._text_hashes.add(text_hash)
+        self._signatures.append(signature)
+        for buckets, key in zip(self._buckets, band_keys):
+            buckets.setdefault(key, []).append(position)
+
+        return True
+
+    def _has_text_hash(self, text_hash: bytes) -> bool:
+        if text_hash in self._text_hashes:
+            return True
+        if self._spill_connection is None:
+            return False
+
+        return (
+            self._spill_connection.execute(
+                "SELECT 1 FROM text_hashes WHERE text_hash = ?", (text_hash,)
+            ).fetchone()
+            is not None
+        )
+
+    def _has_near_duplicate(
+        self, signature: np.ndarray, band_keys: list[bytes]
+    ) -> bool:
+        positions = {
+            position
+            for buckets, key in zip(self._buckets, band_keys)
+            for position in buckets.get(key, ())
+        }
+        candidates = [self._signatures[position] for position in positions]
+
+        if self._spill_connection is not None:
+            conditions = " OR ".join(["(band = ? AND key = ?)"] * self.num_bands)
+            rows = self._spill_connection.execute(
+                "SELECT signature FROM signatures WHERE id IN "
+                f"(SELECT id FROM bands WHERE {conditions})",
+                [value for band, key in enumerate(band_keys) for value in (band, key)],
+            ).fetchall()
+            candidates.extend(np.frombuffer(blob, dtype=np.uint32) for (blob,) in rows)
+
+        if len(candidates) == 0:
+            return False
+
+        similarities = (np.stack(candidates) == signature).mean(axis=1)
+
+        return bool((similarities >= self.threshold).any())
+
+    def _flush(self) -> None:
+        if not self.spill:
+            logger.debug(
+                f"Online deduplication index is full ({self.max_in_memory} documents). Dropping it."
+            )
+        else:
+            connection = self._get_spill_connection()
+            ids = range(self._num_spilled, self._num_spilled + len(self._signatures))
+            with connection:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO text_hashes VALUES (?)",
+                    [(text_hash,) for text_hash in self._text_hashes],
+                )
+                connection.executemany(
+                    "INSERT INTO signatures VALUES (?, ?)",
+                    [
+                        (id_, signature.astype(np.uint32).tobytes())
+                        for id_, signature in zip(ids, self._signatures)
+                    ],
+                )
+                connection.executemany(
+                    "INSERT INTO bands VALUES (?, ?, ?)",
+                    [
+                        (band, key, ids[position])
+                        for band, buckets in enumerate(self._buckets)
+                        for key, positions in buckets.items()
+                        for position in positions
+                    ],
+                )
+            self._num_spilled += len(self._signatures)
+            logger.debug(
+                f"Spilled {len(self._signatures)} documents of the online deduplication index to {self._spill_path}."
+            )
+
+        self._text_hashes.clear()
+        self._signatures.clear()
+        for buckets in self._buckets:
+            buckets.clear()
+
+    def _get_spill_connection(self) -> sqlite3.Connection:
+        if self._spill_connection is None:
+            file_descriptor, path = tempfile.mkstemp(
+                prefix="online_dedup_", suffix=".sqlite", dir=self.spill_dir
+            )
+            os.close(file_descriptor)
+            self._spill_path = Path(path)
+            self._spill_connection = sqlite3.connect(self._spill_path)
+            self._spill_connection.executescript(
+                """
+                PRAGMA journal_mode=OFF;
+                PRAGMA synchronous=OFF;
+                CREATE TABLE text_hashes (text_hash BLOB PRIMARY KEY) WITHOUT ROWID;
+                CREATE TABLE signatures (id INTEGER PRIMARY KEY, signature BLOB NOT NULL);
+                CREATE TABLE bands (
+                    band INTEGER NOT NULL, key BLOB NOT NULL, id INTEGER NOT NULL,
+                    PRIMARY KEY (band, key, id)
+                ) WITHOUT ROWID;
+                """
+            )
+
+        return self._spill_connection
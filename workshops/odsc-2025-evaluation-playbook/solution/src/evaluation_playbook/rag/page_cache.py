@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import requests
+from loguru import logger
+
+from evaluation_playbook.config import settings
+
+USER_AGENT = "evaluation-playbook/0.1 (long-term memory ingestion)"
+
+
+class PageNotCachedError(Exception):
+    """Exception raised when a page is requested in offline mode but is not cached."""
+
+    def __init__(self, url: str):
+        self.message = f"Page {url} is not cached and the page cache is offline."
+        super().__init__(self.message)
+
+
+class PageCache:
+    """Content-addressed on-disk cache for raw page bodies fetched over HTTP.
+
+    Page bodies are stored once under the hash of their content, while a small JSON
+    index entry per URL points to the current body together with its HTTP validators.
+    Entries younger than the TTL are served straight from disk. Older entries are
+    revalidated with `If-None-Match` / `If-Modified-Since`, so unchanged pages cost a
+    single 304 round trip. In offline mode every request is served from disk.
+
+    Attributes:
+        cache_dir (Path): Root directory of the cache.
+        ttl_seconds (int): Number of seconds an entry is considered fresh.
+        offline (bool): If True, never touch the network.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl_seconds: int,
+        offline: bool = False,
+        timeout: float = 30.0,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.offline = offline
+        self.timeout = timeout
+
+        self._objects_dir = self.cache_dir / "objects"
+        self._index_dir = self.cache_dir / "index"
+        self._objects_dir.mkdir(parents=True, exist_ok=True)
+        self._index_dir.mkdir(parents=True, exist_ok=True)
+
+        self._local = threading.local()
+
+    def get(self, url: str) -> str:
+        """Return the body of a page, downloading or revalidating it only if needed.
+
+        Args:
+            url (str): URL of the page, including its query string.
+
+        Returns:
+            str: The decoded page body.
+
+        Raises:
+            PageNotCachedError: If the cache is offline and the page is not cached.
+            requests.HTTPError: If the page can't be downloaded and no cached copy exists.
+        """
+
+        entry = self._read_entry(url)
+        if entry is not None and (self.offline or self._is_fresh(entry)):
+            return self._read_body(entry)
+
+        if self.offline:
+            raise PageNotCachedError(url)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self._session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                entry["fetched_at"] = time.time()
+                self._write_entry(url, entry)
+
+                return self._read_body(entry)
+
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if entry is None:
+                raise e
+
+            logger.warning(f"Couldn't revalidate `{url}` ({e}). Serving stale copy.")
+
+            return self._read_body(entry)
+
+        body = response.text
+        self._write_entry(
+            url,
+            {
+                "url": url,
+                "body_hash": self._write_body(body),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            },
+        )
+
+        return body
+
+    def get_json(self, url: str) -> dict:
+        """Return the body of a page decoded as JSON.
+
+        Args:
+            url (str): URL of the JSON resource, including its query string.
+
+        Returns:
+            dict: The decoded JSON body.
+        """
+
+        return json.loads(self.get(url))
+
+    @property
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            self._local.session = session
+
+        return session
+
+    def _is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def _entry_path(self, url: str) -> Path:
+        return (
+            self._index_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+        )
+
+    def _read_entry(self, url: str) -> dict | None:
+        path = self._entry_path(url)
+        if not path.exists():
+            return None
+
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        if not (self._objects_dir / entry["body_hash"]).exists():
+            return None
+
+        return entry
+
+    def _write_entry(self, url: str, entry: dict) -> None:
+        self._atomic_write(self._entry_path(url), json.dumps(entry).encode("utf-8"))
+
+    def _read_body(self, entry: dict) -> str:
+        return (self._objects_dir / entry["body_hash"]).read_text(encoding="utf-8")
+
+    def _write_body(self, body: str) -> str:
+        data = body.encode("utf-8")
+        body_hash = hashlib.sha256(data).hexdigest()
+
+        path = self._objects_dir / body_hash
+        if not path.exists():
+            self._atomic_write(path, data)
+
+        return body_hash
+
+    def _atomic_write(self, path: Path, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+
+@lru_cache(maxsize=1)
+def get_page_cache() -> PageCache:
+    """Get the process-wide page cache configured from the application settings.
+
+    Returns:
+        PageCache: The shared page cache instance.
+    """
+
+    return PageCache(
+        cache_dir=settings.RAG_PAGE_CACHE_DIR,
+        ttl_seconds=settings.RAG_PAGE_CACHE_TTL_SECONDS,
+        offline=settings.RAG_PAGE_CACHE_OFFLINE,
+    )
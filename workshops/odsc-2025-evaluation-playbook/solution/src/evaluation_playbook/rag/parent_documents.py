@@ -0,0 +1,323 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.stores import BaseStore
+from loguru import logger
+from pydantic import ConfigDict, PrivateAttr
+
+from evaluation_playbook.config import settings
+
+# Namespace of the deterministic parent passage IDs.
+PARENT_ID_NAMESPACE = uuid.UUID("0b6f7a52-9d2e-4c71-8f3a-6e1d4b9c2a07")
+
+# Maximum number of bound parameters per SQLite lookup query.
+SQLITE_MAX_VARIABLES = 500
+
+
+class ParentDocumentStore(BaseStore[str, Document]):
+    """Local docstore of the parent passages of the stored chunks, keyed by parent ID.
+
+    There is one store per versioned collection, next to its deduplication index, so
+    it always holds the parents of the chunks of the collection it sits next to.
+
+    Attributes:
+        path (Path): Path to the SQLite database of the store.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS parents ("
+            "parent_id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._lock = threading.Lock()
+
+    def mget(self, keys: Sequence[str]) -> list[Document | None]:
+        """Get parent passages by ID.
+
+        Args:
+            keys (Sequence[str]): Parent IDs.
+
+        Returns:
+            list[Document | None]: The passages, or None for unknown IDs, in order.
+        """
+
+        keys = list(keys)
+        documents = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                batch = keys[start : start + SQLITE_MAX_VARIABLES]
+                rows = self._connection.execute(
+                    "SELECT parent_id, page_content, metadata FROM parents "
+                    f"WHERE parent_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for parent_id, page_content, metadata in rows:
+                    documents[parent_id] = Document(
+                        id=parent_id,
+                        page_content=page_content,
+                        metadata=json.loads(metadata),
+                    )
+
+        return [documents.get(key) for key in keys]
+
+    def mset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
+        """Store parent passages, replacing the ones with the same ID.
+
+        Args:
+            key_value_pairs (Sequence[tuple[str, Document]]): (parent ID, passage) pairs.
+        """
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO parents VALUES (?, ?, ?)",
+                [
+                    (key, doc.page_content, json.dumps(doc.metadata, default=str))
+                    for key, doc in key_value_pairs
+                ],
+            )
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        """Delete parent passages by ID.
+
+        Args:
+            keys (Sequence[str]): Parent IDs.
+        """
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM parents WHERE parent_id = ?", [(key,) for key in keys]
+            )
+
+    def yield_keys(self, *, prefix: str | None = None) -> Iterator[str]:
+        """Iterate over the stored parent IDs.
+
+        Args:
+            prefix (str | None, optional): Only yield the IDs starting with it.
+
+        Yields:
+            str: The parent IDs.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT parent_id FROM parents WHERE parent_id LIKE ?",
+                (f"{prefix or ''}%",),
+            ).fetchall()
+
+        for (parent_id,) in rows:
+            yield parent_id
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+
+        self._connection.close()
+
+    @staticmethod
+    def prune(store_dir: Path, keep_collection_names: list[str]) -> None:
+        """Delete the stores of collection versions that no longer exist.
+
+        Args:
+            store_dir (Path): Directory holding one store per collection version.
+            keep_collection_names (list[str]): Collection versions to keep stores for.
+        """
+
+        for path in Path(store_dir).glob("*.sqlite*"):
+            if path.name.split(".sqlite")[0] not in keep_collection_names:
+                path.unlink(missing_ok=True)
+                logger.info(f"Deleted parent document store {path}.")
+
+
+def get_parent_store_path(collection_name: str) -> Path:
+    """Get the path of the parent document store of a collection version.
+
+    Args:
+        collection_name (str): Versioned collection the store describes.
+
+    Returns:
+        Path: Path to the SQLite database of the store.
+    """
+
+    return settings.RAG_PARENT_DOCSTORE_DIR / f"{collection_name}.sqlite"
+
+
+def assign_parent_ids(parents: list[Document]) -> list[Document]:
+    """Give every parent passage a deterministic ID derived from its source and content.
+
+    The ID is stored as the document ID and as `parent_id` in its metadata, which
+    the splitter copies into every chunk of the passage.
+
+    Args:
+        parents (list[Document]): Parent passages to identify.
+
+    Returns:
+        list[Document]: The same passages.
+    """
+
+    for parent in parents:
+        parent_id = str(
+            uuid.uuid5(
+                PARENT_ID_NAMESPACE,
+                "\n".join(
+                    [
+                        parent.metadata.get("philosopher_id", ""),
+                        parent.metadata.get("source", ""),
+                        hashlib.sha256(parent.page_content.encode("utf-8")).hexdigest(),
+                    ]
+                ),
+            )
+        )
+        parent.id = parent_id
+        parent.metadata["parent_id"] = parent_id
+
+    return parents
+
+
+class ParentDocumentRetriever(BaseRetriever):
+    """Small-to-big retriever: search the small chunks, return their parent passages.
+
+    The child retriever should return several times `k` chunks. Their parent IDs are
+    deduplicated in rank order, and the first `k` parents are loaded from the
+    docstore of the served collection version. A chunk whose parent is unknown, e.g.
+    in a collection built without parents, is returned as is.
+
+    As the served version can change under a long-lived retriever, the docstore is
+    reopened whenever a chunk's parent is missing from it and the served version
+    changed. Chunks without a parent ID never trigger a docstore lookup. The lookups
+    and the reopening are serialised by a lock, so a docstore is never closed while
+    another thread reads it.
+
+    The async path awaits the child retriever and reads the docstore in a worker
+    thread, so it never blocks the event loop.
+
+    Attributes:
+        child_retriever (BaseRetriever): Retriever over the small chunks.
+        get_collection_name (Callable[[], str | None]): Resolves the served collection version.
+        k (int): Maximum number of parent passages returned.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    child_retriever: BaseRetriever
+    get_collection_name: Callable[[], str | None]
+    k: int = 3
+
+    _store: ParentDocumentStore | None = None
+    _store_collection_name: str | None = None
+    _store_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        children = self.child_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+        selected_children = self._select_children(children)
+        parents = self._get_parents(selected_children)
+
+        return self._merge(selected_children, parents)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        children = await self.child_retriever.ainvoke(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+        selected_children = self._select_children(children)
+        parents = await asyncio.to_thread(self._get_parents, selected_children)
+
+        return self._merge(selected_children, parents)
+
+    def _select_children(self, children: list[Document]) -> dict[str, Document]:
+        # The best ranked chunk of each of the first `k` parents, in rank order.
+        selected_children = {}
+        for child in children:
+            parent_id = child.metadata.get("parent_id") or child.id
+            selected_children.setdefault(parent_id, child)
+            if len(selected_children) == self.k:
+                break
+
+        return selected_children
+
+    def _merge(
+        self, selected_children: dict[str, Document], parents: list[Document | None]
+    ) -> list[Document]:
+        return [
+            parent if parent is not None else child
+            for child, parent in zip(selected_children.values(), parents)
+        ]
+
+    def _get_parents(
+        self, selected_children: dict[str, Document]
+    ) -> list[Document | None]:
+        parent_ids = list(selected_children)
+        # Chunks of collection versions built without parents have no parent ID.
+        has_parent = [
+            bool(child.metadata.get("parent_id"))
+            for child in selected_children.values()
+        ]
+        if not any(has_parent):
+            return [None] * len(parent_ids)
+
+        with self._store_lock:
+            parents = self._mget(parent_ids)
+            if all(
+                parent is not None
+                for parent, expected in zip(parents, has_parent)
+                if expected
+            ):
+                return parents
+
+            return self._mget(parent_ids, refresh=True)
+
+    def _mget(
+        self, parent_ids: list[str], refresh: bool = False
+    ) -> list[Document | None]:
+        store = self._get_store(refresh=refresh)
+        if store is None:
+            return [None] * len(parent_ids)
+
+        return store.mget(parent_ids)
+
+    def _get_store(self, refresh: bool = False) -> ParentDocumentStore | None:
+        collection_name = self._store_collection_name
+        if refresh or collection_name is None:
+            collection_name = self.get_collection_name()
+        # The docstore, or its absence, is cached until the served version changes.
+        if collection_name == self._store_collection_name:
+            return self._store
+
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        self._store_collection_name = collection_name
+
+        path = get_parent_store_path(collection_name) if collection_name else None
+        if path is None or not path.exists():
+            logger.warning(
+                f"No parent docstore for Qdrant collection {collection_name}. Returning the retrieved chunks instead of their parents."
+            )
+
+            return None
+        self._store = ParentDocumentStore(path)
+
+        return self._store
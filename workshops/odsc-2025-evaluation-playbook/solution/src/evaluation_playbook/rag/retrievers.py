@@ -1,18 +1,290 @@
-from langchain_core.vectorstores import VectorStoreRetriever
+import asyncio
+import threading
+from typing import Any, Callable
+
+import grpc
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_qdrant import QdrantVectorStore
 from loguru import logger
+from pydantic import ConfigDict, PrivateAttr
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    SearchParams,
+)
+
+from evaluation_playbook.config import RetrievalMode, settings
+from evaluation_playbook.qdrant_wrapper import (
+    get_async_qdrant_client,
+    get_qdrant_wrapper,
+    get_search_params,
+)
+from evaluation_playbook.rag.parent_documents import ParentDocumentRetriever
+
+
+class MMRRetriever(BaseRetriever):
+    """Maximal marginal relevance (MMR) retriever over a Qdrant collection.
+
+    A single Qdrant query fetches the `fetch_k` nearest chunks with their vectors,
+    then `k` of them are selected with `maximal_marginal_relevance`, vectorised over
+    the normalised candidate matrix. Only the selected candidates are turned into
+    documents. Over gRPC, the candidate vectors travel as packed floats instead of
+    JSON number lists.
+
+    The async path embeds the query and awaits the search on the async client of the
+    running event loop, or runs the sync search in a worker thread if there is none.
+
+    As the served version can change under a long-lived retriever, a search routed to
+    a shard that Qdrant rejects because the served version is no longer sharded is
+    retried, and all the next ones are made, with `unsharded_filter` instead. The
+    routing is read and switched under a lock, as the retriever is shared by
+    concurrent conversations.
+
+    Attributes:
+        vector_store (QdrantVectorStore): Vector store providing the embedding model,
+            the searched collection (or alias) and the payload layout.
+        client (QdrantClient): Client the sync searches run on.
+        get_async_client (Callable[[], AsyncQdrantClient] | None): Returns the async
+            client of the running event loop. None to search with `client` instead.
+        k (int): Number of documents returned.
+        fetch_k (int): Number of nearest candidates the documents are selected from.
+        lambda_mult (float): Trade-off between relevance (1) and diversity (0).
+        filter (Filter | None): Filter on the payload of the candidates.
+        search_params (SearchParams | None): HNSW and quantization search parameters.
+        shard_key_selector (str | None): Shard searched in custom-sharded collections.
+        unsharded_filter (Filter | None): Filter replacing `filter` and
+            `shard_key_selector` if the served version turns out not to be sharded.
+        is_sharded (Callable[[], bool] | None): Checks whether the served version is
+            custom-sharded.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_store: QdrantVectorStore
+    client: QdrantClient
+    get_async_client: Callable[[], AsyncQdrantClient] | None = None
+    k: int = 3
+    fetch_k: int = settings.RAG_MMR_FETCH_K
+    lambda_mult: float = settings.RAG_MMR_LAMBDA_MULT
+    filter: Filter | None = None
+    search_params: SearchParams | None = None
+    shard_key_selector: str | None = None
+    unsharded_filter: Filter | None = None
+    is_sharded: Callable[[], bool] | None = None
+
+    _routing_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        embedding = self.vector_store.embeddings.embed_query(query)
+        query_kwargs = self._get_query_kwargs(embedding)
+        try:
+            points = self.client.query_points(**query_kwargs).points
+        except (UnexpectedResponse, grpc.RpcError) as e:
+            if not self._unshard(query_kwargs, e):
+                raise
+            points = self.client.query_points(
+                **self._get_query_kwargs(embedding)
+            ).points
+
+        return self._select(embedding, points)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        embedding = await self.vector_store.embeddings.aembed_query(query)
+        query_kwargs = self._get_query_kwargs(embedding)
+        try:
+            points = await self._aquery_points(query_kwargs)
+        except (UnexpectedResponse, grpc.RpcError) as e:
+            if not await asyncio.to_thread(self._unshard, query_kwargs, e):
+                raise
+            points = await self._aquery_points(self._get_query_kwargs(embedding))
+
+        return self._select(embedding, points)
+
+    async def _aquery_points(self, query_kwargs: dict[str, Any]) -> list:
+        if self.get_async_client is not None:
+            response = await self.get_async_client().query_points(**query_kwargs)
+        else:
+            response = await asyncio.to_thread(self.client.query_points, **query_kwargs)
+
+        return response.points
+
+    def _unshard(self, query_kwargs: dict[str, Any], error: Exception) -> bool:
+        # Route the searches with the filter from now on if the served version was
+        # swapped for a non-sharded one, e.g. by a rollback.
+        if query_kwargs["shard_key_selector"] is None or not is_shard_key_error(error):
+            return False
+
+        with self._routing_lock:
+            if self.shard_key_selector is None:
+                # Another search already switched to the filter.
+                return True
+            if self.is_sharded is None or self.is_sharded():
+                return False
+
+            logger.warning(
+                f"The served Qdrant collection is no longer sharded. Searching shard `{self.shard_key_selector}` with a filter instead."
+            )
+            self.filter, self.shard_key_selector = self.unsharded_filter, None
 
-from evaluation_playbook.qdrant_wrapper import QdrantClientWrapper
+        return True
+
+    def _get_query_kwargs(self, embedding: list[float]) -> dict[str, Any]:
+        with self._routing_lock:
+            query_filter, shard_key_selector = self.filter, self.shard_key_selector
+
+        return dict(
+            collection_name=self.vector_store.collection_name,
+            query=embedding,
+            query_filter=query_filter,
+            search_params=self.search_params,
+            limit=self.fetch_k,
+            with_payload=True,
+            with_vectors=True,
+            using=self.vector_store.vector_name,
+            shard_key_selector=shard_key_selector,
+        )
+
+    def _select(self, embedding: list[float], points: list) -> list[Document]:
+        if len(points) == 0:
+            return []
+
+        candidates = np.array(
+            [
+                point.vector
+                if isinstance(point.vector, list)
+                else point.vector.get(self.vector_store.vector_name)
+                for point in points
+            ],
+            dtype=np.float32,
+        )
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            candidates,
+            k=self.k,
+            lambda_mult=self.lambda_mult,
+        )
+
+        return [self._to_document(points[i]) for i in selected]
+
+    def _to_document(self, point: Any) -> Document:
+        # Same layout as the documents returned by `QdrantVectorStore`.
+        metadata = dict(point.payload.get(self.vector_store.metadata_payload_key) or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self.vector_store.collection_name
+
+        return Document(
+            page_content=point.payload.get(self.vector_store.content_payload_key, ""),
+            metadata=metadata,
+        )
+
+
+def is_shard_key_error(error: Exception) -> bool:
+    """Check whether Qdrant rejected a search because of its shard key.
+
+    Args:
+        error (Exception): Error raised by a REST or gRPC Qdrant client.
+
+    Returns:
+        bool: Whether it's a bad request or not-found error about a shard key, as
+            for a shard key selector sent to a collection that is not custom-sharded.
+    """
+
+    if isinstance(error, UnexpectedResponse):
+        is_rejected = error.status_code in (400, 404)
+        message = error.content.decode("utf-8", errors="replace")
+    elif isinstance(error, grpc.RpcError) and hasattr(error, "code"):
+        is_rejected = error.code() in (
+            grpc.StatusCode.INVALID_ARGUMENT,
+            grpc.StatusCode.NOT_FOUND,
+        )
+        message = error.details() or ""
+    else:
+        return False
+
+    return is_rejected and "shard" in message.lower()
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> list[int]:
+    """Select diverse candidates relevant to a query by maximal marginal relevance.
+
+    Each step picks the candidate maximising `lambda_mult * similarity to the query
+    - (1 - lambda_mult) * max similarity to the already selected candidates`, all
+    similarities being cosine. The rows are normalised once, and the redundancy of
+    every candidate is updated with a single matrix-vector product per step instead
+    of being recomputed against the whole selection. The selection is the same as
+    LangChain's `maximal_marginal_relevance`.
+
+    Args:
+        query_embedding (np.ndarray): Query vector, of shape `(dim,)`.
+        candidates (np.ndarray): Candidate vectors, of shape `(n, dim)`.
+        k (int): Number of candidates to select.
+        lambda_mult (float, optional): Trade-off between relevance (1) and diversity
+            (0). Defaults to 0.5.
+
+    Returns:
+        list[int]: Indexes of the selected candidates, in selection order.
+    """
+
+    num_selected = min(k, len(candidates))
+    if num_selected <= 0:
+        return []
+
+    # Zero vectors keep a zero norm, so all their similarities are 0.
+    norms = np.linalg.norm(candidates, axis=1, keepdims=True)
+    candidates = candidates / np.where(norms == 0, 1, norms)
+    query_norm = np.linalg.norm(query_embedding)
+    query_embedding = query_embedding / (query_norm if query_norm != 0 else 1)
+
+    relevance = candidates @ query_embedding
+    selected = [int(np.argmax(relevance))]
+    redundancy = np.full(len(candidates), -np.inf, dtype=candidates.dtype)
+    for _ in range(num_selected - 1):
+        redundancy = np.maximum(redundancy, candidates @ candidates[selected[-1]])
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+
+    return selected
 
 
 def get_retriever(
     embedding_model_id: str,
     k: int = 3,
     device: str = "cpu",
-) -> VectorStoreRetriever:
+    sections: list[str] | None = None,
+    philosopher_id: str | None = None,
+    mode: RetrievalMode = settings.RAG_RETRIEVAL_MODE,
+    search_k: int = settings.RAG_PARENT_SEARCH_K,
+    fetch_k: int = settings.RAG_MMR_FETCH_K,
+    lambda_mult: float = settings.RAG_MMR_LAMBDA_MULT,
+) -> BaseRetriever:
     """Creates a Maximum Marginal Relevance (MMR) retriever using Qdrant vector store.
 
-    This function initializes a Qdrant vector store client and configures it as a retriever
-    using MMR search strategy for better diversity in retrieved documents.
+    This function initializes a Qdrant vector store client and configures it as an
+    `MMRRetriever`, selecting diverse documents out of the nearest candidates.
+
+    In "parent" mode the small chunks are still what is searched, but the retriever
+    returns the deduplicated parent passages enclosing them, so a single call brings
+    back enough context to answer.
 
     Args:
         embedding_model_id (str): The identifier for the embedding model to use for text embeddings.
@@ -20,20 +292,135 @@ def get_retriever(
         k (int, optional): Number of documents to retrieve in each search. Defaults to 3.
         device (str, optional): Computing device to run the embedding model on ('cpu' or 'cuda').
             Defaults to "cpu".
+        sections (list[str] | None, optional): Only retrieve chunks from these sections,
+            given either as top-level section titles or as full section paths. Defaults
+            to None, which searches all the sections.
+        philosopher_id (str | None, optional): Only retrieve chunks about this
+            philosopher, searching only its shard if the served collection version
+            is sharded.
+            Defaults to None, which searches the chunks of all the philosophers.
+        mode (RetrievalMode, optional): "chunk" to return the retrieved chunks, "parent"
+            to return their parent passages. Defaults to settings.RAG_RETRIEVAL_MODE.
+        search_k (int, optional): Number of chunks searched to find the top `k` parent
+            passages in "parent" mode. Defaults to settings.RAG_PARENT_SEARCH_K.
+        fetch_k (int, optional): Number of nearest candidates MMR selects from. In
+            "parent" mode, at least twice `search_k`. Defaults to settings.RAG_MMR_FETCH_K.
+        lambda_mult (float, optional): Trade-off between relevance (1) and diversity
+            (0). Defaults to settings.RAG_MMR_LAMBDA_MULT.
 
     Returns:
-        VectorStoreRetriever: A configured retriever that performs MMR search over the Qdrant
-            vector store.
+        BaseRetriever: A configured retriever that performs MMR search over the Qdrant
+            collection.
     """
 
     logger.info(
-        f"Initializing retriever | model: {embedding_model_id} | device: {device} | top_k: {k}"
+        f"Initializing retriever | model: {embedding_model_id} | device: {device} | top_k: {k} | mode: {mode} | philosopher: {philosopher_id}"
+    )
+
+    qdrant_client = get_qdrant_wrapper()
+
+    search_kwargs = {"k": k, "fetch_k": fetch_k, "lambda_mult": lambda_mult}
+    if mode == "parent":
+        # MMR picks the chunks out of a candidate pool at least twice as large.
+        search_kwargs.update(k=search_k, fetch_k=max(fetch_k, 2 * search_k))
+    filters = []
+    if sections:
+        filters.append(get_section_filter(sections))
+    if philosopher_id:
+        philosopher_filter = get_philosopher_filter(philosopher_id)
+        shard_key = qdrant_client.get_shard_key(philosopher_id)
+        if shard_key is not None:
+            # The shard only holds the philosopher's chunks: no filter needed.
+            search_kwargs["shard_key_selector"] = shard_key
+            search_kwargs["unsharded_filter"] = combine_filters(
+                [*filters, philosopher_filter]
+            )
+            search_kwargs["is_sharded"] = qdrant_client.is_sharded
+        else:
+            filters.append(philosopher_filter)
+    search_kwargs["filter"] = combine_filters(filters)
+
+    retriever = MMRRetriever(
+        vector_store=qdrant_client.vector_store,
+        client=qdrant_client.client,
+        # A local storage can only be opened by one client.
+        get_async_client=None if qdrant_client.local else get_async_qdrant_client,
+        search_params=get_search_params(),
+        **search_kwargs,
+    )
+    if mode == "parent":
+        return ParentDocumentRetriever(
+            child_retriever=retriever,
+            get_collection_name=qdrant_client.get_active_collection,
+            k=k,
+        )
+
+    return retriever
+
+
+def combine_filters(filters: list[Filter]) -> Filter | None:
+    """Combine Qdrant filters into one matching the points matched by all of them.
+
+    Args:
+        filters (list[Filter]): Filters to combine.
+
+    Returns:
+        Filter | None: The combined filter, or None if there is no filter.
+    """
+
+    if len(filters) == 0:
+        return None
+
+    return filters[0] if len(filters) == 1 else Filter(must=filters)
+
+
+def get_section_filter(sections: list[str]) -> Filter:
+    """Build a Qdrant filter matching the chunks of some sections.
+
+    Both `metadata.section` and `metadata.section_path` are keyword-indexed, so the
+    filter is resolved from the payload indexes.
+
+    Args:
+        sections (list[str]): Top-level section titles (e.g. "3. Metaphysics") or full
+            section paths (e.g. "3. Metaphysics > 3.1 Substance").
+
+    Returns:
+        Filter: A filter matching chunks whose top-level section or section path is
+            one of `sections`.
+    """
+
+    return Filter(
+        should=[
+            FieldCondition(key="metadata.section", match=MatchAny(any=sections)),
+            FieldCondition(key="metadata.section_path", match=MatchAny(any=sections)),
+        ]
     )
 
-    qdrant_client = QdrantClientWrapper()
 
-    return qdrant_client.vector_store.as_retriever(
-        search_type="mmr", search_kwargs={"k": k}
+def get_philosopher_filter(philosopher_id: str) -> Filter:
+    """Build a Qdrant filter matching the chunks of a philosopher.
+
+    A chunk shared by several philosophers is stored once, with the `philosopher_id`
+    of the philosopher that stored it first and all the philosophers referencing it
+    in `philosopher_ids`. Both fields are keyword-indexed, so Qdrant runs a filtered
+    HNSW search instead of discarding the other philosophers' chunks afterwards.
+
+    Args:
+        philosopher_id (str): ID of the philosopher, e.g. "plato".
+
+    Returns:
+        Filter: A filter matching the chunks referenced by the philosopher.
+    """
+
+    return Filter(
+        should=[
+            FieldCondition(
+                key="metadata.philosopher_ids", match=MatchValue(value=philosopher_id)
+            ),
+            FieldCondition(
+                key="metadata.philosopher_id", match=MatchValue(value=philosopher_id)
+            ),
+        ]
     )
 
 
@@ -0,0 +1,243 @@
+import re
+from typing import Iterator
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - lxml is an optional speed-up
+    lxml_html = None
+
+# List of class/id names specific to the Stanford Encyclopedia of Philosophy that we want to exclude.
+EXCLUDED_SECTIONS = [
+    "bibliography",
+    "academic-tools",
+    "other-internet-resources",
+    "related-entries",
+    "acknowledgments",
+    "article-copyright",
+    "article-banner",
+    "footer",
+]
+
+TEXT_TAGS = frozenset(["p", "h1", "h2", "h3", "h4", "h5", "h6"])
+# Headers opening a (sub-)section, from the top level down.
+SECTION_TAGS = ("h2", "h3", "h4", "h5", "h6")
+SECTION_PATH_SEPARATOR = " > "
+
+# A single precompiled matcher for all the excluded sections. Searching (instead of
+# matching) the lower-cased id/class covers both exact and substring matches.
+_EXCLUDED_PATTERN = re.compile("|".join(re.escape(name) for name in EXCLUDED_SECTIONS))
+
+# Strings that `Tag.get_text()` keeps. Comments, scripts, styles, etc. are all
+# NavigableString subclasses that have to be skipped.
+_TEXT_STRING_TYPES = (NavigableString, CData)
+
+
+def is_excluded(element_id: str | None, classes: list[str] | None) -> bool:
+    """Check whether an element belongs to one of the excluded SEP sections.
+
+    Args:
+        element_id (str | None): Value of the element's `id` attribute.
+        classes (list[str] | None): Values of the element's `class` attribute.
+
+    Returns:
+        bool: True if the id or any of the classes contains an excluded section name.
+    """
+
+    if element_id and _EXCLUDED_PATTERN.search(element_id.lower()):
+        return True
+
+    if classes:
+        return any(_EXCLUDED_PATTERN.search(cls.lower()) for cls in classes)
+
+    return False
+
+
+def parse_stanford_encyclopedia_page(
+    html: str, use_lxml: bool = False
+) -> tuple[str | None, str]:
+    """Extract the title and the relevant text of a Stanford Encyclopedia page.
+
+    Args:
+        html (str): Raw HTML of the page.
+        use_lxml (bool, optional): Whether to use the lxml fast path, which needs
+            lxml to be installed. Defaults to False.
+
+    Returns:
+        tuple[str | None, str]: The page title (if any) and the cleaned text, made of
+            the paragraphs and headers outside the excluded sections joined by blank lines.
+    """
+
+    title, blocks = iter_text_blocks(html, use_lxml=use_lxml)
+
+    return title, "\n\n".join(text for _, text in blocks)
+
+
+def iter_sections(
+    html: str, use_lxml: bool = False
+) -> tuple[str | None, Iterator[tuple[list[str], str]]]:
+    """Parse a Stanford Encyclopedia page and lazily walk its sections at every depth.
+
+    A new section starts at every `h2` to `h6` header, nested under the closest
+    enclosing header of a higher level. Each section only holds its own header and
+    paragraphs, not those of its sub-sections, so the text of a section never spans
+    two sections. Sections made of a header only are skipped. Everything before
+    the first `h2` header is returned with an empty path.
+
+    Args:
+        html (str): Raw HTML of the page.
+        use_lxml (bool, optional): Whether to use the lxml fast path, which needs
+            lxml to be installed. Defaults to False.
+
+    Returns:
+        tuple[str | None, Iterator[tuple[list[str], str]]]: The page title (if any)
+            and an iterator of (section path, section text) pairs, where the path
+            lists the header titles from the top-level section down.
+    """
+
+    title, blocks = iter_text_blocks(html, use_lxml=use_lxml)
+
+    def group() -> Iterator[tuple[list[str], str]]:
+        path, content, has_body = [], [], False
+        for tag, text in blocks:
+            if tag in SECTION_TAGS:
+                if has_body:
+                    yield path, "\n\n".join(content)
+
+                depth = SECTION_TAGS.index(tag)
+                path, content, has_body = (
+                    [*path[:depth], " ".join(text.split())],
+                    [],
+                    False,
+                )
+            else:
+                has_body = has_body or bool(text.strip())
+            content.append(text)
+
+        if has_body:
+            yield path, "\n\n".join(content)
+
+    return title, group()
+
+
+def format_section_path(path: list[str]) -> str | None:
+    """Format a section path as a single string, e.g. "3. Metaphysics > 3.1 Substance".
+
+    Args:
+        path (list[str]): Header titles from the top-level section down.
+
+    Returns:
+        str | None: The formatted path, or None for the text before the first section.
+    """
+
+    if len(path) == 0:
+        return None
+
+    return SECTION_PATH_SEPARATOR.join(path)
+
+
+def iter_text_blocks(
+    html: str, use_lxml: bool = False
+) -> tuple[str | None, Iterator[tuple[str, str]]]:
+    """Parse a Stanford Encyclopedia page and lazily walk its text blocks.
+
+    The page is traversed once. Excluded sections are pruned as soon as they are
+    reached, and the text of every paragraph or header is emitted in document order.
+
+    Args:
+        html (str): Raw HTML of the page.
+        use_lxml (bool, optional): Whether to use the lxml fast path, which needs
+            lxml to be installed. Defaults to False.
+
+    Returns:
+        tuple[str | None, Iterator[tuple[str, str]]]: The page title (if any) and an
+            iterator of (tag name, text) pairs.
+    """
+
+    if use_lxml:
+        if lxml_html is None:
+            raise ImportError("lxml is not installed. Install it with `uv add lxml`.")
+
+        return _iter_text_blocks_lxml(html)
+
+    return _iter_text_blocks_soup(html)
+
+
+def _iter_text_blocks_soup(
+    html: str,
+) -> tuple[str | None, Iterator[tuple[str, str]]]:
+    soup = BeautifulSoup(html, "html.parser")
+
+    title = soup.find("title")
+    title = title.get_text().strip(" \n") if title else None
+
+    def collect_text(element: Tag) -> str:
+        parts = []
+        stack = [iter(element.children)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+            elif isinstance(child, Tag):
+                if not is_excluded(child.get("id"), child.get("class")):
+                    stack.append(iter(child.children))
+            elif type(child) in _TEXT_STRING_TYPES:
+                parts.append(str(child))
+
+        return "".join(parts)
+
+    def walk() -> Iterator[tuple[str, str]]:
+        stack = [iter([soup])]
+        while stack:
+            element = next(stack[-1], None)
+            if element is None:
+                stack.pop()
+                continue
+            if not isinstance(element, Tag):
+                continue
+            if is_excluded(element.get("id"), element.get("class")):
+                continue
+
+            if element.name in TEXT_TAGS:
+                yield element.name, collect_text(element)
+            stack.append(iter(element.children))
+
+    return title, walk()
+
+
+def _iter_text_blocks_lxml(
+    html: str,
+) -> tuple[str | None, Iterator[tuple[str, str]]]:
+    root = lxml_html.document_fromstring(html)
+
+    title = root.find(".//title")
+    title = title.text_content().strip(" \n") if title is not None else None
+
+    def element_is_excluded(element) -> bool:
+        return is_excluded(element.get("id"), element.get("class", "").split())
+
+    def collect_text(element) -> str:
+        parts = [element.text or ""]
+        for child in element:
+            if isinstance(child.tag, str) and not element_is_excluded(child):
+                parts.append(collect_text(child))
+            parts.append(child.tail or "")
+
+        return "".join(parts)
+
+    def walk() -> Iterator[tuple[str, str]]:
+        stack = [iter([root])]
+        while stack:
+            element = next(stack[-1], None)
+            if element is None:
+                stack.pop()
+                continue
+            if not isinstance(element.tag, str) or element_is_excluded(element):
+                continue
+
+            if element.tag in TEXT_TAGS:
+                yield element.tag, collect_text(element)
+            stack.append(iter(element))
+
+    return title, walk()
@@ -0,0 +1,411 @@
+import contextlib
+import itertools
+import json
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel, Field
+from qdrant_client.http.models import PointStruct
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.qdrant_wrapper import QdrantClientWrapper
+from evaluation_playbook.rag.dedup_index import get_dedup_index_path
+from evaluation_playbook.rag.manifest import IngestionManifest
+from evaluation_playbook.rag.parent_documents import get_parent_store_path
+
+# Bumped on every incompatible change of the snapshot layout.
+SNAPSHOT_FORMAT_VERSION = 1
+
+SNAPSHOT_FILE_NAME = "snapshot.json"
+VECTORS_FILE_NAME = "vectors.f32"
+POINTS_FILE_NAME = "points.jsonl"
+INGESTION_MANIFEST_FILE_NAME = "ingestion_manifest.json"
+DEDUP_INDEX_FILE_NAME = "dedup_index.sqlite"
+PARENT_STORE_FILE_NAME = "parents.sqlite"
+
+
+class SnapshotManifest(BaseModel):
+    """Description of a long-term memory snapshot, stored next to its data files.
+
+    A snapshot holds one collection version: its vectors as a raw little-endian
+    float32 matrix that can be memory-mapped, and the ID and payload of every point
+    as JSON lines in the same order.
+
+    Args:
+        format_version (int): Version of the snapshot layout.
+        collection_name (str): Collection version the snapshot was exported from.
+        embedding_model_id (str): Embedding model the vectors were computed with.
+        embedding_provider (str): Backend of the embedding model.
+        vector_size (int): Dimension of the vectors.
+        num_points (int): Number of points in the snapshot.
+        created_at (str): ISO 8601 UTC export time.
+        files (list[str]): Optional files shipped with the points: the ingestion
+            manifest, deduplication index and parent store of the collection version.
+    """
+
+    format_version: int = Field(
+        default=SNAPSHOT_FORMAT_VERSION, description="Snapshot layout version"
+    )
+    collection_name: str = Field(description="Exported collection version")
+    embedding_model_id: str = Field(description="Embedding model of the vectors")
+    embedding_provider: str = Field(description="Backend of the embedding model")
+    vector_size: int = Field(description="Dimension of the vectors")
+    num_points: int = Field(default=0, description="Number of points")
+    created_at: str = Field(
+        default_factory=lambda: datetime.now(timezone.utc).isoformat(),
+        description="Export time",
+    )
+    files: list[str] = Field(
+        default_factory=list, description="Optional files shipped with the points"
+    )
+
+    @classmethod
+    def load(cls, snapshot_dir: Path) -> "SnapshotManifest":
+        """Load the manifest of a snapshot and check it can be read.
+
+        Args:
+            snapshot_dir (Path): Directory of the snapshot.
+
+        Returns:
+            SnapshotManifest: The manifest.
+
+        Raises:
+            ValueError: If the snapshot was written with another layout version.
+        """
+
+        manifest = cls.model_validate_json(
+            (snapshot_dir / SNAPSHOT_FILE_NAME).read_text(encoding="utf-8")
+        )
+        if manifest.format_version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format version {manifest.format_version}, expected {SNAPSHOT_FORMAT_VERSION}."
+            )
+
+        return manifest
+
+    def open_vectors(self, snapshot_dir: Path) -> np.memmap:
+        """Memory-map the vectors of the snapshot, without reading them.
+
+        Args:
+            snapshot_dir (Path): Directory of the snapshot.
+
+        Returns:
+            np.memmap: Read-only `(num_points, vector_size)` float32 matrix.
+        """
+
+        return np.memmap(
+            snapshot_dir / VECTORS_FILE_NAME,
+            dtype="<f4",
+            mode="r",
+            shape=(self.num_points, self.vector_size),
+        )
+
+
+def export_snapshot(
+    database_client: QdrantClientWrapper,
+    output_dir: Path,
+    batch_size: int = settings.QDRANT_UPSERT_BATCH_SIZE,
+) -> SnapshotManifest:
+    """Export the served collection version, vectors and payloads, into a snapshot.
+
+    The points are scrolled and written batch by batch, so the export runs in
+    constant memory. The snapshot is written next to `output_dir` and only moved in
+    place once complete, replacing any previous snapshot.
+
+    Args:
+        database_client (QdrantClientWrapper): Client of the Qdrant to export from.
+        output_dir (Path): Directory of the snapshot.
+        batch_size (int, optional): Number of points read per scroll request.
+            Defaults to QDRANT_UPSERT_BATCH_SIZE.
+
+    Returns:
+        SnapshotManifest: The manifest of the written snapshot.
+
+    Raises:
+        ValueError: If no collection version is served.
+    """
+
+    collection_name = database_client.get_active_collection()
+    if collection_name is None:
+        raise ValueError(
+            f"Qdrant alias `{database_client.collection_name}` doesn't point to a collection version. Nothing to export."
+        )
+
+    manifest = SnapshotManifest(
+        collection_name=collection_name,
+        embedding_model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+        embedding_provider=settings.RAG_EMBEDDING_PROVIDER,
+        vector_size=database_client.embedding_dim,
+    )
+
+    start = time.perf_counter()
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=output_dir.parent, suffix=".tmp"))
+    try:
+        # Sharded collections hold a copy of a shared point in the shard of every
+        # philosopher referencing it: only the first one is exported.
+        seen_ids = set()
+        offset = None
+        with (
+            open(tmp_dir / VECTORS_FILE_NAME, "wb") as vectors_file,
+            open(tmp_dir / POINTS_FILE_NAME, "w", encoding="utf-8") as points_file,
+        ):
+            while True:
+                records, offset = database_client.client.scroll(
+                    collection_name=collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                records = [record for record in records if record.id not in seen_ids]
+                seen_ids.update(record.id for record in records)
+
+                if len(records) > 0:
+                    vectors_file.write(
+                        np.asarray(
+                            [record.vector for record in records], dtype="<f4"
+                        ).tobytes()
+                    )
+                    for record in records:
+                        points_file.write(
+                            json.dumps(
+                                {"id": record.id, "payload": record.payload},
+                                ensure_ascii=False,
+                            )
+                            + "\n"
+                        )
+                if offset is None:
+                    break
+        manifest.num_points = len(seen_ids)
+
+        manifest.files = export_version_files(collection_name, tmp_dir)
+        (tmp_dir / SNAPSHOT_FILE_NAME).write_text(
+            manifest.model_dump_json(indent=2), encoding="utf-8"
+        )
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        tmp_dir.replace(output_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(
+        f"Exported {manifest.num_points} points of {collection_name} to `{output_dir}` in {time.perf_counter() - start:.1f}s."
+    )
+
+    return manifest
+
+
+def export_version_files(collection_name: str, snapshot_dir: Path) -> list[str]:
+    """Copy the local files describing a collection version into a snapshot.
+
+    They let the replica serve parent passages and run incremental updates without
+    a full rebuild. The ingestion manifest is only copied if it describes the version.
+
+    Args:
+        collection_name (str): Exported collection version.
+        snapshot_dir (Path): Directory of the snapshot.
+
+    Returns:
+        list[str]: Names of the copied files.
+    """
+
+    files = []
+
+    ingestion_manifest = IngestionManifest.load(settings.RAG_MANIFEST_FILE_PATH)
+    if ingestion_manifest.collection_name == collection_name:
+        ingestion_manifest.save(snapshot_dir / INGESTION_MANIFEST_FILE_NAME)
+        files.append(INGESTION_MANIFEST_FILE_NAME)
+
+    for path, file_name in [
+        (get_dedup_index_path(collection_name), DEDUP_INDEX_FILE_NAME),
+        (get_parent_store_path(collection_name), PARENT_STORE_FILE_NAME),
+    ]:
+        if path.exists():
+            copy_sqlite_database(path, snapshot_dir / file_name)
+            files.append(file_name)
+
+    return files
+
+
+def iter_snapshot_points(
+    snapshot_dir: Path, manifest: SnapshotManifest, batch_size: int
+) -> Iterator[list[PointStruct]]:
+    """Stream the points of a snapshot in batches.
+
+    Only the vectors of the current batch are paged in from the memory-mapped matrix.
+
+    Args:
+        snapshot_dir (Path): Directory of the snapshot.
+        manifest (SnapshotManifest): Manifest of the snapshot.
+        batch_size (int): Number of points per batch.
+
+    Yields:
+        list[PointStruct]: The next batch of points.
+    """
+
+    vectors = manifest.open_vectors(snapshot_dir)
+    with open(snapshot_dir / POINTS_FILE_NAME, encoding="utf-8") as points_file:
+        start = 0
+        while batch := list(itertools.islice(points_file, batch_size)):
+            batch_vectors = vectors[start : start + len(batch)]
+            points = []
+            for line, vector in zip(batch, batch_vectors):
+                point = json.loads(line)
+                points.append(
+                    PointStruct(
+                        id=point["id"], vector=vector.tolist(), payload=point["payload"]
+                    )
+                )
+            yield points
+            start += len(batch)
+
+    if start != manifest.num_points:
+        raise ValueError(
+            f"Snapshot `{snapshot_dir}` holds {start} points, expected {manifest.num_points}."
+        )
+
+
+def import_snapshot(
+    database_client: QdrantClientWrapper,
+    snapshot_dir: Path,
+    batch_size: int = settings.QDRANT_UPSERT_BATCH_SIZE,
+) -> SnapshotManifest:
+    """Bulk-load a snapshot into a new collection version and serve it.
+
+    The version keeps the name it was exported under, so the shipped deduplication
+    index, parent store and ingestion manifest still describe it. Points are streamed
+    in batches into a collection created with the configured index settings, and the
+    alias is only switched once all of them are stored. Nothing is embedded.
+
+    Args:
+        database_client (QdrantClientWrapper): Client of the Qdrant to load into.
+        snapshot_dir (Path): Directory of the snapshot.
+        batch_size (int, optional): Number of points sent per upsert request.
+            Defaults to QDRANT_UPSERT_BATCH_SIZE.
+
+    Returns:
+        SnapshotManifest: The manifest of the imported snapshot.
+
+    Raises:
+        ValueError: If the snapshot was built with another embedding model than the
+            configured one, or its collection version already exists.
+    """
+
+    manifest = SnapshotManifest.load(snapshot_dir)
+    if (
+        manifest.embedding_model_id != settings.RAG_TEXT_EMBEDDING_MODEL_ID
+        or manifest.vector_size != database_client.embedding_dim
+    ):
+        raise ValueError(
+            f"Snapshot `{snapshot_dir}` holds {manifest.vector_size}-dimensional vectors of `{manifest.embedding_model_id}`, "
+            f"but the queries are embedded with {database_client.embedding_dim}-dimensional `{settings.RAG_TEXT_EMBEDDING_MODEL_ID}`."
+        )
+
+    collection_name = manifest.collection_name
+    if database_client.client.collection_exists(collection_name=collection_name):
+        raise ValueError(
+            f"Qdrant collection {collection_name} already exists. Delete it to import the snapshot again."
+        )
+
+    start = time.perf_counter()
+    database_client.create_collection(collection_name)
+    try:
+        for points in iter_snapshot_points(snapshot_dir, manifest, batch_size):
+            upsert_snapshot_points(database_client, points, collection_name)
+        import_version_files(manifest, snapshot_dir)
+    except Exception:
+        logger.error(f"Snapshot import failed. Dropping collection {collection_name}.")
+        database_client.client.delete_collection(collection_name=collection_name)
+        raise
+
+    database_client.swap_alias(collection_name)
+    database_client.prune_versions()
+
+    logger.info(
+        f"Imported {manifest.num_points} points into {collection_name} in {time.perf_counter() - start:.1f}s."
+    )
+
+    return manifest
+
+
+def upsert_snapshot_points(
+    database_client: QdrantClientWrapper,
+    points: list[PointStruct],
+    collection_name: str,
+) -> None:
+    """Store a batch of snapshot points, in the shard of every philosopher referencing them.
+
+    Args:
+        database_client (QdrantClientWrapper): Client of the Qdrant to load into.
+        points (list[PointStruct]): Batch of points.
+        collection_name (str): Collection version to store them in.
+    """
+
+    if not database_client.is_sharded(collection_name):
+        database_client.client.upsert(collection_name=collection_name, points=points)
+
+        return
+
+    shards: dict[str, list[PointStruct]] = {}
+    for point in points:
+        metadata = point.payload.get("metadata", {})
+        for philosopher_id in metadata.get("philosopher_ids") or [
+            metadata["philosopher_id"]
+        ]:
+            shards.setdefault(philosopher_id, []).append(point)
+
+    for philosopher_id, shard_points in shards.items():
+        shard_key = database_client.get_shard_key(philosopher_id, collection_name)
+        database_client.ensure_shard_key(shard_key, collection_name)
+        database_client.client.upsert(
+            collection_name=collection_name,
+            points=shard_points,
+            shard_key_selector=shard_key,
+        )
+
+
+def import_version_files(manifest: SnapshotManifest, snapshot_dir: Path) -> None:
+    """Install the local files shipped with a snapshot where the pipeline expects them.
+
+    Args:
+        manifest (SnapshotManifest): Manifest of the snapshot.
+        snapshot_dir (Path): Directory of the snapshot.
+    """
+
+    for file_name, path in [
+        (DEDUP_INDEX_FILE_NAME, get_dedup_index_path(manifest.collection_name)),
+        (PARENT_STORE_FILE_NAME, get_parent_store_path(manifest.collection_name)),
+    ]:
+        if file_name in manifest.files:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            copy_sqlite_database(snapshot_dir / file_name, path)
+
+    if INGESTION_MANIFEST_FILE_NAME in manifest.files:
+        IngestionManifest.load(snapshot_dir / INGESTION_MANIFEST_FILE_NAME).save(
+            settings.RAG_MANIFEST_FILE_PATH
+        )
+
+
+def copy_sqlite_database(source: Path, destination: Path) -> None:
+    """Copy a SQLite database into a single file, including its pending WAL pages.
+
+    Args:
+        source (Path): Database to copy.
+        destination (Path): Path of the copy, replaced if it exists.
+    """
+
+    destination.unlink(missing_ok=True)
+    with (
+        contextlib.closing(sqlite3.connect(source)) as source_connection,
+        contextlib.closing(sqlite3.connect(destination)) as destination_connection,
+    ):
+        source_connection.backup(destination_connection)
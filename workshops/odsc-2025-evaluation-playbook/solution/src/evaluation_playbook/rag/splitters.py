@@ -1,14 +1,134 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import copy
+import os
+from functools import lru_cache
+from typing import Any, Iterable
+
+import tiktoken
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
 from loguru import logger
 
-Splitter = RecursiveCharacterTextSplitter
+from evaluation_playbook.config import SplitterType, settings
+
+Splitter = TextSplitter
+
+
+class TokenSplitter(TextSplitter):
+    """Token-window text splitter that tokenizes each text exactly once.
+
+    Each text is encoded once, then cut into windows of `chunk_size` tokens that
+    overlap by `chunk_overlap` tokens, directly on the token array. Only the final
+    windows are decoded. Unlike `RecursiveCharacterTextSplitter`, no candidate piece
+    is ever re-tokenized while searching for separators, at the cost of chunk
+    boundaries that ignore paragraphs and sentences.
+
+    Batches of texts are encoded by tiktoken in parallel threads, as tiktoken
+    releases the GIL. Decoding a window is cheap enough to stay on one thread.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        encoding_name: str = "cl100k_base",
+        num_threads: int = min(8, os.cpu_count() or 1),
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the TokenSplitter.
+
+        Args:
+            chunk_size (int): Maximum number of tokens of a chunk.
+            chunk_overlap (int): Number of tokens shared by consecutive chunks.
+            encoding_name (str, optional): tiktoken encoding counting the tokens.
+                Defaults to "cl100k_base".
+            num_threads (int, optional): Number of threads encoding a batch of
+                texts. Defaults to the number of CPUs, up to 8.
+        """
+
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **kwargs)
+
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.num_threads = num_threads
+
+    def split_text(self, text: str) -> list[str]:
+        """Split a text into overlapping token windows.
+
+        Args:
+            text (str): Text to split.
+
+        Returns:
+            list[str]: The chunks of the text.
+        """
 
+        return self.split_texts([text])[0]
 
-def get_splitter(chunk_size: int) -> Splitter:
+    def split_texts(self, texts: list[str]) -> list[list[str]]:
+        """Split a batch of texts into overlapping token windows.
+
+        Args:
+            texts (list[str]): Texts to split.
+
+        Returns:
+            list[list[str]]: The chunks of each text, in order.
+        """
+
+        # Special tokens in the text are encoded as plain text.
+        if self.num_threads > 1 and len(texts) > 1:
+            token_lists = self.encoding.encode_ordinary_batch(
+                texts, num_threads=self.num_threads
+            )
+        else:
+            token_lists = [self.encoding.encode_ordinary(text) for text in texts]
+
+        step = self._chunk_size - self._chunk_overlap
+        windows, text_indices = [], []
+        for text_index, tokens in enumerate(token_lists):
+            # The last window is the first one reaching the end of the text.
+            for start in range(0, max(len(tokens) - self._chunk_overlap, 1), step):
+                windows.append(tokens[start : start + self._chunk_size])
+                text_indices.append(text_index)
+
+        chunks = [[] for _ in texts]
+        for text_index, window in zip(text_indices, windows):
+            # Windows may cut a multi-byte character in two: drop its partial bytes.
+            chunk = self.encoding.decode_bytes(window).decode("utf-8", errors="ignore")
+            if self._strip_whitespace:
+                chunk = chunk.strip()
+            if chunk:
+                chunks[text_index].append(chunk)
+
+        return chunks
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        """Split a batch of documents, encoding and decoding all of them at once.
+
+        Args:
+            documents (Iterable[Document]): Documents to split.
+
+        Returns:
+            list[Document]: The chunks, each with a copy of its document's metadata.
+        """
+
+        documents = list(documents)
+        chunks = self.split_texts([doc.page_content for doc in documents])
+
+        return [
+            Document(page_content=chunk, metadata=copy.deepcopy(doc.metadata))
+            for doc, doc_chunks in zip(documents, chunks)
+            for chunk in doc_chunks
+        ]
+
+
+@lru_cache(maxsize=4)
+def get_splitter(
+    chunk_size: int, splitter_type: SplitterType = settings.RAG_SPLITTER
+) -> Splitter:
     """Returns a token-based text splitter with overlap.
 
     Args:
         chunk_size: Number of tokens for each text chunk.
+        splitter_type: "token" for the single-pass TokenSplitter, "recursive" for
+            LangChain's separator-aware RecursiveCharacterTextSplitter.
 
     Returns:
         Splitter: A configured text splitter instance that
@@ -18,9 +138,12 @@ def get_splitter(chunk_size: int) -> Splitter:
     chunk_overlap = int(0.15 * chunk_size)
 
     logger.info(
-        f"Getting splitter with chunk size: {chunk_size} and overlap: {chunk_overlap}"
+        f"Getting {splitter_type} splitter with chunk size: {chunk_size} and overlap: {chunk_overlap}"
     )
 
+    if splitter_type == "token":
+        return TokenSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
     return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
         encoding_name="cl100k_base",
         chunk_size=chunk_size,
@@ -52,6 +52,7 @@ async def call(
         output_state = await graph.ainvoke(
             input={
                 "messages": __format_messages(messages=messages),
+                "philosopher_id": philosopher_id,
                 "philosopher_name": philosopher.name,
                 "philosopher_perspective": philosopher.perspective,
                 "philosopher_style": philosopher.style,
@@ -107,6 +108,7 @@ async def stream(
         async for chunk in graph.astream(
             input={
                 "messages": __format_messages(messages=messages),
+                "philosopher_id": philosopher_id,
                 "philosopher_name": philosopher.name,
                 "philosopher_perspective": philosopher.perspective,
                 "philosopher_style": philosopher.style,
@@ -6,12 +6,14 @@ class PhilosopherState(MessagesState):
     conversation between the Philosopher and the user.
 
     Attributes:
+        philosopher_id (str): The unique identifier of the philosopher, scoping the retrieval.
         philosopher_context (str): The historical and philosophical context of the philosopher.
         philosopher_name (str): The name of the philosopher.
         philosopher_perspective (str): The perspective of the philosopher about AI.
         philosopher_style (str): The style of the philosopher.
     """
 
+    philosopher_id: str
     philosopher_context: str
     philosopher_name: str
     philosopher_perspective: str
@@ -1,18 +1,15 @@
-from langchain.tools.retriever import create_retriever_tool
+from functools import lru_cache
+from typing import Annotated
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.tools import StructuredTool
+from langgraph.prebuilt import InjectedState
 
 from evaluation_playbook.config import settings
 from evaluation_playbook.rag.retrievers import get_retriever
 
-retriever = get_retriever(
-    embedding_model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
-    k=settings.RAG_TOP_K,
-    device=settings.RAG_DEVICE,
-)
-
-retriever_tool = create_retriever_tool(
-    retriever,
-    "retrieve_philosopher_context",
-    """
+RETRIEVER_TOOL_DESCRIPTION = """
     Search and return information about a specific philosopher. Always use this tool when the user asks about facts about a philosopher's life, works, ideas, historical context or anything related to their life.
 
     For example, here are some example queries you can use this tool for:
@@ -21,7 +18,54 @@ retriever_tool = create_retriever_tool(
     - Tell me more about the Turing test.
     - What is the meaning of life? Does your work relate to this?
     - What is the historical context of your works?
-    """,
+    """
+
+
+@lru_cache(maxsize=None)
+def get_philosopher_retriever(philosopher_id: str | None) -> BaseRetriever:
+    """Get the retriever searching the long-term memory of a philosopher.
+
+    Args:
+        philosopher_id (str | None): ID of the philosopher the conversation is with,
+            or None to search the chunks of all the philosophers.
+
+    Returns:
+        BaseRetriever: The retriever, shared by all the conversations with the philosopher.
+    """
+
+    return get_retriever(
+        embedding_model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+        k=settings.RAG_TOP_K,
+        device=settings.RAG_DEVICE,
+        philosopher_id=philosopher_id,
+    )
+
+
+def format_documents(documents: list[Document]) -> str:
+    return "\n\n".join(doc.page_content for doc in documents)
+
+
+def retrieve_philosopher_context(
+    query: str, philosopher_id: Annotated[str | None, InjectedState("philosopher_id")]
+) -> str:
+    return format_documents(get_philosopher_retriever(philosopher_id).invoke(query))
+
+
+async def aretrieve_philosopher_context(
+    query: str, philosopher_id: Annotated[str | None, InjectedState("philosopher_id")]
+) -> str:
+    return format_documents(
+        await get_philosopher_retriever(philosopher_id).ainvoke(query)
+    )
+
+
+# The philosopher ID is injected from the graph state, so the model only sees `query`
+# and the search is scoped to the philosopher the conversation is with.
+retriever_tool = StructuredTool.from_function(
+    func=retrieve_philosopher_context,
+    coroutine=aretrieve_philosopher_context,
+    name="retrieve_philosopher_context",
+    description=RETRIEVER_TOOL_DESCRIPTION,
 )
 
 tools = [retriever_tool]
@@ -0,0 +1,193 @@
+import random
+import re
+import time
+from functools import partial
+from typing import List, Tuple
+
+import click
+from datasketch import MinHash, MinHashLSH
+from langchain_core.documents import Document
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.rag.deduplicate_documents import (
+    MIN_TEXTS_PER_WORKER,
+    DeduplicationStats,
+    deduplicate_documents,
+    find_duplicates,
+)
+
+
+def legacy_find_duplicates(
+    documents: List[Document], threshold: float = 0.7, num_perm: int = 64
+) -> List[Tuple[int, int, float]]:
+    """Reference implementation: one `MinHash.update` per shingle and quadratic pair bookkeeping."""
+
+    minhashes = []
+    for doc in documents:
+        minhash = MinHash(num_perm=num_perm)
+        words = re.findall(r"\w+", doc.page_content.lower())
+        for i in range(len(words) - 3):
+            minhash.update(" ".join(words[i : i + 3]).encode("utf-8"))
+        minhashes.append(minhash)
+
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    for i, minhash in enumerate(minhashes):
+        lsh.insert(i, minhash)
+
+    duplicates = []
+    for i, minhash in enumerate(minhashes):
+        for j in lsh.query(minhash):
+            if j == i:
+                continue
+
+            similarity = minhashes[i].jaccard(minhashes[j])
+            if similarity >= threshold:
+                duplicate_info = (*sorted([i, j]), similarity)
+                if duplicate_info not in duplicates:
+                    duplicates.append(duplicate_info)
+
+    return duplicates
+
+
+def make_corpus(
+    num_chunks: int,
+    duplicate_rate: float,
+    words_per_chunk: int,
+    seed: int,
+    exact_duplicate_rate: float = 0.0,
+) -> List[Document]:
+    """Build synthetic chunks, a fraction of which are copies of earlier ones.
+
+    Near-duplicates are lightly edited copies. Exact duplicates only differ from
+    the original by their case and whitespace.
+    """
+
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(20_000)]
+
+    chunks = []
+    for _ in range(num_chunks):
+        draw = rng.random() if chunks else 1.0
+        if draw < exact_duplicate_rate:
+            chunk = rng.choice(chunks)
+            chunks.append(f"  {chunk.upper()}\n" if rng.random() < 0.5 else chunk)
+            continue
+
+        if draw < exact_duplicate_rate + duplicate_rate:
+            words = rng.choice(chunks).split()
+            for _ in range(max(1, len(words) // 20)):
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        else:
+            words = rng.choices(vocabulary, k=words_per_chunk)
+        chunks.append(" ".join(words))
+
+    return [Document(page_content=chunk) for chunk in chunks]
+
+
+def time_find_duplicates(
+    find: callable, documents: List[Document], threshold: float
+) -> Tuple[float, set]:
+    start = time.perf_counter()
+    duplicates = find(documents, threshold)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, {(i, j) for i, j, _ in duplicates}
+
+
+@click.command()
+@click.option("--num-chunks", default=100_000, type=int, help="Number of chunks.")
+@click.option(
+    "--duplicate-rate",
+    default=0.1,
+    type=float,
+    help="Fraction of chunks that are near-duplicates of an earlier one.",
+)
+@click.option(
+    "--exact-duplicate-rate",
+    default=0.1,
+    type=float,
+    help="Fraction of chunks that are exact copies of an earlier one, up to case and whitespace.",
+)
+@click.option("--words-per-chunk", default=100, type=int, help="Words per chunk.")
+@click.option("--threshold", default=0.5, type=float, help="Similarity threshold.")
+@click.option(
+    "--legacy/--no-legacy",
+    default=True,
+    help="Also time the legacy implementation (several minutes on 100k chunks).",
+)
+@click.option(
+    "--num-workers",
+    default=settings.RAG_DEDUPLICATION_NUM_WORKERS,
+    type=int,
+    help="Number of signature worker processes to compare against a single process.",
+)
+@click.option("--seed", default=42, type=int, help="Seed of the synthetic corpus.")
+def main(
+    num_chunks: int,
+    duplicate_rate: float,
+    exact_duplicate_rate: float,
+    words_per_chunk: int,
+    threshold: float,
+    legacy: bool,
+    num_workers: int,
+    seed: int,
+) -> None:
+    """Benchmark the MinHash deduplication on a synthetic corpus of chunks.
+
+    Args:
+        num_chunks: Number of chunks in the corpus.
+        duplicate_rate: Fraction of chunks that are near-duplicates of an earlier one.
+        exact_duplicate_rate: Fraction of chunks that are exact copies of an earlier one.
+        words_per_chunk: Number of words per original chunk.
+        threshold: Similarity threshold of the deduplication.
+        legacy: Whether to also time the legacy implementation.
+        num_workers: Number of signature worker processes.
+        seed: Seed of the synthetic corpus.
+    """
+
+    documents = make_corpus(
+        num_chunks, duplicate_rate, words_per_chunk, seed, exact_duplicate_rate
+    )
+    print(f"\033[32m{num_chunks} chunks, threshold {threshold}\033[0m")
+
+    elapsed, pairs = time_find_duplicates(find_duplicates, documents, threshold)
+    print(f"  {'vectorised':<12} {elapsed:8.2f} s  {len(pairs):>8} pairs")
+
+    if num_workers > 1:
+        find = partial(find_duplicates, num_workers=num_workers)
+        # Warm the pool up, so process start-up is not part of the timing.
+        find(documents[: num_workers * MIN_TEXTS_PER_WORKER], threshold)
+
+        parallel_elapsed, parallel_pairs = time_find_duplicates(
+            find, documents, threshold
+        )
+        same_output = "same output" if parallel_pairs == pairs else "output differs"
+        print(
+            f"  {f'{num_workers} workers':<12} {parallel_elapsed:8.2f} s  {len(parallel_pairs):>8} pairs  "
+            f"x{elapsed / parallel_elapsed:.1f} speed-up ({same_output})"
+        )
+
+    stats = DeduplicationStats()
+    start = time.perf_counter()
+    deduplicate_documents(documents, threshold, num_workers=1, stats=stats)
+    prefiltered_elapsed = time.perf_counter() - start
+    print(
+        f"  {'prefiltered':<12} {prefiltered_elapsed:8.2f} s  end to end, "
+        f"{stats.exact_duplicates} exact duplicates removed by hash, "
+        f"{stats.documents - stats.exact_duplicates} chunks left for MinHash, "
+        f"{stats.near_duplicates} near-duplicates removed by MinHash, {stats.kept} kept"
+    )
+
+    if legacy:
+        legacy_elapsed, legacy_pairs = time_find_duplicates(
+            legacy_find_duplicates, documents, threshold
+        )
+        agreement = len(pairs & legacy_pairs) / max(1, len(pairs | legacy_pairs))
+        print(
+            f"  {'legacy':<12} {legacy_elapsed:8.2f} s  {len(legacy_pairs):>8} pairs  "
+            f"x{legacy_elapsed / elapsed:.1f} speed-up, {agreement:.1%} pair agreement"
+        )
+
+
+if __name__ == "__main__":
+    main()
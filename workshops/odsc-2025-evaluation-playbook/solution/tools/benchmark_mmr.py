@@ -0,0 +1,206 @@
+import time
+from typing import Callable
+
+import click
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores.utils import (
+    maximal_marginal_relevance as langchain_mmr,
+)
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.qdrant_wrapper import get_qdrant_wrapper
+from evaluation_playbook.rag.retrievers import (
+    get_retriever,
+    maximal_marginal_relevance,
+)
+
+QUERIES = [
+    "When and where were you born? Also tell me more about your life, work and beliefs.",
+    "What is the meaning of life? Does your work relate to this?",
+    "What is the historical context of your works?",
+    "Tell me more about the Turing test.",
+    "What is the theory of forms?",
+    "Can machines think?",
+    "What is virtue, and can it be taught?",
+    "How should a just state be organised?",
+]
+
+
+def time_calls(call: Callable[[], object], repeats: int) -> tuple[float, float]:
+    """Run a call `repeats` times and return its p50/p99 latencies in ms."""
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def benchmark_selection(
+    fetch_k: int, k: int, lambda_mult: float, dim: int, repeats: int, seed: int
+) -> None:
+    """Time the MMR selection alone on random candidate matrices."""
+
+    rng = np.random.default_rng(seed)
+    candidates = rng.standard_normal((fetch_k, dim), dtype=np.float32)
+    query = rng.standard_normal(dim, dtype=np.float32)
+    # LangChain receives the candidate vectors as lists, like from the Qdrant client.
+    candidate_lists = candidates.tolist()
+
+    same = langchain_mmr(
+        query, candidate_lists, k=k, lambda_mult=lambda_mult
+    ) == maximal_marginal_relevance(query, candidates, k=k, lambda_mult=lambda_mult)
+
+    print(
+        f"\033[32mMMR selection of {k} out of {fetch_k} vectors of dim {dim}, "
+        f"{'same' if same else 'different'} selection\033[0m"
+    )
+    print(f"  {'implementation':<16} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, call in [
+        (
+            "langchain",
+            lambda: langchain_mmr(query, candidate_lists, k=k, lambda_mult=lambda_mult),
+        ),
+        (
+            "numpy",
+            lambda: maximal_marginal_relevance(
+                query, np.array(candidate_lists, dtype=np.float32), k, lambda_mult
+            ),
+        ),
+    ]:
+        p50, p99 = time_calls(call, repeats)
+        print(f"  {name:<16} {p50:>8.3f} {p99:>8.3f}")
+
+
+def benchmark_retrieval(
+    fetch_k: int,
+    k: int,
+    lambda_mult: float,
+    philosopher_id: str | None,
+    repeats: int,
+) -> None:
+    """Time end-to-end MMR retrievals against the served long-term memory."""
+
+    numpy_retriever = get_retriever(
+        embedding_model_id=settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+        k=k,
+        device=settings.RAG_DEVICE,
+        philosopher_id=philosopher_id,
+        mode="chunk",
+        fetch_k=fetch_k,
+        lambda_mult=lambda_mult,
+    )
+    # Same search on both paths, so only the candidate fetch and the MMR differ.
+    search_kwargs = {"k": k, "fetch_k": fetch_k, "lambda_mult": lambda_mult}
+    for key in ["filter", "search_params", "shard_key_selector"]:
+        if (value := getattr(numpy_retriever, key)) is not None:
+            search_kwargs[key] = value
+    retrievers: dict[str, BaseRetriever] = {
+        "langchain": get_qdrant_wrapper().vector_store.as_retriever(
+            search_type="mmr", search_kwargs=search_kwargs
+        ),
+        "numpy": numpy_retriever,
+    }
+
+    # Warm up the connections and the query embedding cache, and check both paths
+    # retrieve the same chunks.
+    results = {
+        name: [[doc.metadata["_id"] for doc in retriever.invoke(q)] for q in QUERIES]
+        for name, retriever in retrievers.items()
+    }
+    agreement = np.mean(
+        [a == b for a, b in zip(results["langchain"], results["numpy"])]
+    )
+
+    print(
+        f"\033[32mMMR retrieval of {k} out of {fetch_k} chunks, {len(QUERIES)} queries x {repeats}, "
+        f"same results for {agreement:.0%} of the queries\033[0m"
+    )
+    print(f"  {'implementation':<16} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, retriever in retrievers.items():
+        latencies = [
+            time_calls(lambda r=retriever, q=q: r.invoke(q), repeats) for q in QUERIES
+        ]
+        p50 = float(np.median([p50 for p50, _ in latencies]))
+        p99 = float(np.max([p99 for _, p99 in latencies]))
+        print(f"  {name:<16} {p50:>8.2f} {p99:>8.2f}")
+
+
+@click.command()
+@click.option(
+    "--fetch-k",
+    default=2 * settings.RAG_PARENT_SEARCH_K,
+    type=int,
+    help="Number of nearest candidates MMR selects from.",
+)
+@click.option(
+    "--k",
+    default=settings.RAG_PARENT_SEARCH_K,
+    type=int,
+    help="Number of selected candidates.",
+)
+@click.option(
+    "--lambda-mult",
+    default=settings.RAG_MMR_LAMBDA_MULT,
+    type=float,
+    help="Trade-off between relevance (1) and diversity (0).",
+)
+@click.option(
+    "--dim",
+    default=settings.RAG_TEXT_EMBEDDING_MODEL_DIM,
+    type=int,
+    help="Dimension of the random vectors of the selection benchmark.",
+)
+@click.option(
+    "--philosopher-id",
+    default=None,
+    help="Only retrieve the chunks of this philosopher.",
+)
+@click.option(
+    "--repeats", default=50, type=int, help="Number of timed calls per query."
+)
+@click.option(
+    "--selection-only",
+    is_flag=True,
+    default=False,
+    help="Only time the MMR selection, without querying Qdrant.",
+)
+@click.option("--seed", default=42, type=int, help="Seed of the random vectors.")
+def main(
+    fetch_k: int,
+    k: int,
+    lambda_mult: float,
+    dim: int,
+    philosopher_id: str | None,
+    repeats: int,
+    selection_only: bool,
+    seed: int,
+) -> None:
+    """Benchmark the per-query latency of the NumPy MMR retriever against LangChain's.
+
+    The selection benchmark times the MMR step alone on random vectors. The retrieval
+    benchmark times whole sync retrievals against the served long-term memory, once
+    the query embeddings are cached, so it measures the candidate fetch and the MMR.
+    The defaults are the candidate pool of the "parent" retrieval mode.
+
+    Args:
+        fetch_k: Number of nearest candidates MMR selects from.
+        k: Number of selected candidates.
+        lambda_mult: Trade-off between relevance (1) and diversity (0).
+        dim: Dimension of the random vectors of the selection benchmark.
+        philosopher_id: Only retrieve the chunks of this philosopher.
+        repeats: Number of timed calls per query.
+        selection_only: Whether to skip the retrieval benchmark.
+        seed: Seed of the random vectors.
+    """
+
+    benchmark_selection(fetch_k, k, lambda_mult, dim, repeats, seed)
+    if not selection_only:
+        benchmark_retrieval(fetch_k, k, lambda_mult, philosopher_id, repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import statistics
+import time
+from typing import Callable
+
+import click
+from bs4 import BeautifulSoup
+
+from evaluation_playbook.rag.page_cache import get_page_cache
+from evaluation_playbook.rag.sep_parser import (
+    EXCLUDED_SECTIONS,
+    lxml_html,
+    parse_stanford_encyclopedia_page,
+)
+
+
+def legacy_parse_stanford_encyclopedia_page(html: str) -> tuple[str | None, str]:
+    """Reference implementation: four `find_all` passes per excluded section."""
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    for section_name in EXCLUDED_SECTIONS:
+        for section in soup.find_all(id=section_name):
+            section.decompose()
+
+        for section in soup.find_all(class_=section_name):
+            section.decompose()
+
+        for section in soup.find_all(
+            lambda tag, section_name=section_name: (
+                tag.has_attr("id") and section_name in tag["id"].lower()
+            )
+        ):
+            section.decompose()
+
+        for section in soup.find_all(
+            lambda tag, section_name=section_name: (
+                tag.has_attr("class")
+                and any(section_name in cls.lower() for cls in tag["class"])
+            )
+        ):
+            section.decompose()
+
+    content = []
+    for element in soup.find_all(["p", "h1", "h2", "h3", "h4", "h5", "h6"]):
+        content.append(element.get_text())
+
+    title = soup.find("title")
+    title = title.get_text().strip(" \n") if title else None
+
+    return title, "\n\n".join(content)
+
+
+def time_parser(
+    parser: Callable[[str], tuple[str | None, str]], html: str, repeats: int
+) -> tuple[float, str]:
+    """Return the median parse time in milliseconds and the parsed text."""
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, text = parser(html)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings), text
+
+
+@click.command()
+@click.option(
+    "--url",
+    "urls",
+    multiple=True,
+    default=[
+        "https://plato.stanford.edu/entries/aristotle/",
+        "https://plato.stanford.edu/entries/plato/",
+        "https://plato.stanford.edu/entries/turing/",
+    ],
+    help="Stanford Encyclopedia URL to benchmark. Can be passed multiple times.",
+)
+@click.option("--repeats", default=5, type=int, help="Number of timed runs per page.")
+def main(urls: tuple[str, ...], repeats: int) -> None:
+    """Benchmark the per-page parse time of the Stanford Encyclopedia cleaners.
+
+    Pages are read through the page cache, so the benchmark can run offline after a
+    first `make create-long-term-memory`.
+
+    Args:
+        urls: Stanford Encyclopedia URLs to benchmark.
+        repeats: Number of timed runs per page.
+    """
+
+    parsers = {
+        "legacy (find_all)": legacy_parse_stanford_encyclopedia_page,
+        "single-pass (html.parser)": lambda html: parse_stanford_encyclopedia_page(
+            html, use_lxml=False
+        ),
+    }
+    if lxml_html is not None:
+        parsers["single-pass (lxml)"] = lambda html: parse_stanford_encyclopedia_page(
+            html, use_lxml=True
+        )
+    else:
+        print("\033[33mlxml is not installed. Skipping the lxml fast path.\033[0m")
+
+    page_cache = get_page_cache()
+    for url in urls:
+        html = page_cache.get(url)
+        print(f"\033[32m{url} ({len(html) / 1024:.0f} KiB)\033[0m")
+
+        baseline_ms, baseline_text = None, None
+        for name, parser in parsers.items():
+            elapsed_ms, text = time_parser(parser, html, repeats)
+            if baseline_ms is None:
+                baseline_ms, baseline_text = elapsed_ms, text
+
+            same_output = "same output" if text == baseline_text else "output differs"
+            print(
+                f"  {name:<28} {elapsed_ms:8.1f} ms/page  x{baseline_ms / elapsed_ms:5.1f}  ({same_output})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import itertools
+import time
+
+import click
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CollectionStatus,
+    OptimizersConfigDiff,
+    SearchParams,
+)
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.qdrant_wrapper import (
+    get_collection_config,
+    get_qdrant_client,
+    get_search_params,
+)
+
+BENCHMARK_COLLECTION_NAME = "benchmark_vector_index"
+
+
+def make_synthetic_vectors(
+    num_vectors: int, dim: int, seed: int, num_clusters: int = 100
+) -> np.ndarray:
+    """Build unit vectors drawn around random cluster centres, like real embeddings."""
+
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((num_clusters, dim), dtype=np.float32)
+    vectors = centres[rng.integers(num_clusters, size=num_vectors)]
+    vectors += 0.5 * rng.standard_normal((num_vectors, dim), dtype=np.float32)
+
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_collection_vectors(
+    client: QdrantClient, collection_name: str, num_vectors: int
+) -> np.ndarray:
+    """Read up to `num_vectors` vectors of an existing collection."""
+
+    vectors, offset = [], None
+    while len(vectors) < num_vectors:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(1024, num_vectors - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        vectors.extend(record.vector for record in records)
+        if offset is None:
+            break
+
+    vectors = np.array(vectors, dtype=np.float32)
+
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Unordered brute-force cosine top-k of each query, the ground truth of the recall."""
+
+    similarities = queries @ vectors.T
+
+    return np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+
+
+def build_collection(
+    client: QdrantClient,
+    vectors: np.ndarray,
+    m: int,
+    ef_construct: int,
+    quantization: str,
+    on_disk: bool,
+) -> float:
+    """Create the benchmark collection, upload the vectors and wait for the index.
+
+    Returns:
+        float: Seconds until the collection is fully indexed.
+    """
+
+    client.delete_collection(collection_name=BENCHMARK_COLLECTION_NAME)
+
+    start = time.perf_counter()
+    client.create_collection(
+        collection_name=BENCHMARK_COLLECTION_NAME,
+        # Index every segment, however small, so no search falls back to brute force.
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=1),
+        **get_collection_config(
+            vectors.shape[1],
+            m=m,
+            ef_construct=ef_construct,
+            quantization=quantization,
+            on_disk_vectors=on_disk,
+            on_disk_payload=on_disk,
+        ),
+    )
+    client.upload_collection(
+        collection_name=BENCHMARK_COLLECTION_NAME,
+        vectors=vectors,
+        ids=range(len(vectors)),
+        batch_size=settings.QDRANT_UPSERT_BATCH_SIZE,
+        wait=True,
+    )
+    while (
+        client.get_collection(collection_name=BENCHMARK_COLLECTION_NAME).status
+        != CollectionStatus.GREEN
+    ):
+        time.sleep(0.5)
+
+    return time.perf_counter() - start
+
+
+def time_searches(
+    client: QdrantClient,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    search_params: SearchParams | None,
+) -> tuple[float, float, float]:
+    """Run every query and return the mean recall@k and the p50/p99 latencies in ms."""
+
+    recalls, latencies = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        points = client.query_points(
+            collection_name=BENCHMARK_COLLECTION_NAME,
+            query=query.tolist(),
+            limit=k,
+            search_params=search_params,
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({point.id for point in points} & set(expected.tolist())) / k)
+
+    return (
+        float(np.mean(recalls)),
+        float(np.percentile(latencies, 50)),
+        float(np.percentile(latencies, 99)),
+    )
+
+
+@click.command()
+@click.option(
+    "--source",
+    type=click.Choice(["synthetic", "long-term-memory"]),
+    default="synthetic",
+    help="Benchmark synthetic vectors, or a sample of the served long-term memory.",
+)
+@click.option(
+    "--num-vectors", default=50_000, type=int, help="Number of indexed vectors."
+)
+@click.option(
+    "--dim",
+    default=settings.RAG_TEXT_EMBEDDING_MODEL_DIM,
+    type=int,
+    help="Dimension of the synthetic vectors.",
+)
+@click.option("--num-queries", default=200, type=int, help="Number of timed queries.")
+@click.option(
+    "--k", default=10, type=int, help="Number of neighbours the recall is computed on."
+)
+@click.option(
+    "--m",
+    "m_values",
+    multiple=True,
+    default=[settings.QDRANT_HNSW_M],
+    type=int,
+    help="HNSW edges per node to benchmark. Can be passed multiple times.",
+)
+@click.option(
+    "--ef-construct",
+    "ef_construct_values",
+    multiple=True,
+    default=[settings.QDRANT_HNSW_EF_CONSTRUCT],
+    type=int,
+    help="HNSW construction neighbours to benchmark. Can be passed multiple times.",
+)
+@click.option(
+    "--hnsw-ef",
+    "hnsw_ef_values",
+    multiple=True,
+    default=[32, 64, 128],
+    type=int,
+    help="Search-time HNSW neighbours to benchmark. Can be passed multiple times.",
+)
+@click.option(
+    "--quantization",
+    "quantizations",
+    multiple=True,
+    default=["none", "scalar", "binary"],
+    type=click.Choice(["none", "scalar", "binary"]),
+    help="Vector quantization to benchmark. Can be passed multiple times.",
+)
+@click.option(
+    "--rescore/--no-rescore",
+    default=settings.QDRANT_QUANTIZATION_RESCORE,
+    help="Rescore the quantized candidates with the original vectors.",
+)
+@click.option(
+    "--oversampling",
+    default=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+    type=float,
+    help="Factor of extra quantized candidates fetched before rescoring.",
+)
+@click.option(
+    "--on-disk/--in-memory",
+    default=settings.QDRANT_ON_DISK_VECTORS,
+    help="Keep the original vectors and the payload on disk.",
+)
+@click.option("--seed", default=42, type=int, help="Seed of the vectors and queries.")
+def main(
+    source: str,
+    num_vectors: int,
+    dim: int,
+    num_queries: int,
+    k: int,
+    m_values: tuple[int, ...],
+    ef_construct_values: tuple[int, ...],
+    hnsw_ef_values: tuple[int, ...],
+    quantizations: tuple[str, ...],
+    rescore: bool,
+    oversampling: float,
+    on_disk: bool,
+    seed: int,
+) -> None:
+    """Benchmark recall@k and search latency of Qdrant vector index configurations.
+
+    Every combination of HNSW graph and quantization settings is built into a
+    temporary collection of the configured Qdrant server, then searched with every
+    `hnsw_ef`. The recall is measured against an exact brute-force search.
+
+    Args:
+        source: "synthetic" vectors, or a sample of the "long-term-memory" collection.
+        num_vectors: Number of indexed vectors.
+        dim: Dimension of the synthetic vectors.
+        num_queries: Number of timed queries, held out of the indexed vectors.
+        k: Number of neighbours the recall is computed on.
+        m_values: HNSW edges per node to benchmark.
+        ef_construct_values: HNSW construction neighbours to benchmark.
+        hnsw_ef_values: Search-time HNSW neighbours to benchmark.
+        quantizations: Vector quantizations to benchmark.
+        rescore: Whether to rescore the quantized candidates.
+        oversampling: Factor of extra quantized candidates fetched before rescoring.
+        on_disk: Whether to keep the original vectors and the payload on disk.
+        seed: Seed of the vectors and queries.
+    """
+
+    client = get_qdrant_client()
+
+    if source == "synthetic":
+        vectors = make_synthetic_vectors(num_vectors + num_queries, dim, seed)
+    else:
+        vectors = load_collection_vectors(
+            client, settings.QDRANT_COLLECTION_NAME, num_vectors + num_queries
+        )
+        np.random.default_rng(seed).shuffle(vectors)
+    vectors, queries = vectors[num_queries:], vectors[:num_queries]
+    truth = exact_neighbours(vectors, queries, k)
+
+    print(
+        f"\033[32m{len(vectors)} {source} vectors of dim {vectors.shape[1]}, "
+        f"{len(queries)} queries, recall@{k}, {'on disk' if on_disk else 'in memory'}\033[0m"
+    )
+    print(
+        f"  {'m':>4} {'ef_con':>6} {'quant':>7} {'build s':>8} {'hnsw_ef':>8} "
+        f"{'recall':>7} {'p50 ms':>7} {'p99 ms':>7}"
+    )
+
+    try:
+        for m, ef_construct, quantization in itertools.product(
+            m_values, ef_construct_values, quantizations
+        ):
+            build_elapsed = build_collection(
+                client, vectors, m, ef_construct, quantization, on_disk
+            )
+            for hnsw_ef in hnsw_ef_values:
+                search_params = get_search_params(
+                    hnsw_ef=hnsw_ef,
+                    quantization=quantization,
+                    rescore=rescore,
+                    oversampling=oversampling,
+                )
+                recall, p50, p99 = time_searches(
+                    client, queries, truth, k, search_params
+                )
+                print(
+                    f"  {m:>4} {ef_construct:>6} {quantization:>7} {build_elapsed:>8.1f} "
+                    f"{hnsw_ef:>8} {recall:>7.3f} {p50:>7.2f} {p99:>7.2f}"
+                )
+    finally:
+        client.delete_collection(collection_name=BENCHMARK_COLLECTION_NAME)
+
+
+if __name__ == "__main__":
+    main()
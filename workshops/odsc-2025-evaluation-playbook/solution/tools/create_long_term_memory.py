@@ -4,6 +4,7 @@ import click
 
 from evaluation_playbook.config import settings
 from evaluation_playbook.domain.philosopher import PhilosopherExtract
+from evaluation_playbook.rag.embeddings import CachedEmbeddings
 from evaluation_playbook.rag.long_term_memory import LongTermMemoryCreator
 
 
@@ -14,17 +15,38 @@ from evaluation_playbook.rag.long_term_memory import LongTermMemoryCreator
     default=settings.EXTRACTION_METADATA_FILE_PATH,
     help="Path to the philosophers extraction metadata JSON file.",
 )
-def main(metadata_file: Path) -> None:
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only re-embed chunks that changed since the last run instead of rebuilding everything.",
+)
+def main(metadata_file: Path, incremental: bool) -> None:
     """CLI command to create long-term memory for philosophers.
 
     Args:
         metadata_file: Path to the philosophers extraction metadata JSON file.
+        incremental: Whether to update the long-term memory in place.
     """
 
     philosophers = PhilosopherExtract.from_json(metadata_file)
 
     long_term_memory_creator = LongTermMemoryCreator.build_from_settings()
-    long_term_memory_creator(philosophers)
+    long_term_memory_creator(philosophers, incremental=incremental)
+
+    print(
+        f"\033[32mDeduplicated {long_term_memory_creator.deduplication_stats}.\033[0m"
+    )
+
+    stats = long_term_memory_creator.writer.stats
+    print(
+        f"\033[32mEmbedded and stored {stats.chunks} chunks in {stats.elapsed_seconds:.1f}s: "
+        f"{stats.chunks_per_second:.1f} chunks/s, {stats.tokens_per_second:.0f} tokens/s.\033[0m"
+    )
+
+    embeddings = long_term_memory_creator.writer.embeddings
+    if isinstance(embeddings, CachedEmbeddings):
+        print(f"\033[32mEmbedding cache: {embeddings.stats}.\033[0m")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import click
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.qdrant_wrapper import get_qdrant_wrapper
+from evaluation_playbook.rag.snapshot import export_snapshot
+
+
+@click.command()
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=settings.RAG_SNAPSHOT_DIR,
+    help="Directory the snapshot is written to. A previous snapshot is replaced.",
+)
+@click.option(
+    "--batch-size",
+    default=settings.QDRANT_UPSERT_BATCH_SIZE,
+    type=int,
+    help="Number of points read from Qdrant per request.",
+)
+def main(output_dir: Path, batch_size: int) -> None:
+    """CLI command to export the served long-term memory into a snapshot.
+
+    The snapshot holds the vectors and payloads of the served collection version,
+    with its parent store, deduplication index and ingestion manifest, so replicas
+    can load it with `import_long_term_memory` instead of re-scraping and
+    re-embedding everything.
+
+    Args:
+        output_dir: Directory the snapshot is written to.
+        batch_size: Number of points read from Qdrant per request.
+    """
+
+    manifest = export_snapshot(get_qdrant_wrapper(), output_dir, batch_size=batch_size)
+
+    print(
+        f"\033[32mExported {manifest.num_points} points of {manifest.collection_name} to `{output_dir}`.\033[0m"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import time
+from pathlib import Path
+
+import click
+
+from evaluation_playbook.config import settings
+from evaluation_playbook.qdrant_wrapper import get_qdrant_wrapper
+from evaluation_playbook.rag.snapshot import import_snapshot
+
+
+@click.command()
+@click.option(
+    "--snapshot-dir",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=settings.RAG_SNAPSHOT_DIR,
+    help="Directory of the snapshot written by `export_long_term_memory`.",
+)
+@click.option(
+    "--batch-size",
+    default=settings.QDRANT_UPSERT_BATCH_SIZE,
+    type=int,
+    help="Number of points sent to Qdrant per upsert request.",
+)
+def main(snapshot_dir: Path, batch_size: int) -> None:
+    """CLI command to load a long-term memory snapshot and serve it.
+
+    Loads into the configured backend, either a Qdrant server or the local
+    in-process store, without scraping or embedding anything.
+
+    Args:
+        snapshot_dir: Directory of the snapshot.
+        batch_size: Number of points sent to Qdrant per upsert request.
+    """
+
+    start = time.perf_counter()
+    manifest = import_snapshot(
+        get_qdrant_wrapper(), snapshot_dir, batch_size=batch_size
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\033[32mLoaded {manifest.num_points} points into {manifest.collection_name} in {elapsed:.1f}s: "
+        f"{manifest.num_points / elapsed:.0f} points/s.\033[0m"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import click
+from loguru import logger
+
+from evaluation_playbook.qdrant_wrapper import get_qdrant_wrapper
+
+
+@click.command()
+def main() -> None:
+    """CLI command to serve the previous version of the long-term memory.
+
+    Switches the Qdrant alias queried by the agent back to the collection version
+    built before the currently served one. The next incremental update detects the
+    rollback and falls back to a full rebuild.
+    """
+
+    qdrant_client = get_qdrant_wrapper()
+
+    logger.info(f"Available versions: {qdrant_client.list_versions()}")
+    version = qdrant_client.rollback()
+
+    logger.info(f"Long-term memory rolled back to `{version}`")
+
+
+if __name__ == "__main__":
+    main()